@@ -0,0 +1,369 @@
+"""Endpoint benchmark for server.py.
+
+Runs the FastAPI app in-process (ASGI calls, no sockets) against a freshly
+seeded courses.db in a temporary directory and reports throughput and
+p50/p95/p99 latency per route as JSON. With --baseline the results are
+compared against a stored run and regressions are listed.
+
+    python benchmark.py --concurrency 16 --requests 500 --students 200
+    python benchmark.py --repeat 3 --baseline benchmark_baseline.json --fail-on-regression
+    python benchmark.py --repeat 3 --output benchmark_baseline.json   # record a new baseline
+
+Record the baseline with the interpreter CI uses, after any change to storage
+or caching, since the comparison is only as good as the numbers it is made
+against.
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+GRADES = (5, 5.5, 6, 6.5, 7, 7.5, 8, 8.5, 9, 9.5, 10)
+
+# Courses every seeded student has passed. The grade PUT targets these; the
+# other PUTs target the remaining courses so they never un-pass them.
+PASSED_COURSES = 5
+
+# Search terms in the forms users type: English, Greek, unaccented
+# Greeklish and a course code
+SEARCH_TERMS = ('algebra', 'αλγεβ', 'leitourgika', 'k22', 'δίκτυα')
+
+# name: (method, path, body factory). {student}, {course}, {passed} and {query}
+# are filled in per request with a random seeded student, course, passed course
+# and search term, {version} with the sync version right after seeding. A body
+# factory is called with the random generator and the course ids it may change.
+ROUTES = {
+    'GET /api/courses': ('GET', '/api/courses?student_id={student}', None),
+    'GET /api/profile': ('GET', '/api/profile?student_id={student}', None),
+    'GET /api/profile/sdi': ('GET', '/api/profile/sdi?student_id={student}', None),
+    'GET /api/profile/first_name': ('GET', '/api/profile/first_name?student_id={student}', None),
+    'GET /api/profile/last_name': ('GET', '/api/profile/last_name?student_id={student}', None),
+    'GET /api/profile/current_semester': ('GET', '/api/profile/current_semester?student_id={student}', None),
+    'GET /api/profile/direction': ('GET', '/api/profile/direction?student_id={student}', None),
+    'GET /api/profile/language': ('GET', '/api/profile/language?student_id={student}', None),
+    'GET /api/requirements': ('GET', '/api/requirements?student_id={student}', None),
+    'GET /api/timetable/me': ('GET', '/api/timetable/me?student_id={student}', None),
+    'GET /api/grade-planning': ('GET', '/api/grade-planning?target=7&student_id={student}', None),
+    'GET /api/courses/search': ('GET', '/api/courses/search?q={query}&student_id={student}', None),
+    'GET /api/courses?since': ('GET', '/api/courses?since={version}&student_id={student}', None),
+    'GET /api/stats': ('GET', '/api/stats', None),
+    'POST /api/plan/optimize': (
+        'POST', '/api/plan/optimize?student_id={student}',
+        # Planning without saving, so the plan does not change the data the
+        # other routes read
+        lambda rng, course_ids: {'apply': False},
+    ),
+    'POST /api/courses/batch': (
+        'POST', '/api/courses/batch?student_id={student}',
+        lambda rng, course_ids: {'updates': [
+            {'course_id': course_id, 'status': 'Planned', 'planned_semester': rng.randint(1, 8)}
+            for course_id in rng.sample(course_ids, k=5)
+        ]},
+    ),
+    'PUT /api/courses/{id}/status': (
+        'PUT', '/api/courses/{course}/status?student_id={student}',
+        lambda rng, course_ids: {'status': rng.choice(('Planned', 'Current Semester', 'Failed'))},
+    ),
+    'PUT /api/courses/{id}/status concurrent': (
+        'PUT', '/api/courses/{course}/status?student_id={student}',
+        lambda rng, course_ids: {'status': rng.choice(('Planned', 'Current Semester', 'Failed'))},
+    ),
+    'PUT /api/courses/{id}/grade': (
+        'PUT', '/api/courses/{passed}/grade?student_id={student}',
+        lambda rng, course_ids: {'grade': rng.choice(GRADES)},
+    ),
+    'PUT /api/courses/{id}/planned_semester': (
+        'PUT', '/api/courses/{course}/planned_semester?student_id={student}',
+        lambda rng, course_ids: {'planned_semester': rng.randint(1, 8)},
+    ),
+}
+
+
+# Routes run with more requests in flight than --concurrency. Enough writers
+# at once to fill group commits, so writes_per_commit shows how far batches grow.
+ROUTE_CONCURRENCY = {
+    'PUT /api/courses/{id}/status concurrent': 64,
+}
+
+
+######### IN-PROCESS CLIENT #########
+
+async def call(app, method, path, body=None):
+    """Send one request through the ASGI app and return the status code"""
+    path, _, query = path.partition('?')
+    payload = json.dumps(body).encode() if body is not None else b''
+    headers = [(b'host', b'benchmark')]
+    if body is not None:
+        headers += [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 0),
+        'server': ('benchmark', 80),
+    }
+    sent = False
+    status = None
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': payload, 'more_body': False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+######### DATASET #########
+
+def seed(students, seed_value):
+    """Create students with random course states and compute cohort statistics from them.
+
+    Returns (student ids, passed course ids, other course ids, sync version).
+    """
+    from cohort_stats import RECORD_FIELDS, refresh_from_file
+    from database import COURSE_STATUSES, create_student, get_all_courses, get_changes_since, update_courses_batch
+
+    rng = random.Random(seed_value)
+    catalog = get_all_courses()
+    code_of = {course['id']: course['code'] for course in catalog}
+    course_ids = [course['id'] for course in catalog]
+    passed_ids, course_ids = course_ids[:PASSED_COURSES], course_ids[PASSED_COURSES:]
+    student_ids = []
+    records = []
+    for i in range(students):
+        student_id = create_student(
+            sdi=1115202000000 + i,
+            first_name=f'Student{i}',
+            last_name='Benchmark',
+            current_semester=rng.randint(1, 8),
+            direction=rng.choice(('CS', 'CET')),
+        )
+        updates = [{'course_id': course_id, 'status': 'Passed', 'grade': rng.choice(GRADES)} for course_id in passed_ids]
+        for course_id in rng.sample(course_ids, k=len(course_ids) // 2):
+            status = rng.choice(COURSE_STATUSES)
+            update = {'course_id': course_id, 'status': status}
+            if status == 'Passed':
+                update['grade'] = rng.choice(GRADES)
+            if status == 'Planned':
+                update['planned_semester'] = rng.randint(1, 8)
+            updates.append(update)
+        update_courses_batch(updates, student_id)
+        student_ids.append(student_id)
+        for update in updates:
+            records.append((student_id, code_of[update['course_id']], update['status'],
+                            update.get('grade', ''), update.get('planned_semester', '')))
+
+    # The working directory is the run's scratch directory
+    with open('cohort_records.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(RECORD_FIELDS)
+        writer.writerows(records)
+    refresh_from_file('cohort_records.csv')
+    version = get_changes_since(student_ids[0], 0)['version']
+    return student_ids, passed_ids, course_ids, version
+
+
+######### MEASUREMENT #########
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def measure(app, route, requests, concurrency, dataset, rng):
+    from database import get_writer
+
+    method, template, body_factory = ROUTES[route]
+    concurrency = ROUTE_CONCURRENCY.get(route, concurrency)
+    student_ids, passed_ids, course_ids, version = dataset
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            path = template.format(
+                student=rng.choice(student_ids), course=rng.choice(course_ids), passed=rng.choice(passed_ids),
+                query=quote(rng.choice(SEARCH_TERMS)), version=version)
+            body = body_factory(rng, course_ids) if body_factory else None
+            start = time.perf_counter()
+            status = await call(app, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status is None or status >= 400:
+                errors += 1
+
+    writer = get_writer().stats()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    after = get_writer().stats()
+    batches = after['batches'] - writer['batches']
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': ms(sum(latencies) / len(latencies)),
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+    }
+    if batches:
+        result['writes_per_commit'] = round((after['writes'] - writer['writes']) / batches, 1)
+    return result
+
+
+async def run(args):
+    import server
+
+    app = server.app
+    async with app.router.lifespan_context(app):
+        dataset = seed(args.students, args.seed)
+        rng = random.Random(args.seed)
+        results = {}
+        for route in args.routes:
+            if args.warmup:
+                await measure(app, route, args.warmup, args.concurrency, dataset, rng)
+            # Keep the run with the median throughput, so one noisy run does
+            # not decide the comparison
+            runs = [await measure(app, route, args.requests, args.concurrency, dataset, rng) for _ in range(args.repeat)]
+            runs.sort(key=lambda result: result['throughput_rps'])
+            results[route] = runs[len(runs) // 2]
+            print(f"{route:42} {results[route]['throughput_rps']:>9.1f} req/s  "
+                  f"p50 {results[route]['p50_ms']:>8.3f} ms  p95 {results[route]['p95_ms']:>8.3f} ms  "
+                  f"p99 {results[route]['p99_ms']:>8.3f} ms  errors {results[route]['errors']}"
+                  + (f"  writes/commit {results[route]['writes_per_commit']}" if 'writes_per_commit' in results[route] else ''),
+                  file=sys.stderr)
+    return results
+
+
+######### BASELINE #########
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions against a baseline run.
+
+    A route regressed when its p95 grew, or its throughput shrank, by more
+    than a factor of 1 + tolerance.
+    """
+    regressions = []
+    for route, current in results.items():
+        previous = baseline.get('routes', {}).get(route)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        if current['throughput_rps'] * (1 + tolerance) < previous['throughput_rps']:
+            regressions.append(f"{route}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current['errors'] > previous['errors']:
+            regressions.append(f"{route}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8, help='requests in flight at once')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--repeat', type=int, default=1, help='measured runs per route; the median run is reported')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per route')
+    parser.add_argument('--students', type=int, default=50, help='students seeded into the database')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the dataset and requests')
+    parser.add_argument('--routes', nargs='+', default=list(ROUTES), choices=list(ROUTES), metavar='ROUTE',
+                        help='routes to benchmark (default: all)')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown before a route counts as regressed (0.25: p95 up to 1.25x, throughput down to 1/1.25)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 if any route regressed')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    # DATABASE_PATH is relative, so a scratch working directory gives the run
+    # its own courses.db
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='dit-benchmark-') as workdir:
+        os.chdir(workdir)
+        try:
+            # Keep stdout for the JSON report; the app logs with print()
+            with contextlib.redirect_stdout(sys.stderr):
+                routes = asyncio.run(run(args))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'repeat': args.repeat,
+            'students': args.students,
+            'seed': args.seed,
+        },
+        'routes': routes,
+    }
+
+    regressions = []
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        # Numbers from another interpreter, SQLite or load shape are not comparable
+        differing = [
+            f"{key} {baseline['meta'].get(key)} -> {value}" for key, value in report['meta'].items()
+            if key not in ('timestamp', 'machine') and baseline['meta'].get(key) != value
+        ]
+        if differing:
+            print(f"WARNING {args.baseline} was recorded with different settings: {', '.join(differing)}", file=sys.stderr)
+        regressions = compare(routes, baseline, args.tolerance)
+        report['regressions'] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if not regressions:
+            print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
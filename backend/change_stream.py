@@ -0,0 +1,138 @@
+"""Server-sent events for committed writes.
+
+Clients open GET /api/changes/stream once and patch their local copy of the
+courses and profile from the events, instead of refetching /api/courses after
+every write or polling to notice writes made in another tab.
+
+Each event carries the student's data version as its id and only what the
+write touched:
+
+    event: courses   data: {"version": 12, "courses": [{"id": 3, "status": "Passed", "grade": 8.0, "planned_semester": 0}]}
+    event: profile   data: {"version": 13, "profile": {"direction": "CS"}}
+    event: reset     data: {"version": 14}   (catalog-wide change or a client that fell behind: refetch)
+
+Events are built once per write, on the writing thread, and handed to each
+subscriber's event loop; nothing is read for students nobody is listening to.
+"""
+import asyncio
+import threading
+
+import orjson
+
+from database import add_change_listener, data_version, get_course_by_id, get_profile_with_id
+from metrics import registry
+
+# Events buffered per client before it counts as fallen behind and gets a reset
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+
+
+def format_event(event, version, data):
+    data = orjson.dumps({'version': version, **data})
+    return f'id: {version}\nevent: {event}\n'.encode() + b'data: ' + data + b'\n\n'
+
+
+class Subscription:
+    """One connected client; its queue is only touched on its event loop"""
+
+    def __init__(self, broker, student_id, loop):
+        self.broker = broker
+        self.student_id = student_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, message):
+        if self.queue.full():
+            # Fell behind: what is queued is no longer enough to patch from
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            version, _ = data_version.for_student(self.student_id)
+            message = format_event('reset', version, {})
+        self.queue.put_nowait(message)
+
+    async def stream(self):
+        try:
+            version, _ = data_version.for_student(self.student_id)
+            # Sent right away so the headers go out and the client knows the
+            # version its events start from
+            yield f'retry: {RETRY_MILLISECONDS}\n'.encode() + format_event('ready', version, {})
+            while True:
+                try:
+                    yield await asyncio.wait_for(self.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+        finally:
+            self.broker.unsubscribe(self)
+
+
+class ChangeBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def attach(self):
+        """Start receiving write notifications from database.py"""
+        add_change_listener(self.on_change)
+
+    def subscribe(self, student_id):
+        """Register a client of the running event loop; iterate stream() to serve it"""
+        subscription = Subscription(self, student_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(student_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.student_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.student_id]
+
+    def count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def on_change(self, table, student_id, keys):
+        with self._lock:
+            if student_id is None:
+                targets = [s for subscribers in self._subscribers.values() for s in subscribers]
+            else:
+                targets = list(self._subscribers.get(student_id, ()))
+        if not targets:
+            return
+        message = self._message(table, student_id, keys)
+        if message is None:
+            return
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, message)
+            except RuntimeError:
+                # Its event loop has shut down; the stream's cleanup will follow
+                pass
+
+    def _message(self, table, student_id, keys):
+        if student_id is None:
+            version, _ = data_version.for_student(None)
+            return format_event('reset', version, {})
+        version, _ = data_version.for_student(student_id)
+        if table == 'student_courses':
+            courses = []
+            for course_id in keys:
+                course = get_course_by_id(course_id, student_id)
+                if course is not None:
+                    courses.append({key: course[key] for key in ('id', 'status', 'grade', 'planned_semester')})
+            return format_event('courses', version, {'courses': courses})
+        if table == 'profile':
+            profile = get_profile_with_id(student_id)
+            if profile is None:
+                return None
+            return format_event('profile', version, {'profile': {key: profile[key] for key in keys if key in profile}})
+        return format_event('reset', version, {})
+
+
+change_broker = ChangeBroker()
+registry.gauge(
+    'change_stream_subscribers', 'Clients connected to /api/changes/stream.',
+    lambda: {(): change_broker.count()})
@@ -0,0 +1,394 @@
+"""Cohort statistics over anonymized student course records.
+
+A refresh reads a file of records, one per student and course:
+
+    student,code,status,grade,planned_semester
+    a91f03,Κ04,Passed,7.5,1
+
+student is an opaque key that is only used to group a student's records and
+is never stored. The file is parsed into columns (array('I') of student
+numbers, array('H') of catalog course numbers, and so on), bulk-inserted into
+a private in-memory database in one executemany, and aggregated there with
+GROUP BY, so the per-record work in Python is parsing alone. None of that holds
+the write lock; only the finished rows go through the writer, replacing the
+materialized cohort_* tables in one short write, and /api/stats only ever
+reads those. Refresh nightly from cron:
+
+    python cohort_stats.py records.csv
+    python cohort_stats.py records.ndjson --format ndjson
+
+Courses, specialities and semesters with fewer than MIN_COHORT_SIZE distinct
+students are left out entirely, and pass rates and grade statistics also need
+that many students with a result or a grade, so no single student's results
+can be read back.
+"""
+import argparse
+import csv
+import json
+import math
+import sqlite3
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+
+import orjson
+
+from database import COURSE_STATUSES, MAX_GRADE, PASS_GRADE, close_writer, get_db_connection, migrate_database, run_write
+from greek_text import fold_code
+from semester_planner import MAX_LAST_SEMESTER
+
+RECORD_FIELDS = ('student', 'code', 'status', 'grade', 'planned_semester')
+MIN_COHORT_SIZE = 5
+MAX_REPORTED_ERRORS = 20
+LOAD_PERCENTILES = (25, 50, 75, 90)
+
+# Status numbers used in the columns and the temporary table
+STATUS_CODES = {status: i for i, status in enumerate(COURSE_STATUSES)}
+PASSED, FAILED = STATUS_CODES['Passed'], STATUS_CODES['Failed']
+IN_PROGRESS, PLANNED = STATUS_CODES['Current Semester'], STATUS_CODES['Planned']
+
+
+class RecordColumns:
+    """Parsed records, one typed array per field"""
+
+    def __init__(self, codes):
+        self.codes = codes
+        self.student = array('I')
+        self.course = array('H')
+        self.status = array('B')
+        self.grade = array('d')
+        self.planned = array('B')
+        self.students = 0
+        self.skipped = 0
+        self.errors = []
+
+    def __len__(self):
+        return len(self.course)
+
+    def reject(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+
+def _catalog_codes():
+    """Return the catalog codes in id order and their ECTS, one entry per code"""
+    with get_db_connection() as conn:
+        rows = conn.execute('SELECT code, ects FROM courses ORDER BY id').fetchall()
+    codes, ects, seen = [], [], set()
+    for code, course_ects in rows:
+        if code not in seen:
+            seen.add(code)
+            codes.append(code)
+            ects.append(course_ects)
+    return codes, ects
+
+
+def _rows(lines, fmt):
+    """Yield (line number, dict) for every record of a CSV or NDJSON file"""
+    if fmt == 'ndjson':
+        for number, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    yield number, orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    yield number, e
+        return
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip().lower() for name in header]
+    missing = [field for field in RECORD_FIELDS[:3] if field not in header]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    for row in reader:
+        if row:
+            yield reader.line_num, dict(zip(header, row))
+
+
+def load_records(lines, fmt='csv', codes=None):
+    """Parse records into RecordColumns; invalid rows are counted and skipped.
+
+    codes is the catalog code list course numbers index into; it defaults to
+    the current catalog.
+    """
+    if codes is None:
+        codes, _ = _catalog_codes()
+    columns = RecordColumns(codes)
+    course_of = {fold_code(code): i for i, code in reversed(list(enumerate(codes)))}
+    statuses = {status.lower(): code for status, code in STATUS_CODES.items()}
+    students = {}
+    # Raw values repeat across hundreds of thousands of rows; resolve each once
+    resolved_codes = {}
+    resolved_statuses = {}
+
+    for line, record in _rows(lines, fmt):
+        if not isinstance(record, dict):
+            columns.reject(line, f"Invalid JSON: {record}")
+            continue
+        raw_code = record.get('code')
+        course = resolved_codes.get(raw_code)
+        if course is None:
+            course = resolved_codes[raw_code] = course_of.get(fold_code(raw_code or ''), -1)
+        if course < 0:
+            columns.reject(line, f"Unknown course code: {raw_code}")
+            continue
+        raw_status = record.get('status')
+        status = resolved_statuses.get(raw_status)
+        if status is None:
+            status = resolved_statuses[raw_status] = statuses.get(str(raw_status or '').strip().lower(), -1)
+        if status < 0:
+            columns.reject(line, f"Invalid status: {raw_status}")
+            continue
+        student = record.get('student')
+        if student in (None, ''):
+            columns.reject(line, "Missing student")
+            continue
+        grade = 0.0
+        if status == PASSED:
+            try:
+                grade = float(record.get('grade'))
+            except (TypeError, ValueError):
+                columns.reject(line, f"Invalid grade: {record.get('grade')}")
+                continue
+            if not PASS_GRADE <= grade <= MAX_GRADE:
+                columns.reject(line, f"Grade must be between {PASS_GRADE} and {MAX_GRADE}")
+                continue
+        try:
+            planned = int(record.get('planned_semester') or 0)
+        except (TypeError, ValueError):
+            columns.reject(line, f"Invalid planned semester: {record.get('planned_semester')}")
+            continue
+        if not 0 <= planned <= MAX_LAST_SEMESTER:
+            columns.reject(line, f"Planned semester must be between 0 and {MAX_LAST_SEMESTER}")
+            continue
+
+        columns.student.append(students.setdefault(student, len(students)))
+        columns.course.append(course)
+        columns.status.append(status)
+        columns.grade.append(grade)
+        columns.planned.append(planned)
+    columns.students = len(students)
+    return columns
+
+
+######### AGGREGATION #########
+
+def _percentile(values, p):
+    """Nearest-rank percentile of sorted values"""
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def _rate(passed, failed, students):
+    """Pass rate, or None unless at least MIN_COHORT_SIZE students have a result"""
+    return round(passed / (passed + failed), 4) if students >= MIN_COHORT_SIZE else None
+
+
+def _grade_stats(passed, grade_sum, grade_squares, students):
+    """Mean and standard deviation, or None unless at least MIN_COHORT_SIZE students have a grade"""
+    if students < MIN_COHORT_SIZE:
+        return None, None
+    mean = grade_sum / passed
+    return round(mean, 3), round(math.sqrt(max(0.0, grade_squares / passed - mean * mean)), 3)
+
+
+# Per-group counts shared by the course and speciality statistics: records,
+# distinct students, status counts, grade sums and the distinct students with
+# a result (Passed or Failed) and with a grade
+GROUP_COUNTS = f'''
+    COUNT(*), COUNT(DISTINCT r.student),
+    SUM(r.status = {PASSED}), SUM(r.status = {FAILED}),
+    SUM(r.status = {IN_PROGRESS}), SUM(r.status = {PLANNED}),
+    SUM(CASE WHEN r.status = {PASSED} THEN r.grade END),
+    SUM(CASE WHEN r.status = {PASSED} THEN r.grade * r.grade END),
+    COUNT(DISTINCT CASE WHEN r.status IN ({PASSED}, {FAILED}) THEN r.student END),
+    COUNT(DISTINCT CASE WHEN r.status = {PASSED} THEN r.student END)
+'''
+
+
+def _course_stats(conn, codes):
+    rows = conn.execute(f'SELECT r.course, {GROUP_COUNTS} FROM temp.cohort_records r GROUP BY r.course').fetchall()
+    histograms = {}
+    for course, bucket, count in conn.execute(f'''
+        SELECT course, CAST(grade AS INTEGER), COUNT(*)
+        FROM temp.cohort_records WHERE status = {PASSED} GROUP BY 1, 2
+    '''):
+        histograms.setdefault(course, {})[str(bucket)] = count
+
+    stats = []
+    for (course, records, students, passed, failed, in_progress, planned,
+         grade_sum, grade_squares, with_result, with_grade) in rows:
+        if students < MIN_COHORT_SIZE:
+            continue
+        mean, stddev = _grade_stats(passed, grade_sum, grade_squares, with_grade)
+        histogram = json.dumps(histograms.get(course, {})) if mean is not None else None
+        stats.append((codes[course], records, students, passed, failed, in_progress, planned,
+                      _rate(passed, failed, with_result), mean, stddev, histogram))
+    return stats
+
+
+def _speciality_codes():
+    """Return the (speciality, code) pairs of the catalog"""
+    with get_db_connection() as conn:
+        return conn.execute('''
+            SELECT DISTINCT cs.speciality, c.code FROM course_speciality cs JOIN courses c ON c.id = cs.course_id
+        ''').fetchall()
+
+
+def _speciality_stats(conn):
+    """Aggregate the records of each speciality's courses"""
+    stats = []
+    for (speciality, courses, records, students, passed, failed, in_progress, planned,
+         grade_sum, grade_squares, with_result, with_grade) in conn.execute(f'''
+        SELECT s.speciality, COUNT(DISTINCT r.course), {GROUP_COUNTS}
+        FROM temp.cohort_records r JOIN temp.cohort_specialities s ON s.course = r.course
+        GROUP BY s.speciality ORDER BY s.speciality
+    '''):
+        if students < MIN_COHORT_SIZE:
+            continue
+        mean, _ = _grade_stats(passed, grade_sum, grade_squares, with_grade)
+        stats.append((speciality, courses, records, passed, failed, _rate(passed, failed, with_result), mean))
+    return stats
+
+
+def _semester_load(conn):
+    """ECTS each student has in each planned semester, summarized per semester"""
+    loads = {}
+    for semester, ects in conn.execute('''
+        SELECT r.planned, SUM(c.ects) FROM temp.cohort_records r JOIN temp.cohort_courses c ON c.course = r.course
+        WHERE r.planned > 0 GROUP BY r.planned, r.student
+    '''):
+        loads.setdefault(semester, []).append(ects)
+    stats = []
+    for semester, values in sorted(loads.items()):
+        if len(values) < MIN_COHORT_SIZE:
+            continue
+        values.sort()
+        stats.append((semester, len(values), round(sum(values) / len(values), 2),
+                      *(_percentile(values, p) for p in LOAD_PERCENTILES)))
+    return stats
+
+
+def refresh(columns, ects, source=None):
+    """Aggregate parsed records and replace the materialized statistics.
+
+    ects lists the ECTS of each entry of columns.codes. The records are
+    aggregated on a private in-memory connection; only replacing the cohort_*
+    rows goes through the writer, in one write, so readers see either the old
+    statistics or the new ones and other writes wait for the swap alone.
+    """
+    start = time.perf_counter()
+    speciality_codes = _speciality_codes()
+
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute('CREATE TEMP TABLE cohort_records (student INTEGER, course INTEGER, status INTEGER, grade REAL, planned INTEGER)')
+        conn.execute('CREATE TEMP TABLE cohort_courses (course INTEGER PRIMARY KEY, ects INTEGER)')
+        conn.execute('CREATE TEMP TABLE cohort_specialities (speciality TEXT, course INTEGER)')
+        conn.executemany('INSERT INTO temp.cohort_records VALUES (?, ?, ?, ?, ?)',
+                         zip(columns.student, columns.course, columns.status, columns.grade, columns.planned))
+        conn.executemany('INSERT INTO temp.cohort_courses VALUES (?, ?)', enumerate(ects))
+        course_of = {code: i for i, code in enumerate(columns.codes)}
+        conn.executemany('INSERT INTO temp.cohort_specialities VALUES (?, ?)',
+                         [(speciality, course_of[code]) for speciality, code in speciality_codes if code in course_of])
+        course_stats = _course_stats(conn, columns.codes)
+        speciality_stats = _speciality_stats(conn)
+        semester_load = _semester_load(conn)
+    finally:
+        conn.close()
+
+    def work(conn):
+        for table in ('cohort_course_stats', 'cohort_speciality_stats', 'cohort_semester_load'):
+            conn.execute(f'DELETE FROM {table}')
+        conn.executemany('INSERT INTO cohort_course_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', course_stats)
+        conn.executemany('INSERT INTO cohort_speciality_stats VALUES (?, ?, ?, ?, ?, ?, ?)', speciality_stats)
+        conn.executemany('INSERT INTO cohort_semester_load VALUES (?, ?, ?, ?, ?, ?, ?)', semester_load)
+        summary = {
+            'refreshed_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'source': source,
+            'records': len(columns),
+            'students': columns.students,
+            'skipped': columns.skipped,
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+        conn.execute('''
+            INSERT OR REPLACE INTO cohort_refresh (id, refreshed_at, source, records, students, skipped, seconds)
+            VALUES (1, :refreshed_at, :source, :records, :students, :skipped, :seconds)
+        ''', summary)
+        return summary
+
+    return run_write(work)
+
+
+def refresh_from_file(path, fmt=None):
+    """Load a records file and refresh the statistics; returns the refresh summary and errors"""
+    fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    codes, ects = _catalog_codes()
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        columns = load_records(f, fmt, codes)
+    summary = refresh(columns, ects, source=path)
+    return {**summary, 'errors': columns.errors}
+
+
+######### READS #########
+
+def get_cohort_stats():
+    """Return the materialized statistics, or None before the first refresh"""
+    with get_db_connection() as conn:
+        refreshed = conn.execute('SELECT refreshed_at, records, students, skipped FROM cohort_refresh WHERE id = 1').fetchone()
+        if refreshed is None:
+            return None
+        courses = conn.execute('''
+            SELECT s.*, c.name, c.semester, c.ects FROM cohort_course_stats s
+            LEFT JOIN (SELECT code, MIN(id) AS id FROM courses GROUP BY code) first USING (code)
+            LEFT JOIN courses c ON c.id = first.id
+            ORDER BY c.semester, c.id
+        ''').fetchall()
+        specialities = conn.execute('SELECT * FROM cohort_speciality_stats ORDER BY speciality').fetchall()
+        semesters = conn.execute('SELECT * FROM cohort_semester_load ORDER BY semester').fetchall()
+    return {
+        **dict(refreshed),
+        'courses': [_course_row(row) for row in courses],
+        'specialities': [dict(row) for row in specialities],
+        'semester_load': [dict(row) for row in semesters],
+    }
+
+
+def get_course_cohort_stats(course_id):
+    """Return the statistics of a catalog course's code, or None if it has none"""
+    with get_db_connection() as conn:
+        row = conn.execute('''
+            SELECT s.*, c.name, c.semester, c.ects FROM courses c JOIN cohort_course_stats s ON s.code = c.code
+            WHERE c.id = ?
+        ''', (course_id,)).fetchone()
+    return _course_row(row) if row is not None else None
+
+
+def _course_row(row):
+    course = dict(row)
+    if course['grade_histogram'] is not None:
+        course['grade_histogram'] = json.loads(course['grade_histogram'])
+    return course
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='CSV or NDJSON file of student course records')
+    parser.add_argument('--format', choices=('csv', 'ndjson'), help='defaults to the file extension')
+    args = parser.parse_args()
+    migrate_database()
+    try:
+        result = refresh_from_file(args.path, args.format)
+    except (OSError, ValueError) as e:
+        print(f"Error refreshing cohort statistics: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        close_writer()
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,68 @@
+import csv
 import sqlite3
+from collections import OrderedDict
 from contextlib import contextmanager
 import os
+import queue
+import threading
+import time
+import uuid
+
+from greek_text import fold, fold_code, greeklish_key, words
+from metrics import (
+    registry, db_acquire, db_statements, db_fetch, db_write_wait, db_commit, db_batch_size, statement_label,
+    change_log_compactions, change_log_compacted_rows,
+)
 
 DATABASE_PATH = "courses.db"
+DEFAULT_STUDENT_ID = 1
+DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", "8"))  # also the server's read request thread limit
+# Request threads for write routes. They spend their time waiting for a group
+# commit, not on a pooled connection, so there are more of them than
+# connections; they bound how many writes one commit can hold.
+WRITE_THREADS = int(os.environ.get("WRITE_THREADS", "64"))
+DATABASE_TIMEOUT = 5.0  # seconds to wait for a free connection or the write lock
+STATEMENT_CACHE_SIZE = 256
+CACHED_STUDENTS = 4096  # per-student course state entries kept by the catalog cache
+SPECIALITY_COLUMNS = ('S1', 'S2', 'S3', 'S4', 'S5', 'S6')
+COURSE_STATUSES = ('Not Taken', 'Planned', 'Current Semester', 'Passed', 'Failed')
+# Range of the grade of a Passed course
+PASS_GRADE = 5.0
+MAX_GRADE = 10.0
+# Group commit: how long the writer waits for more writes to join a batch, and
+# the most writes it commits together
+GROUP_COMMIT_WINDOW = float(os.environ.get("GROUP_COMMIT_WINDOW", "0.002"))
+GROUP_COMMIT_MAX_BATCH = 256
 
-def init_database():
-    """Initialize the SQLite database with the courses and requirements tables"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    # Courses table
+# Applied once to every pooled connection. WAL lets readers run alongside the
+# single writer. In WAL mode synchronous=NORMAL only guards against corruption:
+# commits that were already reported can be lost on power failure or an OS
+# crash. That is fine for the pooled connections, which only read; everything
+# that commits data (the group-commit writer, migrate_database) runs with
+# synchronous=FULL instead.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+    f"PRAGMA busy_timeout = {int(DATABASE_TIMEOUT * 1000)}",
+)
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'catalog.csv')
+# Only prerequisites taken from the official study guide belong in the default
+# file, since the planner enforces them. data/prerequisites.example.csv is an
+# unverified set for development; point PREREQUISITES_PATH at it to use it.
+PREREQUISITES_PATH = os.environ.get("PREREQUISITES_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'prerequisites.csv')
+PREREQUISITE_KINDS = ('prerequisite', 'corequisite')
+
+######### SCHEMA #########
+
+def create_base_tables(cursor):
+    """Create the course catalog and profile tables"""
+    # Course catalog, shared by every student
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS courses (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -16,156 +70,10 @@ def init_database():
             code TEXT,
             ects INTEGER,
             semester INTEGER,
-            status TEXT,
             type TEXT,
-            direction TEXT,
-            S1 TEXT,
-            S2 TEXT,
-            S3 TEXT,
-            S4 TEXT,
-            S5 TEXT,
-            S6 TEXT,
-            grade REAL,
-            planned_semester INTEGER
+            direction TEXT
         )
     ''')
-
-    courses = [
-        # semester 1
-        ('Γραμμική Άλγεβρα', 'Κ03', 6, 1, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Διακριτά Μαθηματικά', 'Κ09', 7, 1, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Εισαγωγή στην Πληροφορική και στις Τηλεπικοινωνίες', 'ΓΠ07', 2, 1, 'Not Taken', 'ΓΠ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Εισαγωγή στον Προγραμματισμό', 'Κ04', 7, 1, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Εργαστήριο Λογικής Σχεδίασης', 'K02ε', 2, 1, 'Not Taken', 'ΕΡ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Λογική Σχεδίαση', 'Κ02', 6, 1, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-
-        # semester 2
-        ('Ανάλυση Ι', 'Κ01', 8, 2, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Αρχιτεκτονική Υπολογιστών Ι', 'Κ14', 7, 2, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Δομές Δεδομένων και Τεχνικές Προγραμματισμού', 'Κ08', 7, 2, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Εφαρμοσμένα Μαθηματικά', 'Κ20β', 6, 2, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, 'B', None, 0),
-        ('Ηλεκτρομαγνητισμός – Οπτική και Σύγχρονη Φυσική', 'Κ12', 8, 2, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-
-        # semester 3
-        ('Ανάλυση ΙΙ', 'Κ06', 8, 3, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Αντικειμενοστραφής Προγραμματισμός', 'Κ10', 8, 3, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Εργαστήριο Κυκλωμάτων και Συστημάτων', 'Κ11ε', 2, 3, 'Not Taken', 'ΕΡ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Πιθανότητες και Στατιστική', 'Κ13', 6, 3, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Σήματα και Συστήματα', 'Κ11', 6, 3, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-
-        # semester 4
-        ('Αλγόριθμοι και Πολυπλοκότητα', 'Κ17', 8, 4, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Δίκτυα Επικοινωνιών I', 'Κ16', 6, 4, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Εργαστήριο Δικτύων Επικοινωνιών Ι', 'Κ16ε', 2, 4, 'Not Taken', 'ΕΡ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Συστήματα Επικοινωνιών', 'Κ21', 7, 4, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Σχεδίαση και Χρήση Βάσεων Δεδομένων', 'Κ29', 7, 4, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-
-        # semester 5
-        ('Αριθμητική Ανάλυση', 'Κ15', 6, 5, 'Not Taken', 'ΕΥΜ', 'CS', 'Υ', None, None, None, None, None, None, 0),
-        ('Αρχές Γλωσσών Προγραμματισμού', 'ΘΠ01', 6, 5, 'Not Taken', 'ΠΜ', 'COM', 'B', 'B', None, None, None, None, None, 0),
-        ('Αρχιτεκτονική Υπολογιστών ΙΙ', 'Κ30', 6, 5, 'Not Taken', 'ΕΥΜ', 'CET', None, None, 'B', 'Υ', None, None, None, 0),
-        ('Γραφικά Ι', 'ΘΠ02', 6, 5, 'Not Taken', 'ΠΜ', 'COM', 'B', None, None, None, None, 'B', None, 0),
-        ('Δίκτυα Επικοινωνιών II', 'Κ33', 6, 5, 'Not Taken', 'ΕΥΜ', 'CET', None, None, None, None, 'Υ', None, None, 0),
-        ('Εργαστήριο Δικτύων Επικοινωνιών Ι', 'Κ16ε', 2, 5, 'Not Taken', 'ΕΡ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Κύματα, Κυματοδηγοί, Κεραίες', 'ΕΠ05', 6, 5, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, 'B', None, None, 0),
-        ('Λειτουργικά Συστήματα', 'Κ22', 8, 5, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Παράλληλα Συστήματα', 'ΘΠ04', 6, 5, 'Not Taken', 'ΠΜ', 'COM', None, None, 'B', 'B', None, None, None, 0),
-        ('Σχεδίαση Ψηφιακών Συστημάτων - VHDL', 'ΥΣ03', 6, 5, 'Not Taken', 'ΠΜ', 'COM', None, None, None, 'B', None, None, None, 0),
-        ('Τεχνητή Νοημοσύνη I', 'ΥΣ02', 6, 5, 'Not Taken', 'ΠΜ', 'COM', None, 'B', 'B', None, None, None, None, 0),
-        ('Τηλεπικοινωνιακά Δίκτυα', 'ΕΠ20', 6, 5, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, 'B', None, None, 0),
-        ('Υλοποίηση Συστημάτων Βάσεων Δεδομένων', 'Κ18', 6, 5, 'Not Taken', 'ΕΥΜ', 'CS', None, 'Υ', 'Υ', None, None, None, None, 0),
-        ('Ψηφιακή Επεξεργασία Σήματος', 'Κ32', 6, 5, 'Not Taken', 'ΕΥΜ', 'CET', None, None, None, None, None, 'Υ', None, 0),
-
-        # semester 6
-        ('Αλγόριθμοι-Θεμελιώσεις Μηχανικής Μάθησης', 'ΘΠ16β', 6, 6, 'Not Taken', 'ΠΜ', 'COM', 'B', 'B', None, None, None, None, None, 0),
-        ('Αναγνώριση Προτύπων–Μηχανική Μάθηση', 'ΕΠ08', 6, 6, 'Not Taken', 'ΠΜ', 'COM', 'B', 'B', None, None, None, 'B', None, 0),
-        ('Ανάλυση/Σχεδίαση Συστημάτων Λογισμικού', 'ΥΣ04', 6, 6, 'Not Taken', 'ΠΜ', 'COM', None, None, 'B', None, None, None, None, 0),
-        ('Ασύρματα Δίκτυα Αισθητήρων', 'ΥΣ18', 6, 6, 'Not Taken', 'ΠΜ', 'COM', None, None, None, 'B', 'B', None, None, 0),
-        ('Διαχείριση Δικτύων', 'Κ34', 6, 6, 'Not Taken', 'ΕΥΜ', 'CET', None, None, None, None, 'Υ', None, None, 0),
-        ('Ειδικά Θέματα Επικοινωνιών και Επεξεργασίας Σήματος – Πολυμέσα και Ασύρματη Δικτύωση', 'ΕΠ22β', 4, 6, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Επεξεργασία Στοχαστικών Σημάτων', 'ΕΠ07', 6, 6, 'Not Taken', 'ΠΜ', 'CET', None, None, None, None, 'B', 'B', None, 0),
-        ('Επιστημονικοί Υπολογισμοί', 'ΘΠ03', 6, 6, 'Not Taken', 'ΠΜ', 'COM', 'B', None, None, None, None, None, None, 0),
-        ('Εργαστήριο Ηλεκτρονικής', 'Κ19ε', 6, 6, 'Not Taken', 'ΠΜ', 'COM', None, None, None, 'B', None, None, None, 0),
-        ('Ηλεκτρονική', 'K19', 6, 6, 'Not Taken', 'ΕΥΜ', 'CET', None, None, None, 'Υ', None, None, None, 0),
-        ('Θεωρία Πληροφορίας και Κωδίκων', 'Κ35', 6, 6, 'Not Taken', 'ΕΥΜ', 'CET', None, None, None, None, None, 'Υ', None, 0),
-        ('Θεωρία Υπολογισμού', 'Κ25', 6, 6, 'Not Taken', 'ΕΥΜ', 'CS', None, 'Υ', None, None, None, None, None, 0),
-        ('Λογικός Προγραμματισμός', 'ΥΣ05', 6, 6, 'Not Taken', 'ΠΜ', 'COM', None, 'B', None, None, None, None, None, 0),
-        ('Μαθηματικά Πληροφορικής', 'Κ20α', 6, 6, 'Not Taken', 'ΕΥΜ', 'CS', 'Υ', None, None, None, None, None, None, 0),
-        ('Μεταγλωττιστές', 'Κ31', 6, 6, 'Not Taken', 'ΕΥΜ', 'CS', None, None, 'Υ', 'B', None, None, None, 0),
-        ('Προγραμματισμός Συστήματος', 'Κ24', 8, 6, 'Not Taken', 'ΥΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Τεχνητή Νοημοσύνη ΙΙ (Βαθιά Μηχανική Μάθηση για την Επεξεργασία Φυσικής Γλώσσας)', 'ΥΣ19', 6, 6, 'Not Taken', 'ΠΜ', 'COM', None, 'B', None, None, None, None, None, 0),
-        ('Τεχνικές Εξόρυξης Δεδομένων', 'ΥΣ11', 6, 6, 'Not Taken', 'ΠΜ', 'COM', None, 'B', None, None, None, None, None, 0),
-        ('Τεχνολογίες Εφαρμογών Διαδικτύου', 'ΥΣ14', 6, 6, 'Not Taken', 'ΠΜ', 'COM', None, None, 'B', None, 'B', None, None, 0),
-
-        # semester 7
-        ('Αλγοριθμική Επιχειρησιακή Έρευνα', 'ΘΠ09', 6, 7, 'Not Taken', 'ΠΜ', 'COM', 'B', 'B', None, None, None, 'B', None, 0),
-        ('Ανάπτυξη Λογισμικού για Αλγοριθμικά Προβλήματα', 'Κ23γ', 8, 7, 'Not Taken', 'Project', 'CS', None, None, None, None, None, None, None, 0),
-        ('Ανάπτυξη Λογισμικού για Πληροφοριακά Συστήματα', 'Κ23α', 8, 7, 'Not Taken', 'Project', 'CS', None, None, None, None, None, None, None, 0),
-        ('Ανάπτυξη Λογισμικού για Συστήματα Δικτύων και Τηλεπικοινωνιών', 'Κ23β', 8, 7, 'Not Taken', 'Project', 'CET', None, None, None, None, None, None, None, 0),
-        ('Διδακτική της Πληροφορικής', 'ΥΣ10', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Δομή και Θεσμοί της Ευρωπαϊκής Ένωσης', 'ΓΠ03', 2, 7, 'Not Taken', 'ΓΠ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ειδικά Θέματα Επικοινωνιών και Επεξεργασίας Σήματος: Ειδικά Θέματα Κβαντικής Πληροφορίας και Υπολογιστικής', 'ΕΠ22δ', 4, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ειδικά Θέματα Υπολογιστικών Συστημάτων και Εφαρμογών', 'ΥΣ16', 4, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ειδικά Θέματα Υπολογιστικών Συστημάτων και Εφαρμογών – Τεχνολογίες Γνώσεων', 'ΥΣ16β', 4, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ενισχυτική Μηχανική Μάθηση και Στοχαστικά Παίγνια', 'ΕΠ22α', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Επικοινωνία Ανθρώπου Μηχανής', 'ΥΣ08', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, 'B', 'B', None, None, None, None, 0),
-        ('Ηλεκτρονική Διακυβέρνηση', 'ΥΣ17', 4, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Θεωρία Αριθμών', 'ΘΠ08', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Οπτικές Επικοινωνίες και Οπτικά Δίκτυα', 'ΕΠ16', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, 'B', 'B', None, None, 0),
-        ('Πληροφοριακά Συστήματα', 'ΥΣ07', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Πρακτική I', 'ΠΡ1', 8, 7, 'Not Taken', 'ΠΡ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Προηγμένα Θέματα Αλγορίθμων', 'ΘΠ12', 6, 7, 'Not Taken', 'ΠΜ', 'COM', 'B', None, None, None, None, None, None, 0),
-        ('Προηγμένοι Επιστημονικοί Υπολογισμοί', 'ΘΠ18', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Πτυχιακή I', 'ΠΤ1', 8, 7, 'Not Taken', 'ΠΤ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Συστήματα Κινητών και Προσωπικών Επικοινωνιών', 'ΕΠ18', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, 'B', None, None, 0),
-        ('Συστήματα Ψηφιακής Επεξεργασίας Σημάτων σε Πραγματικό Χρόνο', 'ΕΠ11', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, 'B', None, 'B', None, 0),
-        ('Σχεδίαση VLSI Κυκλωμάτων', 'ΕΠ01', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, 'B', None, None, None, 0),
-        ('Τεχνολογίες της Πληροφορίας και των Επικοινωνιών (ΤΠΕ) στη Μάθηση', 'ΥΣ15', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Υπολογιστική Πολυπλοκότητα', 'ΘΠ20', 6, 7, 'Not Taken', 'ΠΜ', 'COM', 'B', None, None, None, None, None, None, 0),
-        ('Ψηφιακή Προσβασιμότητα και Υποστηρικτικές Τεχνολογίες Πληροφορικής', 'ΥΣ22', 6, 7, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-
-        # semester 8
-        ('Αλγοριθμική Επίλυση Προβλημάτων', 'ΘΠ24', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ανάλυση Εικόνας και Τεχνητή Όραση', 'ΕΠ23', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ανάπτυξη Υλικού-Λογισμικού για Ενσωματωμένα Συστήματα', 'Κ23δ', 8, 8, 'Not Taken', 'Project', 'CET', None, None, None, None, None, None, None, 0),
-        ('Ασύρματες Zεύξεις', 'ΕΠ13', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Διοίκηση Έργων και Τεχνικές Παρουσίασης και Συγγραφής Επιστημονικών Εκθέσεων', 'ΓΠ05', 2, 8, 'Not Taken', 'ΓΠ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ειδικά Θέματα Επικοινωνιών και Επεξεργασίας Σήματος: Γραμμές μεταφοράς, κυματοδηγοί και οπτικές ίνες', 'ΕΠ22γ', 4, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ειδικά Θέματα Επικοινωνιών και Επεξεργασίας Σήματος: Ειδικά Θέματα Κβαντικής Μηχανικής Μάθησης', 'ΕΠ22ε', 4, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ειδικά Θέματα Θεωρητικής Πληροφορικής: Αλγόριθμοι Δομικής Βιοπληροφορικής', 'ΘΠ16δ', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ειδικά Θέματα Υπολογιστικών Συστημάτων και Εφαρμογών', 'ΥΣ16', 4, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ειδικά Θέματα Υπολογιστικών Συστημάτων και Εφαρμογών: Υπολογιστικά Συστήματα Μεγάλης Κλίμακας', 'ΥΣ16α', 4, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Επεξεργασία Εικόνας', 'ΕΠ10', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, 'B', None, 0),
-        ('Επεξεργασία Ομιλίας και Φυσικής Γλώσσας', 'ΕΠ19', 6, 8, 'Not Taken', 'ΠΜ', 'CET', None, None, None, None, None, 'B', None, 0),
-        ('Θεωρία Γραφημάτων', 'ΘΠ10', 6, 8, 'Not Taken', 'ΠΜ', 'COM', 'B', None, None, None, None, None, None, 0),
-        ('Ιστορία της Πληροφορικής και των Τηλεπικοινωνιών', 'ΥΣ20', 4, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Καινοτομία και Επιχειρηματικότητα', 'ΥΣ12', 4, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Κρυπτογραφία', 'ΘΠ05', 6, 8, 'Not Taken', 'ΠΜ', 'COM', 'B', None, None, None, None, None, None, 0),
-        ('Μικροοικονομική Ανάλυση', 'ΕΠ24', 4, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Μουσική Πληροφορική', 'ΕΠ21', 4, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, 'B', None, 0),
-        ('Παράλληλοι Αλγόριθμοι', 'ΘΠ19', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Πρακτική II', 'ΠΡ2', 8, 8, 'Not Taken', 'ΠΡ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Προστασία και Ασφάλεια Υπολογιστικών Συστημάτων', 'ΥΣ13', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, 'B', None, None, None, None, 0),
-        ('Πτυχιακή IΙ', 'ΠΤ2', 8, 8, 'Not Taken', 'ΠΤ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Σημασιολογία Γλωσσών Προγραμματισμού', 'ΘΠ16α', 6, 8, 'Not Taken', 'ΠΜ', 'COM', 'B', 'B', None, None, None, None, None, 0),
-        ('Σχολική Τάξη & Μικροδιδασκαλία', 'ΥΣ21', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Τεχνολογία Λογισμικού', 'ΥΣ09', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, 'B', None, None, None, None, 0),
-        ('Υπολογιστική Γεωμετρία', 'ΘΠ11', 6, 8, 'Not Taken', 'ΠΜ', 'COM', 'B', None, None, None, None, None, None, 0),
-        ('Υπολογιστική Θεωρία Μηχανικής Μάθησης', 'ΘΠ23', 6, 8, 'Not Taken', 'ΠΜ', 'COM', 'B', 'B', None, None, None, None, None, 0),
-        ('Φωτονική', 'ΕΠ12', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, None, None, None, 0),
-        ('Ψηφιακές Επικοινωνίες', 'ΕΠ04', 6, 8, 'Not Taken', 'ΠΜ', 'COM', None, None, None, None, 'B', None, None, 0)
-    ]
-    try:
-        for name, code, ects, semester, status, type_, direction, S1, S2, S3, S4, S5, S6, grade, planned_semester in courses:
-            cursor.execute(
-                '''INSERT OR IGNORE INTO courses (name, code, ects, semester, status, type, direction, S1, S2, S3, S4, S5, S6, grade, planned_semester)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                (name, code, ects, semester, status, type_, direction, S1, S2, S3, S4, S5, S6, None, 0)
-            )
-        conn.commit()
-    except Exception as e:
-        print(f"Error inserting courses: {str(e)}")
-
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS profile (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -178,49 +86,1213 @@ def init_database():
         )
     ''')
 
-    profile = [
-        (0, None, None, 0, None, 'en')
-    ]
-    try:
-        for sdi, first_name, last_name, current_semester, direction, language in profile:
+def create_course_speciality_table(cursor):
+    """Create the speciality membership table.
+
+    One row per (speciality, course) with the course's role in it: 'Υ' for a
+    compulsory course of the speciality, 'B' for a basic one. The primary key
+    leads with the speciality so listing a speciality is a range scan of the
+    table itself.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS course_speciality (
+            speciality TEXT NOT NULL,
+            course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+            role TEXT NOT NULL,
+            PRIMARY KEY (speciality, course_id)
+        ) WITHOUT ROWID
+    ''')
+
+def create_student_courses_table(cursor):
+    """Create the per-student course state table.
+
+    Only courses a student has touched get a row; everything else reads as
+    'Not Taken' with no grade or planned semester, so a new student costs
+    nothing until they start editing.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS student_courses (
+            student_id INTEGER NOT NULL REFERENCES profile(id) ON DELETE CASCADE,
+            course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+            status TEXT NOT NULL DEFAULT 'Not Taken',
+            grade REAL,
+            planned_semester INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, course_id)
+        ) WITHOUT ROWID
+    ''')
+
+def create_indexes_and_views(cursor):
+    """Create the secondary indexes and the catalog view"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_semester ON courses (semester)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_code ON courses (code)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_name ON courses (name)')
+    # Covers "which specialities is this course in" without touching the table
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_speciality_course ON course_speciality (course_id, speciality, role)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_courses_status ON student_courses (student_id, status)')
+    # The catalog in its historical shape, with one S1..S6 column per speciality;
+    # each column is a primary key lookup in course_speciality.
+    speciality_columns = ',\n'.join(
+        f"(SELECT role FROM course_speciality WHERE speciality = '{s}' AND course_id = c.id) AS {s}"
+        for s in SPECIALITY_COLUMNS
+    )
+    cursor.execute(f'''
+        CREATE VIEW IF NOT EXISTS catalog AS
+        SELECT c.id, c.name, c.code, c.ects, c.semester, c.type, c.direction,
+               {speciality_columns}
+        FROM courses c
+    ''')
+
+def create_course_prerequisites_table(cursor):
+    """Create the prerequisite graph of the catalog.
+
+    One row per edge: course_id needs requires_id passed in an earlier
+    semester ('prerequisite') or at the latest in the same one
+    ('corequisite'). The reverse index answers "what needs this course".
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS course_prerequisites (
+            course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+            requires_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL CHECK (kind IN ('prerequisite', 'corequisite')),
+            PRIMARY KEY (course_id, requires_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_prerequisites_requires ON course_prerequisites (requires_id, course_id)')
+
+def create_cohort_stats_tables(cursor):
+    """Create the materialized cohort statistics filled by cohort_stats.refresh.
+
+    Courses are keyed by code, since the records are, and every table is
+    replaced as a whole on refresh. cohort_refresh holds the single row that
+    describes the last refresh.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_course_stats (
+            code TEXT PRIMARY KEY,
+            records INTEGER NOT NULL,
+            students INTEGER NOT NULL,
+            passed INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            in_progress INTEGER NOT NULL,
+            planned INTEGER NOT NULL,
+            pass_rate REAL,
+            mean_grade REAL,
+            grade_stddev REAL,
+            grade_histogram TEXT
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_speciality_stats (
+            speciality TEXT PRIMARY KEY,
+            courses INTEGER NOT NULL,
+            records INTEGER NOT NULL,
+            passed INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            pass_rate REAL,
+            mean_grade REAL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_semester_load (
+            semester INTEGER PRIMARY KEY,
+            students INTEGER NOT NULL,
+            mean_ects REAL,
+            p25_ects REAL,
+            median_ects REAL,
+            p75_ects REAL,
+            p90_ects REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_refresh (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            refreshed_at TEXT NOT NULL,
+            source TEXT,
+            records INTEGER NOT NULL,
+            students INTEGER NOT NULL,
+            skipped INTEGER NOT NULL,
+            seconds REAL NOT NULL
+        )
+    ''')
+
+def create_course_search(cursor):
+    """Create the full-text index over course names and codes.
+
+    Rows are filled by sync_course_search with text folded in Python (accents,
+    case, Greeklish), so the tokenizer only has to split words.
+    """
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS course_search USING fts5(
+            name, greeklish, code,
+            tokenize = 'unicode61 remove_diacritics 0',
+            prefix = '1 2 3'
+        )
+    ''')
+
+def sync_course_search(cursor):
+    """Rebuild course_search if it does not hold exactly the catalog courses"""
+    indexed = [row[0] for row in cursor.execute('SELECT rowid FROM course_search ORDER BY rowid')]
+    courses = cursor.execute('SELECT id, name, code FROM courses ORDER BY id').fetchall()
+    if indexed == [row[0] for row in courses]:
+        return
+    cursor.execute('DELETE FROM course_search')
+    cursor.executemany(
+        'INSERT INTO course_search (rowid, name, greeklish, code) VALUES (?, ?, ?, ?)',
+        [(course_id, fold(name), greeklish_key(name), greeklish_key(code)) for course_id, name, code in courses]
+    )
+
+def create_change_log(cursor):
+    """Create the change log and the triggers that fill it.
+
+    Every insert or update of a student's course state or profile appends a
+    row, in the same transaction as the write, whichever code path (or the
+    sqlite3 shell) made it. The row id is the sync version handed to clients
+    by get_changes_since. Rows with a NULL student_id are resync markers:
+    whatever happened before them (a migration, compacted history) cannot be
+    replayed, so clients that synced earlier get everything again.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            table_name TEXT NOT NULL,
+            course_id INTEGER
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_log_student ON change_log (student_id, version)')
+    for event in ('INSERT', 'UPDATE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS log_student_courses_{event.lower()} AFTER {event} ON student_courses
+            BEGIN
+                INSERT INTO change_log (student_id, table_name, course_id)
+                VALUES (NEW.student_id, 'student_courses', NEW.course_id);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS log_profile_{event.lower()} AFTER {event} ON profile
+            BEGIN
+                INSERT INTO change_log (student_id, table_name) VALUES (NEW.id, 'profile');
+            END
+        ''')
+
+def move_course_state_to_students(cursor):
+    """Move per-student state off the catalog rows.
+
+    Older databases kept status/grade/planned_semester on the catalog rows for
+    the single profile with id 1; those values are copied into student_courses
+    and the columns are dropped.
+    """
+    create_student_courses_table(cursor)
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(courses)')}
+    if 'status' in columns:
+        cursor.execute('''
+            INSERT OR IGNORE INTO student_courses (student_id, course_id, status, grade, planned_semester)
+            SELECT p.id, c.id, COALESCE(c.status, 'Not Taken'), c.grade, COALESCE(c.planned_semester, 0)
+            FROM courses c JOIN profile p ON p.id = 1
+            WHERE COALESCE(c.status, 'Not Taken') != 'Not Taken'
+               OR c.grade IS NOT NULL
+               OR COALESCE(c.planned_semester, 0) != 0
+        ''')
+        for column in ('status', 'grade', 'planned_semester'):
+            cursor.execute(f'ALTER TABLE courses DROP COLUMN {column}')
+
+def move_specialities_to_table(cursor):
+    """Move speciality membership stored in S1..S6 columns to course_speciality"""
+    create_course_speciality_table(cursor)
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(courses)')}
+    for s in SPECIALITY_COLUMNS:
+        if s in columns:
             cursor.execute(
-                '''INSERT OR IGNORE INTO profile (sdi, first_name, last_name, current_semester, direction, language)
-                VALUES (?, ?, ?, ?, ?, ?)''',
-                (sdi, first_name, last_name, current_semester, direction, language)
+                f'''INSERT OR IGNORE INTO course_speciality (speciality, course_id, role)
+                SELECT ?, id, {s} FROM courses WHERE {s} IS NOT NULL''',
+                (s,)
             )
-        conn.commit()
-    except Exception as e:
-        print(f"Error inserting profile data: {str(e)}")
+            cursor.execute(f'ALTER TABLE courses DROP COLUMN {s}')
 
+# Applied in order, each at most once per database; the applied versions are
+# recorded in schema_migrations. Every migration must also be safe to run on a
+# database that predates versioning and already has some of its changes.
+# Append new migrations at the end, never edit or reorder applied ones.
+MIGRATIONS = (
+    (1, 'base tables', create_base_tables),
+    (2, 'per-student course state', move_course_state_to_students),
+    (3, 'speciality membership table', move_specialities_to_table),
+    (4, 'indexes and catalog view', create_indexes_and_views),
+    (5, 'course search index', create_course_search),
+    (6, 'change log', create_change_log),
+    (7, 'course prerequisites', create_course_prerequisites_table),
+    (8, 'cohort statistics', create_cohort_stats_tables),
+)
 
-######### GET ENDPOINTS #########
+def _prerequisite_cycle(rows):
+    """A cycle in the prerequisites file as a list of codes, or None
+
+    Found with a depth-first topological sort over the codes as the file
+    spells them, so the error names courses the way the file does.
+    """
+    spelling = {}
+    needs = {}
+    for row in rows:
+        code, requires = fold_code(row['code']), fold_code(row['requires'])
+        spelling.setdefault(code, row['code'])
+        spelling.setdefault(requires, row['requires'])
+        needs.setdefault(code, []).append(requires)
+    done = set()
+    for start in needs:
+        if start in done:
+            continue
+        path = [start]
+        on_path = {start}
+        stack = [iter(needs.get(start, ()))]
+        while stack:
+            code = next(stack[-1], None)
+            if code is None:
+                stack.pop()
+                done.add(path[-1])
+                on_path.discard(path.pop())
+            elif code in on_path:
+                cycle = path[path.index(code):] + [code]
+                return [spelling[c] for c in cycle]
+            elif code not in done:
+                path.append(code)
+                on_path.add(code)
+                stack.append(iter(needs.get(code, ())))
+    return None
+
+def seed_prerequisites(cursor, path=None):
+    """Make course_prerequisites match the prerequisites file.
+
+    The file names courses by code; a code shared by several catalog rows
+    (a course listed in two semesters) applies to each of them. Edges that
+    are no longer in the file are removed, so correcting the file corrects
+    existing databases on the next start. A file whose requirements form a
+    cycle is rejected before anything is written.
+    """
+    by_code = {}
+    for course_id, code in cursor.execute('SELECT id, code FROM courses'):
+        by_code.setdefault(fold_code(code), []).append(course_id)
+    with open(path or PREREQUISITES_PATH, encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    edges = []
+    for row in rows:
+        if row['kind'] not in PREREQUISITE_KINDS:
+            raise ValueError(f"Invalid prerequisite kind: {row['kind']}. Must be one of {list(PREREQUISITE_KINDS)}")
+        courses = by_code.get(fold_code(row['code']))
+        requires = by_code.get(fold_code(row['requires']))
+        if not courses or not requires:
+            raise ValueError(f"Unknown course code in prerequisites: {row['code'] if not courses else row['requires']}")
+        edges.extend((course_id, requires_id, row['kind']) for course_id in courses for requires_id in requires)
+    cycle = _prerequisite_cycle(rows)
+    if cycle:
+        raise ValueError(f"Prerequisite cycle in {path or PREREQUISITES_PATH}: {' -> '.join(cycle)}")
+    edges = {(course_id, requires_id): kind for course_id, requires_id, kind in edges}
+    current = {(course_id, requires_id): kind for course_id, requires_id, kind in
+               cursor.execute('SELECT course_id, requires_id, kind FROM course_prerequisites')}
+    if current == edges:
+        return
+    cursor.execute('DELETE FROM course_prerequisites')
+    cursor.executemany(
+        'INSERT INTO course_prerequisites (course_id, requires_id, kind) VALUES (?, ?, ?)',
+        [(course_id, requires_id, kind) for (course_id, requires_id), kind in edges.items()]
+    )
+
+def seed_catalog(cursor, path=CATALOG_PATH):
+    """Load the course catalog and the default profile into empty tables"""
+    if cursor.execute('SELECT 1 FROM courses LIMIT 1').fetchone() is None:
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        # Ids follow the file order, which keeps them stable across fresh databases
+        cursor.executemany(
+            '''INSERT INTO courses (id, name, code, ects, semester, type, direction)
+            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            [(course_id, row['name'], row['code'], int(row['ects']), int(row['semester']), row['type'], row['direction'])
+             for course_id, row in enumerate(rows, start=1)]
+        )
+        cursor.executemany(
+            'INSERT INTO course_speciality (speciality, course_id, role) VALUES (?, ?, ?)',
+            [(s, course_id, row[s])
+             for course_id, row in enumerate(rows, start=1)
+             for s in SPECIALITY_COLUMNS if row[s]]
+        )
+    if cursor.execute('SELECT 1 FROM profile LIMIT 1').fetchone() is None:
+        cursor.execute(
+            '''INSERT INTO profile (sdi, first_name, last_name, current_semester, direction, language)
+            VALUES (0, NULL, NULL, 0, NULL, 'en')'''
+        )
+
+def migrate_database():
+    """Create or upgrade the database to the latest schema version.
+
+    Pending migrations and the catalog seed run in one transaction, so a
+    failure leaves the database as it was and concurrent starts wait for the
+    first one instead of racing it. Student data is never dropped. Returns
+    the versions that were applied.
+    """
+    conn = sqlite3.connect(DATABASE_PATH, timeout=DATABASE_TIMEOUT, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous = FULL")
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            applied = {row[0] for row in cursor.execute('SELECT version FROM schema_migrations')}
+            pending = [m for m in MIGRATIONS if m[0] not in applied]
+            for version, name, migrate in pending:
+                migrate(cursor)
+                cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)', (version, name))
+            seed_catalog(cursor)
+            seed_prerequisites(cursor)
+            sync_course_search(cursor)
+            if pending:
+                # The schema or catalog may have changed under every client
+                cursor.execute("INSERT INTO change_log (student_id, table_name) VALUES (NULL, 'resync')")
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    if pending:
+        _record_write()
+    return [version for version, _, _ in pending]
+
+def init_database():
+    """Initialize the SQLite database with the courses and requirements tables"""
+    migrate_database()
+
+
+######### CONNECTION POOL #########
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that records the time of every statement in the metrics module"""
+
+    _label = None
+
+    def execute(self, sql, parameters=()):
+        self._label = statement_label(sql)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            db_statements.observe(time.perf_counter() - start, self._label)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._label = statement_label(sql)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            db_statements.observe(time.perf_counter() - start, self._label)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            db_fetch.observe(time.perf_counter() - start, self._label)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            db_fetch.observe(time.perf_counter() - start, self._label)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the implicit one of execute(), are instrumented"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections.
+
+    A thread keeps the connection it checked out for as long as it is inside
+    a ``connection()`` block, so nested helpers reuse it instead of opening a
+    second one. Connections keep their statement cache between checkouts,
+    which is what makes the prepared statements of the helpers reusable.
+    """
+
+    def __init__(self, database_path, pool_size=DATABASE_POOL_SIZE, timeout=DATABASE_TIMEOUT):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.database_path = database_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._local = threading.local()
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=InstrumentedConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection available after {self.timeout}s")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn):
+        # A helper that raised before committing must not leave the write
+        # lock held for the next borrower.
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        start = time.perf_counter()
+        conn = self._acquire()
+        db_acquire.observe(time.perf_counter() - start)
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._release(conn)
+
+    def close(self):
+        """Close every idle connection; busy ones are closed on release"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed or _pool.database_path != DATABASE_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DATABASE_PATH)
+        return _pool
+
+def close_pool():
+    """Close the process-wide pool and writer (called on application shutdown)"""
+    global _pool
+    catalog_cache.close()
+    close_writer()
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
 
 @contextmanager
 def get_db_connection():
     """Context manager for database connections"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
+    with get_pool().connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
-def get_all_courses():
-    """Return all courses as a list of dicts"""
+######### WRITER #########
+
+class _WriteJob:
+    __slots__ = ('work', 'done', 'result', 'error')
+
+    def __init__(self, work):
+        self.work = work
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Queued to wake the writer when idle work is handed to it
+_WAKE = object()
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued writes in groups.
+
+    Handlers submit a function that performs their write on the writer's
+    connection. The writer takes every write that is already queued, waits up
+    to ``window`` seconds for more, and runs them in one transaction with a
+    savepoint each, so a failing write is rolled back on its own without
+    failing the rest of the batch. The batch is committed with one fsync
+    (synchronous=FULL on this connection) and only then is each submitter
+    woken up with its result.
+
+    Maintenance that no request waits for is handed over with when_idle and
+    runs in a transaction of its own once no write is queued.
+    """
+
+    def __init__(self, database_path, window=GROUP_COMMIT_WINDOW, max_batch=GROUP_COMMIT_MAX_BATCH):
+        self.database_path = database_path
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._idle = None
+        self._closed = False
+        self.batches = 0
+        self.writes = 0
+        self.largest_batch = 0
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, work):
+        """Run work(conn) in the next group commit and return its result once durable.
+
+        Exceptions raised by work are re-raised here, after its changes have
+        been rolled back.
+        """
+        if self._closed:
+            raise RuntimeError("Writer is closed")
+        job = _WriteJob(work)
+        start = time.perf_counter()
+        self._queue.put(job)
+        job.done.wait()
+        db_write_wait.observe(time.perf_counter() - start)
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def when_idle(self, work, done):
+        """Run work(conn) once no write is waiting, then call done(result, error) on the writer thread.
+
+        Returns immediately. A second call before the first ran replaces it;
+        done must not raise.
+        """
+        self._idle = (work, done)
+        self._queue.put(_WAKE)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database_path,
+            timeout=DATABASE_TIMEOUT,
+            isolation_level=None,  # transactions are managed explicitly below
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=InstrumentedConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute("PRAGMA synchronous = FULL")
+        return conn
+
+    def _next_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if job is None:
+                # Close requested: finish this batch, then stop
+                self._queue.put(None)
+                break
+            if job is _WAKE:
+                continue
+            batch.append(job)
+        return batch
+
+    def _commit(self, conn, batch):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except Exception as e:
+            for job in batch:
+                job.error = e
+            return
+        for job in batch:
+            conn.execute('SAVEPOINT write_job')
+            try:
+                job.result = job.work(conn)
+            except Exception as e:
+                job.error = e
+                conn.execute('ROLLBACK TO write_job')
+            conn.execute('RELEASE write_job')
+        try:
+            # Until _record_write runs for these jobs, readers must not take
+            # this commit for someone else's
+            with catalog_cache.own_commit():
+                conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for job in batch:
+                if job.error is None:
+                    job.error = e
+                    job.result = None
+
+    def _run(self):
+        conn = None
+        while True:
+            if self._idle is not None and self._queue.empty():
+                (work, done), self._idle = self._idle, None
+                job = _WriteJob(work)
+                try:
+                    if conn is None:
+                        conn = self._connect()
+                    self._commit(conn, [job])
+                except Exception as e:
+                    job.error = job.error or e
+                done(job.result, job.error)
+                continue
+            job = self._queue.get()
+            if job is None:
+                break
+            if job is _WAKE:
+                continue
+            batch = self._next_batch(job)
+            start = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self._commit(conn, batch)
+            except Exception as e:
+                for job in batch:
+                    if job.error is None:
+                        job.error = e
+            db_commit.observe(time.perf_counter() - start)
+            db_batch_size.observe(len(batch))
+            self.batches += 1
+            self.writes += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for job in batch:
+                job.done.set()
+        if conn is not None:
+            conn.close()
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'writes': self.writes,
+            'largest_batch': self.largest_batch,
+            'queued': self._queue.qsize(),
+        }
+
+    def close(self):
+        """Commit what is queued, then stop the writer thread"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            # Writes submitted while closing never reached the writer
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job.error = RuntimeError("Writer is closed")
+                    job.done.set()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Return the process-wide writer, starting it on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer._closed or _writer.database_path != DATABASE_PATH:
+            if _writer is not None:
+                _writer.close()
+            _writer = GroupCommitWriter(DATABASE_PATH)
+        return _writer
+
+def close_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+registry.gauge(
+    'db_write_queue_depth', 'Writes waiting for the group-commit writer.',
+    lambda: {(): _writer.stats()['queued'] if _writer is not None else 0})
+
+def run_write(work):
+    """Run work(conn) through the group-commit writer and return its result"""
+    return get_writer().submit(work)
+
+######### DATA VERSION #########
+
+class DataVersion:
+    """Monotonic write counter used to answer conditional GETs.
+
+    Every write helper in this module bumps it after committing, either for one
+    student or globally (catalog changes, resets). A student's version is the
+    newest of their own bumps and the last global one, so one student's edits
+    do not invalidate everyone else's cached responses. The counter lives in
+    process memory: it assumes a single server process owns the database.
+    """
+
+    def __init__(self):
+        # Distinguishes counters across restarts, since they start at 0 again
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._global = (0, time.time())
+        self._students = {}
+        self._writes = {}
+
+    def bump(self, student_id=None):
+        with self._lock:
+            self._counter += 1
+            stamp = (self._counter, time.time())
+            if student_id is None:
+                self._global = stamp
+                self._students.clear()
+                self._writes.clear()
+            else:
+                self._students[student_id] = stamp
+                self._writes[student_id] = self._writes.get(student_id, 0) + 1
+            return self._counter
+
+    def for_student(self, student_id):
+        """Return (version, modified_at) for the data visible to a student"""
+        with self._lock:
+            return max(self._global, self._students.get(student_id, self._global))
+
+    def writes_for_student(self, student_id):
+        """Return (writes, version) read together; writes counts the student's bumps since the last global one"""
+        with self._lock:
+            return self._writes.get(student_id, 0), max(self._global, self._students.get(student_id, self._global))[0]
+
+
+data_version = DataVersion()
+_change_listeners = []
+
+def add_change_listener(listener):
+    """Register listener(table, student_id, keys) to run after every committed write.
+
+    table is 'student_courses' (keys are course ids) or 'profile' (keys are
+    field names). Catalog-wide changes such as initialization or migrations
+    are reported with table and student_id set to None.
+    """
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+def _record_write(table=None, student_id=None, keys=()):
+    """Bump the data version and notify listeners after a commit"""
+    catalog_cache.on_write(table, student_id)
+    version = data_version.bump(student_id)
+    if table is not None and version % CHANGE_LOG_COMPACT_EVERY == 0:
+        # Compaction scans the whole log; the writer runs it between batches
+        # rather than this request, or the writes queued behind it, paying for it
+        get_writer().when_idle(_compact_change_log, _change_log_compacted)
+    keys = tuple(keys)
+    for listener in _change_listeners:
+        # The write is already committed; a failing listener must not turn it
+        # into an error for the caller.
+        try:
+            listener(table, student_id, keys)
+        except Exception as e:
+            print(f"Error in change listener {listener!r}: {str(e)}")
+
+######### CATALOG CACHE #########
+
+# Keys of the course dicts returned by the getters, in STUDENT_COURSES_QUERY order
+COURSE_KEYS = ('id', 'name', 'code', 'ects', 'semester', 'status', 'type', 'direction',
+               *SPECIALITY_COLUMNS, 'grade', 'planned_semester')
+DEFAULT_COURSE_STATE = ('Not Taken', None, 0)
+
+class CatalogCache:
+    """Read-through cache of the course catalog and per-student course state.
+
+    The catalog is held as immutable tuples in display order, together with an
+    id index and one id slice per speciality. Course state is cached per
+    student (LRU-bounded) as {course_id: (status, grade, planned_semester)}.
+    Writes through this module drop exactly the entries they touch; writes by
+    anything else (another process, the sqlite3 shell) are caught by polling
+    PRAGMA data_version on a dedicated connection, which drops everything.
+
+    The lock only guards the cached entries and the data_version bookkeeping;
+    loads from the database run without it, so a cold load never holds up
+    other readers or the writer thread. A load that overlapped a write that
+    drops what it read is returned but not cached.
+    """
+
+    def __init__(self, max_students=CACHED_STUDENTS):
+        self.max_students = max_students
+        self._lock = threading.RLock()
+        self._catalog = None
+        self._by_id = None
+        self._by_speciality = None
+        self._states = OrderedDict()
+        # Bumped whenever everything is dropped; per student, [loads in
+        # flight, writes seen meanwhile]
+        self._generation = 0
+        self._loading = {}
+        self._watch = None
+        self._watch_path = None
+        self._seen_data_version = None
+        self._own_commits = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    ######### External change detection #########
+
+    def _data_version(self):
+        if self._watch is None or self._watch_path != DATABASE_PATH:
+            if self._watch is not None:
+                self._watch.close()
+            self._watch = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+            # Open the WAL the way pooled connections do; otherwise the first of
+            # them to do so looks like an external commit.
+            self._watch.execute(CONNECTION_PRAGMAS[0]).fetchall()
+            self._watch_path = DATABASE_PATH
+            self._seen_data_version = None
+        return self._watch.execute('PRAGMA data_version').fetchone()[0]
+
+    @contextmanager
+    def own_commit(self):
+        """Wrap a commit made by this process so readers do not take it for an external one.
+
+        data_version moves as soon as the commit lands, well before the
+        writer's callers get to _record_write. While a commit is in flight a
+        change is left for this to absorb once the commit is done.
+        """
+        with self._lock:
+            self._own_commits += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._own_commits -= 1
+                if self._watch is not None:
+                    self._seen_data_version = self._data_version()
+
+    def _check_external_changes(self):
+        current = self._data_version()
+        if self._own_commits:
+            return
+        if self._seen_data_version is not None and current != self._seen_data_version:
+            # Someone committed without going through _record_write; we cannot
+            # tell what changed, so treat it as a catalog-wide write.
+            self._seen_data_version = current
+            _record_write()
+        self._seen_data_version = current
+
+    def _clear(self):
+        self._catalog = self._by_id = self._by_speciality = None
+        self._states.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    ######### Loading #########
+
+    def _load_catalog(self):
+        """Return (catalog, by_id, by_speciality) read from the database"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''SELECT id, name, code, ects, semester, type, direction, {', '.join(SPECIALITY_COLUMNS)}
+                FROM catalog ORDER BY semester, id''')
+            catalog = tuple(tuple(row) for row in cursor.fetchall())
+        by_id = {row[0]: row for row in catalog}
+        by_speciality = {
+            s: tuple(row[0] for row in catalog if row[7 + i] is not None)
+            for i, s in enumerate(SPECIALITY_COLUMNS)
+        }
+        return catalog, by_id, by_speciality
+
+    def _load_state(self, student_id):
+        """Return the student's course state, or None if they have no profile"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            if cursor.execute('SELECT 1 FROM profile WHERE id = ?', (student_id,)).fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT course_id, status, grade, planned_semester FROM student_courses WHERE student_id = ?',
+                (student_id,)
+            )
+            return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+    def _get(self, student_id):
+        """Return (catalog, by_id, by_speciality, state), loading whatever is missing"""
+        with self._lock:
+            self._check_external_changes()
+            catalog = (self._catalog, self._by_id, self._by_speciality)
+            state = self._states.get(student_id)
+            if catalog[0] is not None and state is not None:
+                self._states.move_to_end(student_id)
+                self.hits += 1
+                return (*catalog, state)
+            self.misses += 1
+            generation = self._generation
+            loading = self._loading.setdefault(student_id, [0, 0])
+            loading[0] += 1
+            writes = loading[1]
+
+        try:
+            if catalog[0] is None:
+                catalog = self._load_catalog()
+            if state is None:
+                state = self._load_state(student_id)
+        finally:
+            with self._lock:
+                loading[0] -= 1
+                if not loading[0]:
+                    del self._loading[student_id]
+                fresh = self._generation == generation and loading[1] == writes
+                if fresh and self._catalog is None:
+                    self._catalog, self._by_id, self._by_speciality = catalog
+                # Never cache a default state for an id with no profile
+                if fresh and state is not None and student_id not in self._states:
+                    self._states[student_id] = state
+                    while len(self._states) > self.max_students:
+                        self._states.popitem(last=False)
+        if state is None:
+            raise LookupError("Student not found")
+        return (*catalog, state)
+
+    @staticmethod
+    def _merge(row, state):
+        status, grade, planned_semester = state.get(row[0], DEFAULT_COURSE_STATE)
+        return dict(zip(COURSE_KEYS, (*row[:5], status, *row[5:], grade, planned_semester)))
+
+    ######### Public API #########
+
+    def require_student(self, student_id):
+        """Raise LookupError unless the student exists, caching their state if they do"""
+        self._get(student_id)
+
+    def courses(self, student_id, speciality=None):
+        """Return the catalog merged with a student's state, optionally one speciality only.
+
+        Like every method that reads a student's state, raises LookupError for
+        an unknown student.
+        """
+        catalog, by_id, by_speciality, state = self._get(student_id)
+        if speciality is not None:
+            catalog = (by_id[course_id] for course_id in by_speciality[speciality])
+        return [self._merge(row, state) for row in catalog]
+
+    def course(self, course_id, student_id):
+        _, by_id, _, state = self._get(student_id)
+        row = by_id.get(course_id)
+        return self._merge(row, state) if row else None
+
+    def on_write(self, table, student_id):
+        """Drop the entries a committed write made stale"""
+        with self._lock:
+            if table is None:
+                self._clear()
+            elif table == 'student_courses':
+                self._states.pop(student_id, None)
+                if student_id in self._loading:
+                    self._loading[student_id][1] += 1
+            # Our own commit moved data_version; absorb it so it is not
+            # mistaken for an external change.
+            if self._watch is not None:
+                self._seen_data_version = self._data_version()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'cached_students': len(self._states),
+                'catalog_loaded': self._catalog is not None,
+            }
+
+    def close(self):
+        with self._lock:
+            self._clear()
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+
+
+catalog_cache = CatalogCache()
+registry.gauge(
+    'catalog_cache', 'Catalog cache hits, misses, invalidations and cached students.',
+    lambda: {(stat,): int(value) for stat, value in catalog_cache.stats().items()}, labels=('stat',))
+
+######### GET ENDPOINTS #########
+
+# Catalog columns joined with one student's state. Courses the student has not
+# touched have no student_courses row and read as the defaults.
+STUDENT_COURSES_QUERY = '''
+    SELECT c.id, c.name, c.code, c.ects, c.semester,
+           COALESCE(sc.status, 'Not Taken') AS status,
+           c.type, c.direction, c.S1, c.S2, c.S3, c.S4, c.S5, c.S6,
+           sc.grade,
+           COALESCE(sc.planned_semester, 0) AS planned_semester
+    FROM catalog c
+    LEFT JOIN student_courses sc ON sc.course_id = c.id AND sc.student_id = ?
+'''
+
+def get_all_courses(student_id=DEFAULT_STUDENT_ID):
+    """Return all courses with the student's state as a list of dicts; raises LookupError for an unknown student"""
+    return catalog_cache.courses(student_id)
+
+def get_course_by_id(course_id, student_id=DEFAULT_STUDENT_ID):
+    """Return a single course with the student's state by its ID as a dict, or None for an unknown course.
+
+    Raises LookupError for an unknown student.
+    """
+    return catalog_cache.course(course_id, student_id)
+
+# SQL for each course key. status and planned_semester default for courses the
+# student has not touched; see STUDENT_COURSES_QUERY.
+COURSE_COLUMNS = {
+    'id': 'c.id', 'name': 'c.name', 'code': 'c.code', 'ects': 'c.ects', 'semester': 'c.semester',
+    'status': "COALESCE(sc.status, 'Not Taken')", 'type': 'c.type', 'direction': 'c.direction',
+    **{s: f'c.{s}' for s in SPECIALITY_COLUMNS},
+    'grade': 'sc.grade', 'planned_semester': 'COALESCE(sc.planned_semester, 0)',
+}
+COURSE_FILTERS = ('status', 'semester', 'planned_semester', 'type', 'direction', 'speciality')
+
+def query_courses(student_id=DEFAULT_STUDENT_ID, filters=None, fields=None):
+    """Return the student's courses matching filters, with only the given fields.
+
+    filters maps a name in COURSE_FILTERS to the values it accepts; a course
+    must match every filter given. fields lists course keys to return ('id'
+    is always included); None returns them all. Filters that only match
+    courses the student has touched (no 'Not Taken', no planned semester 0)
+    read the student's rows through their index instead of the whole catalog.
+    """
+    filters = {name: list(values) for name, values in (filters or {}).items() if values}
+    unknown = [name for name in filters if name not in COURSE_FILTERS]
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+    if fields is None:
+        fields = COURSE_KEYS
+    else:
+        unknown = [f for f in fields if f not in COURSE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        fields = ('id', *(f for f in COURSE_KEYS if f in fields and f != 'id'))
+    bad = [s for s in filters.get('status', ()) if s not in COURSE_STATUSES]
+    if bad:
+        raise ValueError(f"Invalid status: {', '.join(bad)}")
+    bad = [s for s in filters.get('speciality', ()) if s not in SPECIALITY_COLUMNS]
+    if bad:
+        raise ValueError(f"Invalid speciality: {', '.join(bad)}")
+
+    touched_only = ('status' in filters and 'Not Taken' not in filters['status']) or \
+        ('planned_semester' in filters and 0 not in filters['planned_semester'])
+    join = 'JOIN' if touched_only else 'LEFT JOIN'
+    conditions, params = [], [student_id]
+    for name, values in filters.items():
+        placeholders = ', '.join('?' * len(values))
+        if name == 'speciality':
+            conditions.append(f'c.id IN (SELECT course_id FROM course_speciality WHERE speciality IN ({placeholders}))')
+        elif touched_only and name in ('status', 'planned_semester'):
+            # The raw column, so the (student_id, status) index applies
+            conditions.append(f'sc.{name} IN ({placeholders})')
+        else:
+            conditions.append(f'{COURSE_COLUMNS[name]} IN ({placeholders})')
+        params.extend(values)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    with get_db_connection() as conn:
+        rows = conn.execute(f'''
+            SELECT {', '.join(COURSE_COLUMNS[f] for f in fields)}
+            FROM catalog c
+            {join} student_courses sc ON sc.course_id = c.id AND sc.student_id = ?
+            {where}
+            ORDER BY c.semester, c.id
+        ''', params).fetchall()
+    return [dict(zip(fields, row)) for row in rows]
+
+# Column weights for ranking search results: a code match beats a name match,
+# which beats a Greeklish match
+SEARCH_WEIGHTS = (10.0, 5.0, 20.0)
+MAX_SEARCH_RESULTS = 50
+
+def _search_expression(query):
+    """FTS5 query matching every word of query as a prefix of a name word or the code"""
+    terms = []
+    for word in words(fold(query)):
+        key = greeklish_key(word)
+        terms.append(f'(name:"{word}"* OR greeklish:"{key}"* OR code:"{key}"*)')
+    return ' AND '.join(terms)
+
+def search_courses(query, student_id=DEFAULT_STUDENT_ID, limit=20):
+    """Return the courses matching a search-as-you-type query, best match first.
+
+    Raises LookupError for an unknown student.
+    """
+    catalog_cache.require_student(student_id)
+    expression = _search_expression(query)
+    if not expression:
+        return []
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM courses ORDER BY semester, id')
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        cursor.execute(
+            f'''SELECT rowid FROM course_search WHERE course_search MATCH ?
+            ORDER BY bm25(course_search, {', '.join(map(str, SEARCH_WEIGHTS))}), rowid LIMIT ?''',
+            (expression, min(limit, MAX_SEARCH_RESULTS))
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    courses = (catalog_cache.course(course_id, student_id) for course_id in ids)
+    return [course for course in courses if course is not None]
 
-def get_course_by_id(course_id):
-    """Return a single course by its ID as a dict"""
+PROFILE_FIELDS = ('sdi', 'first_name', 'last_name', 'current_semester', 'direction', 'language')
+
+def get_profile_with_id(profile_id):
+    """Return the whole profile row as a dict, or None if it does not exist"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM courses WHERE id = ?', (course_id,))
+        cursor.execute('SELECT id, sdi, first_name, last_name, current_semester, direction, language FROM profile WHERE id = ?', (profile_id,))
         row = cursor.fetchone()
         return dict(row) if row else None
-        
+
 def get_sdi_with_id(profile_id):
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -257,65 +1329,256 @@ def get_language_with_id(profile_id):
         cursor.execute('SELECT language FROM profile WHERE id = ?', (profile_id,))
         return cursor.fetchall()
 
-######### PUT ENDPOINTS #########
+######### CHANGE LOG #########
 
-def update_course_status(course_id, new_status):
-    """Update the status of a course"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('UPDATE courses SET status = ? WHERE id = ?', (new_status, course_id))
-        conn.commit()
+CHANGE_LOG_MAX_ROWS = 100000
+CHANGE_LOG_COMPACT_EVERY = 1000  # writes between compactions
 
-def update_course_grade(course_id, new_grade):
-    """Upadate the grade of a course"""
+def get_changes_since(student_id, since):
+    """Return what changed for a student after sync version `since`.
+
+    The result is a dict with the current sync version, the changed courses
+    (with the student's state) and the profile if it changed. Clients that
+    have never synced (since 0), synced before a resync marker or hold a
+    version this database never issued get every course and the profile, with
+    full set to True. Everything is read in one snapshot, so the version
+    covers exactly the rows returned.
+    """
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('UPDATE courses SET grade = ? WHERE id = ?', (new_grade, course_id))
-        conn.commit()
+        conn.execute('BEGIN')
+        try:
+            version, resync = conn.execute(
+                "SELECT COALESCE(MAX(version), 0), COALESCE(MAX(CASE WHEN student_id IS NULL THEN version END), 0) FROM change_log"
+            ).fetchone()
+            full = since < 1 or since < resync or since > version
+            if full:
+                courses = conn.execute(STUDENT_COURSES_QUERY + ' ORDER BY c.semester, c.id', (student_id,)).fetchall()
+                profile_changed = True
+            else:
+                courses = conn.execute(
+                    STUDENT_COURSES_QUERY + ''' WHERE c.id IN (
+                        SELECT course_id FROM change_log
+                        WHERE student_id = ? AND version > ? AND version <= ? AND table_name = 'student_courses'
+                    ) ORDER BY c.semester, c.id''',
+                    (student_id, student_id, since, version)
+                ).fetchall()
+                profile_changed = conn.execute(
+                    '''SELECT 1 FROM change_log
+                    WHERE student_id = ? AND version > ? AND version <= ? AND table_name = 'profile' LIMIT 1''',
+                    (student_id, since, version)
+                ).fetchone() is not None
+            profile = None
+            if profile_changed:
+                row = conn.execute(
+                    'SELECT id, sdi, first_name, last_name, current_semester, direction, language FROM profile WHERE id = ?',
+                    (student_id,)
+                ).fetchone()
+                profile = dict(row) if row else None
+        finally:
+            conn.rollback()
+    return {'version': version, 'full': full, 'courses': [dict(row) for row in courses], 'profile': profile}
+
+def compact_change_log(max_rows=CHANGE_LOG_MAX_ROWS):
+    """Keep the change log bounded.
+
+    Only the newest row per (student, course) or profile is needed to answer
+    a sync, so older ones are dropped first; that bounds the log by what
+    students have touched. If it still holds more than max_rows, the oldest
+    rows go and a resync marker takes their place, so clients that synced
+    before them get a full response. Returns the number of rows removed.
+    """
+    removed = run_write(lambda conn: _compact_change_log(conn, max_rows))
+    # Not a data change: only absorb the commit so the catalog cache does not
+    # take it for an external write
+    catalog_cache.on_write('change_log', None)
+    return removed
+
+def _compact_change_log(conn, max_rows=CHANGE_LOG_MAX_ROWS):
+    removed = conn.execute('''
+        DELETE FROM change_log WHERE student_id IS NOT NULL AND version NOT IN (
+            SELECT MAX(version) FROM change_log WHERE student_id IS NOT NULL
+            GROUP BY student_id, table_name, course_id
+        )''').rowcount
+    removed += conn.execute(
+        'DELETE FROM change_log WHERE student_id IS NULL AND version < (SELECT MAX(version) FROM change_log WHERE student_id IS NULL)'
+    ).rowcount
+    cutoff = conn.execute('SELECT version FROM change_log ORDER BY version DESC LIMIT 1 OFFSET ?', (max_rows,)).fetchone()
+    if cutoff is not None:
+        removed += conn.execute('DELETE FROM change_log WHERE version <= ?', (cutoff[0],)).rowcount
+        # Reuses the newest removed version, so syncs from before it resync
+        conn.execute("INSERT INTO change_log (version, student_id, table_name) VALUES (?, NULL, 'resync')", (cutoff[0],))
+        removed -= 1
+    return removed
+
+def _change_log_compacted(removed, error):
+    # Runs on the writer thread after an idle compaction
+    if error is not None:
+        change_log_compactions.inc('error')
+        return
+    change_log_compactions.inc('ok')
+    change_log_compacted_rows.inc(amount=removed)
+    catalog_cache.on_write('change_log', None)
+
+######### PUT ENDPOINTS #########
+
+def _upsert_student_course(course_id, column, value, student_id):
+    """Set one state column for a (student, course) pair, creating the row on first write.
+
+    Returns False if the course does not exist.
+    """
+    # column comes from the update_course_* helpers below, never from input
+    updated = run_write(lambda conn: conn.execute(
+        f'''INSERT INTO student_courses (student_id, course_id, {column})
+        SELECT ?, id, ? FROM courses WHERE id = ?
+        ON CONFLICT(student_id, course_id) DO UPDATE SET {column} = excluded.{column}''',
+        (student_id, value, course_id)
+    ).rowcount > 0)
+    if updated:
+        _record_write('student_courses', student_id, (course_id,))
+    return updated
+
+def update_course_status(course_id, new_status, student_id=DEFAULT_STUDENT_ID):
+    """Update the status of a course for a student"""
+    return _upsert_student_course(course_id, 'status', new_status, student_id)
+
+def _check_grade(course_id, grade):
+    # None clears the grade; anything else must be a passing grade
+    if grade is not None and not PASS_GRADE <= grade <= MAX_GRADE:
+        raise ValueError(f"Grade for course {course_id} must be between {PASS_GRADE} and {MAX_GRADE}")
+
+def update_course_grade(course_id, new_grade, student_id=DEFAULT_STUDENT_ID):
+    """Upadate the grade of a course for a student; raises ValueError for a grade out of range"""
+    _check_grade(course_id, new_grade)
+    return _upsert_student_course(course_id, 'grade', new_grade, student_id)
+
+def update_course_planned_semester(course_id, new_semester, student_id=DEFAULT_STUDENT_ID):
+    """Update the planned semester for a course for a student"""
+    return _upsert_student_course(course_id, 'planned_semester', new_semester, student_id)
+
+def update_courses_batch(mutations, student_id=DEFAULT_STUDENT_ID):
+    """Apply a list of course state changes for a student in one transaction.
+
+    Each mutation is a dict with a course_id and any of status, grade and
+    planned_semester. Mutations are applied in order, with the same rules as
+    the single-field endpoints: a status other than 'Passed' clears the grade,
+    and a grade can only be set on a course that ends up 'Passed'.
+
+    Raises LookupError for an unknown course and ValueError for an invalid
+    status or grade; nothing is written in either case. Returns the updated
+    courses.
+    """
+    for mutation in mutations:
+        if 'status' in mutation and mutation['status'] not in COURSE_STATUSES:
+            raise ValueError(f"Invalid status for course {mutation['course_id']}: {mutation['status']}")
+        if 'planned_semester' in mutation and mutation['planned_semester'] is None:
+            raise ValueError(f"Planned semester of course {mutation['course_id']} cannot be null")
+        if 'grade' in mutation:
+            _check_grade(mutation['course_id'], mutation['grade'])
+    course_ids = list(dict.fromkeys(m['course_id'] for m in mutations))
+    if not course_ids:
+        return []
+    placeholders = ', '.join('?' for _ in course_ids)
+
+    def apply(conn):
+        # The writer holds the write lock, so the state we validate against
+        # cannot change underneath us.
+        cursor = conn.execute(STUDENT_COURSES_QUERY + f' WHERE c.id IN ({placeholders})', (student_id, *course_ids))
+        state = {row['id']: {'status': row['status'], 'grade': row['grade'], 'planned_semester': row['planned_semester']}
+                 for row in cursor.fetchall()}
+        missing = [course_id for course_id in course_ids if course_id not in state]
+        if missing:
+            raise LookupError(f"Course not found: {missing[0]}")
+
+        for mutation in mutations:
+            course = state[mutation['course_id']]
+            if 'status' in mutation:
+                course['status'] = mutation['status']
+                if mutation['status'] != 'Passed':
+                    course['grade'] = None
+            if 'grade' in mutation:
+                if mutation['grade'] is not None and course['status'] != 'Passed':
+                    raise ValueError(f"Grade can only be set for 'Passed' courses (course {mutation['course_id']}).")
+                course['grade'] = mutation['grade']
+            if 'planned_semester' in mutation:
+                course['planned_semester'] = mutation['planned_semester']
+
+        conn.executemany(
+            '''INSERT INTO student_courses (student_id, course_id, status, grade, planned_semester)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(student_id, course_id) DO UPDATE SET
+                status = excluded.status,
+                grade = excluded.grade,
+                planned_semester = excluded.planned_semester''',
+            [(student_id, course_id, course['status'], course['grade'], course['planned_semester'])
+             for course_id, course in state.items()]
+        )
+
+    run_write(apply)
+    _record_write('student_courses', student_id, course_ids)
 
-def update_course_planned_semester(course_id, new_semester):
-    """Update the planned semester for a course"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('UPDATE courses SET planned_semester = ? WHERE id = ?', (new_semester, course_id))
-        conn.commit()
+        cursor.execute(STUDENT_COURSES_QUERY + f' WHERE c.id IN ({placeholders}) ORDER BY c.semester, c.id', (student_id, *course_ids))
+        return [dict(row) for row in cursor.fetchall()]
+
+def create_student(sdi=0, first_name=None, last_name=None, current_semester=0, direction=None, language='en'):
+    """Create a new student profile and return its ID"""
+    student_id = run_write(lambda conn: conn.execute(
+        '''INSERT INTO profile (sdi, first_name, last_name, current_semester, direction, language)
+        VALUES (?, ?, ?, ?, ?, ?)''',
+        (sdi, first_name, last_name, current_semester, direction, language)
+    ).lastrowid)
+    _record_write('profile', student_id, PROFILE_FIELDS)
+    return student_id
+
+def _update_profile_field(profile_id, field, value):
+    # field comes from the update_*_with_id helpers below, never from input
+    updated = run_write(lambda conn: conn.execute(
+        f'UPDATE profile SET {field} = ? WHERE id = ?', (value, profile_id)).rowcount)
+    if not updated:
+        raise LookupError("User profile not found")
+    _record_write('profile', profile_id, (field,))
 
 def update_sdi_with_id(profile_id, new_sdi):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('UPDATE profile SET sdi = ? WHERE id = ?', (new_sdi, profile_id))
-        conn.commit()  # Changed from return cursor.fetchall()
+    _update_profile_field(profile_id, 'sdi', new_sdi)
     
 def update_first_name_with_id(profile_id, new_first_name):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('UPDATE profile SET first_name = ? WHERE id = ?', (new_first_name, profile_id)) 
-        conn.commit()  # Changed from return cursor.fetchall()
+    _update_profile_field(profile_id, 'first_name', new_first_name)
     
 def update_last_name_with_id(profile_id, new_last_name):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('UPDATE profile SET last_name = ? WHERE id = ?', (new_last_name, profile_id))
-        conn.commit()  # Changed from return cursor.fetchall()
+    _update_profile_field(profile_id, 'last_name', new_last_name)
     
 def update_current_semester_with_id(profile_id, new_current_semester):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('UPDATE profile SET current_semester = ? WHERE id = ?', (new_current_semester, profile_id))
-        conn.commit()  # Changed from return cursor.fetchall()
+    _update_profile_field(profile_id, 'current_semester', new_current_semester)
 
 def update_direction_with_id(profile_id, new_direction):
     """Update the direction of a user"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('UPDATE profile SET direction = ? WHERE id = ?', (new_direction, profile_id))
-        conn.commit()
+    _update_profile_field(profile_id, 'direction', new_direction)
+
+def update_profile_with_id(profile_id, fields):
+    """Update several profile fields in one statement and return the updated row.
+
+    Returns None if the profile does not exist.
+    """
+    unknown = set(fields) - set(PROFILE_FIELDS)
+    if unknown:
+        raise ValueError(f"Invalid profile fields: {sorted(unknown)}. Must be among {list(PROFILE_FIELDS)}")
+    if not fields:
+        return get_profile_with_id(profile_id)
+
+    assignments = ', '.join(f'{field} = ?' for field in fields)
+    rows = run_write(lambda conn: conn.execute(
+        f'''UPDATE profile SET {assignments} WHERE id = ?
+        RETURNING id, sdi, first_name, last_name, current_semester, direction, language''',
+        (*fields.values(), profile_id)
+    ).fetchall())
+    if not rows:
+        return None
+    _record_write('profile', profile_id, fields)
+    return dict(rows[0])
 
 def update_language_with_id(profile_id, new_language):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('UPDATE profile SET language = ? WHERE id = ?', (new_language, profile_id))
-        conn.commit()
+    _update_profile_field(profile_id, 'language', new_language)
 
 ######### OTHER ENDPOINTS #########
 
@@ -329,38 +1592,46 @@ def get_info_by_s_and_name(s_no, name):
     
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        # Use string formatting for column name (after validation)
-        query = f'SELECT {s_no} FROM courses WHERE name = ?'
-        cursor.execute(query, (name,))
+        query = '''SELECT cs.role FROM courses c
+            LEFT JOIN course_speciality cs ON cs.speciality = ? AND cs.course_id = c.id
+            WHERE c.name = ?'''
+        cursor.execute(query, (s_no, name))
         return cursor.fetchall()
 
 
-def get_courses_by_speciality(s_no):
+def get_courses_by_speciality(s_no, student_id=DEFAULT_STUDENT_ID):
     """Return all courses belonging to a specific speciality"""
     valid_columns = ['S1', 'S2', 'S3', 'S4', 'S5', 'S6']
     if s_no not in valid_columns:
         raise ValueError(f"Invalid speciality: {s_no}. Must be one of {valid_columns}")
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        query = f'SELECT * FROM courses WHERE {s_no} IS NOT NULL ORDER BY semester, id'
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+    return catalog_cache.courses(student_id, s_no)
 
 
 def reset_database():
     """Reset the database by dropping all tables"""
-    with get_db_connection() as conn:
+    def drop(conn):
         cursor = conn.cursor()
+        cursor.execute('DROP VIEW IF EXISTS catalog')
+        cursor.execute('DROP TABLE IF EXISTS course_search')
+        cursor.execute('DROP TABLE IF EXISTS course_prerequisites')
+        for table in ('cohort_course_stats', 'cohort_speciality_stats', 'cohort_semester_load', 'cohort_refresh'):
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        cursor.execute('DROP TABLE IF EXISTS student_courses')
+        cursor.execute('DROP TABLE IF EXISTS course_speciality')
         cursor.execute('DROP TABLE IF EXISTS courses')
         cursor.execute('DROP TABLE IF EXISTS degree_requirements')
-        conn.commit()
+        cursor.execute('DROP TABLE IF EXISTS schema_migrations')
+        # change_log is kept: its versions must keep growing for clients that
+        # already synced, and migrate_database marks the reset in it
+
+    run_write(drop)
+    _record_write()
 
 # DO NOT UNCOMMENT THIS BLOCK UNLESS YOU WANT TO RESET THE DATABASE
 
 # if __name__ == "__main__":
 #     reset_database()  # Drops existing tables
-#     init_database()   # Re-creates and fills them
+#     migrate_database()  # Re-creates and fills them
 #     courses = get_all_courses()
 #     print(f"Total courses in DB: {len(courses)}")
\ No newline at end of file
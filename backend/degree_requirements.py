@@ -0,0 +1,336 @@
+"""Degree requirement evaluation, materialized per student.
+
+The rules mirror what DegreeRequirements.jsx used to compute in the browser.
+Every rule is backed by a group of catalog courses; for each student we keep
+the set of passed courses per group and the group's evaluated result. When a
+course changes, only the groups containing that course are re-evaluated.
+"""
+import threading
+from collections import OrderedDict
+
+from database import (
+    get_db_connection,
+    add_change_listener,
+    data_version,
+)
+
+TOTAL_ECTS = 240
+SPECIALITIES = ('S1', 'S2', 'S3', 'S4', 'S5', 'S6')
+DIRECTION_SPECIALITIES = {
+    'CS': ('S1', 'S2', 'S3'),
+    'CET': ('S4', 'S5', 'S6'),
+}
+# Θεωρία Υπολογισμού, Υλοποίηση Συστημάτων Βάσεων Δεδομένων, Αριθμητική Ανάλυση
+CS_REQUIRED_CODES = ('Κ25', 'Κ18', 'Κ15')
+
+COMPULSORY_TOTAL = 18
+GENERAL_EDUCATION_TOTAL = 3
+DIRECTION_TOTAL = 4
+PROJECT_TOTAL = 1
+FINAL_TOTAL = 2
+SPECIALITY_COMPULSORY_TOTAL = 2
+SPECIALITY_BASIC_TOTAL = 4
+SPECIALITIES_TOTAL = 2
+GRADUATION_BASIC_TOTAL = 4
+
+GROUPS = (
+    'ects', 'compulsory', 'general_education', 'direction_project', 'final_courses',
+    *(f'direction:{d}' for d in DIRECTION_SPECIALITIES),
+    *(f'speciality:{s}' for s in SPECIALITIES),
+)
+
+# Students whose results are kept in memory; the least recently used are
+# dropped and rebuilt from the database on their next request.
+MAX_MATERIALIZED_STUDENTS = 2048
+
+
+def _course_groups(course):
+    """Return the requirement groups a catalog course counts towards"""
+    groups = ['ects']
+    if course['type'] == 'ΥΜ':
+        groups.append('compulsory')
+    elif course['type'] == 'ΓΠ':
+        groups.append('general_education')
+    elif course['type'] == 'Project':
+        groups.append('direction_project')
+    elif course['type'] in ('ΠΡ', 'ΠΤ'):
+        groups.append('final_courses')
+    elif course['type'] == 'ΕΥΜ' and course['direction'] in DIRECTION_SPECIALITIES:
+        groups.append(f"direction:{course['direction']}")
+    groups.extend(f'speciality:{s}' for s in SPECIALITIES if course[s] is not None)
+    return groups
+
+
+class Catalog:
+    """Catalog courses indexed by the requirement groups they belong to"""
+
+    def __init__(self, rows):
+        self.courses = {row['id']: row for row in rows}
+        self.groups_of = {course_id: _course_groups(course) for course_id, course in self.courses.items()}
+
+    @classmethod
+    def load(cls):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, name, code, ects, type, direction, S1, S2, S3, S4, S5, S6 FROM catalog')
+            return cls([dict(row) for row in cursor.fetchall()])
+
+    def summary(self, course_ids):
+        return [{'id': i, 'name': self.courses[i]['name'], 'code': self.courses[i]['code']} for i in sorted(course_ids)]
+
+
+class StudentRequirements:
+    """Materialized requirement state for one student"""
+
+    def __init__(self, version, writes, direction):
+        self.version = version
+        self.writes = writes  # data_version.writes_for_student() when version was read
+        self.direction = direction
+        self.passed = {}
+        self.results = {}
+
+    def copy(self, version, writes):
+        state = StudentRequirements(version, writes, self.direction)
+        state.passed = {group: set(ids) for group, ids in self.passed.items()}
+        state.results = dict(self.results)
+        return state
+
+
+class RequirementsEngine:
+    """Materialized requirement states, LRU-bounded.
+
+    The lock only guards the catalog and the OrderedDict of states. Builds and
+    incremental updates query the database without it and are swapped in
+    under it, or thrown away if a newer state or a catalog change got there
+    first; a state is never changed once it is in the dict.
+    """
+
+    def __init__(self, max_students=MAX_MATERIALIZED_STUDENTS):
+        self.max_students = max_students
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._generation = 0  # bumped on every catalog-wide change
+        self._students = OrderedDict()
+
+    def attach(self):
+        """Start receiving write notifications from database.py"""
+        add_change_listener(self.on_change)
+
+    @property
+    def catalog(self):
+        with self._lock:
+            if self._catalog is not None:
+                return self._catalog
+            generation = self._generation
+        catalog = Catalog.load()
+        with self._lock:
+            if self._generation == generation and self._catalog is None:
+                self._catalog = catalog
+        return catalog
+
+    ######### EVALUATION #########
+
+    def _evaluate_group(self, group, passed):
+        catalog = self.catalog
+        if group == 'ects':
+            return {'completed': sum(catalog.courses[i]['ects'] or 0 for i in passed), 'total': TOTAL_ECTS}
+        if group.startswith('speciality:'):
+            spec = group.split(':', 1)[1]
+            compulsory = [i for i in passed if catalog.courses[i]['type'] == 'ΕΥΜ' and catalog.courses[i][spec] == 'Υ']
+            basic = [i for i in passed if catalog.courses[i][spec] == 'B']
+            return {
+                'compulsory_completed': len(compulsory),
+                'compulsory_total': SPECIALITY_COMPULSORY_TOTAL,
+                'basic_completed': len(basic),
+                'basic_total': SPECIALITY_BASIC_TOTAL,
+                'basic_courses': basic,
+                'is_completed': len(compulsory) >= SPECIALITY_COMPULSORY_TOTAL and len(basic) >= SPECIALITY_BASIC_TOTAL,
+            }
+        totals = {
+            'compulsory': COMPULSORY_TOTAL,
+            'general_education': GENERAL_EDUCATION_TOTAL,
+            'direction_project': PROJECT_TOTAL,
+            'final_courses': FINAL_TOTAL,
+        }
+        total = totals.get(group, DIRECTION_TOTAL)
+        result = {
+            'completed': len(passed),
+            'total': total,
+            'courses': catalog.summary(passed),
+            'is_completed': len(passed) >= total,
+        }
+        if group == 'direction:CS':
+            required = [i for i in passed if catalog.courses[i]['code'] in CS_REQUIRED_CODES]
+            result['required_codes'] = list(CS_REQUIRED_CODES)
+            result['required_completed'] = len(required)
+            result['is_completed'] = result['is_completed'] and len(required) == len(CS_REQUIRED_CODES)
+        return result
+
+    def _build(self, student_id, version, writes):
+        """Materialize a student's state from the database"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT direction FROM profile WHERE id = ?', (student_id,))
+            profile = cursor.fetchone()
+            if profile is None:
+                return None
+            cursor.execute(
+                "SELECT course_id FROM student_courses WHERE student_id = ? AND status = 'Passed'",
+                (student_id,)
+            )
+            passed_ids = [row['course_id'] for row in cursor.fetchall()]
+
+        catalog = self.catalog
+        state = StudentRequirements(version, writes, profile['direction'])
+        for course_id in passed_ids:
+            for group in catalog.groups_of.get(course_id, ()):
+                state.passed.setdefault(group, set()).add(course_id)
+        for group in GROUPS:
+            state.results[group] = self._evaluate_group(group, state.passed.get(group, set()))
+        return state
+
+    def _assemble(self, state):
+        """Combine the per-group results into the response for the student's direction"""
+        catalog = self.catalog
+        direction = state.direction
+        available = DIRECTION_SPECIALITIES.get(direction, ())
+
+        specialities = {}
+        basic_by_spec = {}
+        for spec in available:
+            result = dict(state.results[f'speciality:{spec}'])
+            basic_by_spec[spec] = result.pop('basic_courses')
+            specialities[spec] = result
+        completed_specialities = [spec for spec in available if specialities[spec]['is_completed']]
+
+        basic_courses = set().union(*basic_by_spec.values()) if basic_by_spec else set()
+        represented = [spec for spec in available if basic_by_spec[spec]]
+        graduation_basic = {
+            'completed': len(basic_courses),
+            'total': GRADUATION_BASIC_TOTAL,
+            'courses': catalog.summary(basic_courses),
+            'specialities_represented': represented,
+            'is_completed': len(basic_courses) >= GRADUATION_BASIC_TOTAL and bool(available) and len(represented) == len(available),
+        }
+
+        empty_direction = {'completed': 0, 'total': DIRECTION_TOTAL, 'courses': [], 'is_completed': False}
+        requirements = {
+            'compulsory': state.results['compulsory'],
+            'general_education': state.results['general_education'],
+            'direction': state.results.get(f'direction:{direction}', empty_direction),
+            'graduation_basic': graduation_basic,
+            'direction_project': state.results['direction_project'],
+            'final_courses': state.results['final_courses'],
+            'specialities': {
+                'completed': len(completed_specialities),
+                'total': SPECIALITIES_TOTAL,
+                'completed_specialities': completed_specialities,
+                'is_completed': len(completed_specialities) >= SPECIALITIES_TOTAL,
+            },
+        }
+        return {
+            'direction': direction,
+            'ects': state.results['ects'],
+            'passed_courses': len(state.passed.get('ects', ())),
+            'requirements': requirements,
+            'speciality_progress': specialities,
+            'is_completed': state.results['ects']['completed'] >= TOTAL_ECTS
+                            and all(r['is_completed'] for r in requirements.values()),
+        }
+
+    def evaluate(self, student_id):
+        """Return the student's requirement progress, or None if they do not exist"""
+        writes, version = data_version.writes_for_student(student_id)
+        with self._lock:
+            state = self._students.get(student_id)
+            if state is not None and state.version == version:
+                self._students.move_to_end(student_id)
+            else:
+                state = None
+                generation = self._generation
+        if state is not None:
+            return self._assemble(state)
+
+        state = self._build(student_id, version, writes)
+        with self._lock:
+            current = self._students.get(student_id)
+            if state is None:
+                if current is not None and current.version <= version:
+                    del self._students[student_id]
+                return None
+            # A catalog change or a newer state that landed meanwhile wins
+            if self._generation == generation and (current is None or current.version < version):
+                self._students[student_id] = state
+                while len(self._students) > self.max_students:
+                    self._students.popitem(last=False)
+        return self._assemble(state)
+
+    ######### INCREMENTAL UPDATES #########
+
+    def on_change(self, table, student_id, keys):
+        with self._lock:
+            if table is None:
+                # Catalog-wide change: start over
+                self._catalog = None
+                self._generation += 1
+                self._students.clear()
+                return
+            state = self._students.get(student_id)
+            if state is None:
+                return
+            # Read before the changed rows, so the new version never covers a
+            # write the update has not seen
+            writes, version = data_version.writes_for_student(student_id)
+            if writes != state.writes + 1:
+                # Another write was recorded since the state was built and its
+                # notification is still to come (or came first); applying only
+                # this one would label a state that misses it as current.
+                # Let the next read rebuild it instead.
+                del self._students[student_id]
+                return
+
+        # Update a copy and swap it in with its version only once complete,
+        # so a failure leaves the old state, which the version check rebuilds
+        updated = state.copy(version, writes)
+        if table == 'profile':
+            if 'direction' in keys:
+                with get_db_connection() as conn:
+                    row = conn.execute('SELECT direction FROM profile WHERE id = ?', (student_id,)).fetchone()
+                updated.direction = row['direction'] if row else None
+        elif table == 'student_courses':
+            self._apply_course_changes(updated, student_id, keys)
+        with self._lock:
+            # Anything else that replaced or dropped the state meanwhile knows better
+            if self._students.get(student_id) is state:
+                self._students[student_id] = updated
+
+    def _apply_course_changes(self, state, student_id, course_ids):
+        """Re-evaluate only the groups that contain the changed courses"""
+        if not course_ids:
+            return
+        placeholders = ', '.join('?' for _ in course_ids)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT course_id FROM student_courses WHERE student_id = ? AND course_id IN ({placeholders}) AND status = 'Passed'",
+                (student_id, *course_ids)
+            )
+            passed_now = {row['course_id'] for row in cursor.fetchall()}
+
+        catalog = self.catalog
+        dirty = set()
+        for course_id in course_ids:
+            for group in catalog.groups_of.get(course_id, ()):
+                passed = state.passed.setdefault(group, set())
+                was_passed = course_id in passed
+                if course_id in passed_now and not was_passed:
+                    passed.add(course_id)
+                    dirty.add(group)
+                elif course_id not in passed_now and was_passed:
+                    passed.discard(course_id)
+                    dirty.add(group)
+        for group in dirty:
+            state.results[group] = self._evaluate_group(group, state.passed[group])
+
+
+requirements_engine = RequirementsEngine()
@@ -0,0 +1,112 @@
+"""What-if grade planning over a student's ECTS-weighted average.
+
+The average is sum(grade * ects) / sum(ects) over graded Passed courses. To
+reach a target once the remaining (Planned and Failed) courses are passed,
+those courses need
+
+    sum(grade * ects) >= target * (graded_ects + remaining_ects) - graded_sum
+
+and the lowest grade that works for all of them at once is that amount divided
+by their ECTS. A plan reduces the student's courses to these few sums, so each
+scenario is solved in constant time plus one term per pinned course, and a
+batch of scenarios is a single pass over the targets.
+"""
+import math
+
+from database import MAX_GRADE, PASS_GRADE, get_all_courses, get_profile_with_id
+
+REMAINING_STATUSES = ('Planned', 'Failed')
+MAX_SCENARIOS = 1000
+
+
+def _ceil_grade(grade):
+    """Round up to two decimals so the required grade is never an underestimate"""
+    return math.ceil(round(grade * 100, 6)) / 100
+
+
+class GradePlan:
+    """Weighted sums of one student's graded and remaining courses"""
+
+    def __init__(self, courses):
+        graded = [c for c in courses if c['status'] == 'Passed' and c['grade'] is not None]
+        self.remaining = [c for c in courses if c['status'] in REMAINING_STATUSES]
+        self.ects_of = {c['id']: c['ects'] or 0 for c in self.remaining}
+        self.graded_sum = sum(c['grade'] * (c['ects'] or 0) for c in graded)
+        self.graded_ects = sum(c['ects'] or 0 for c in graded)
+        self.remaining_ects = sum(self.ects_of.values())
+        self.total_ects = self.graded_ects + self.remaining_ects
+
+    @classmethod
+    def load(cls, student_id):
+        """Return the student's plan, or None if they do not exist"""
+        if get_profile_with_id(student_id) is None:
+            return None
+        return cls(get_all_courses(student_id))
+
+    def _pinned(self, grades):
+        """Validate pinned grades and return their (weighted sum, ECTS)"""
+        pinned_sum = 0.0
+        pinned_ects = 0
+        for course_id, grade in (grades or {}).items():
+            if course_id not in self.ects_of:
+                raise LookupError(f"Course {course_id} is not Planned or Failed")
+            if not PASS_GRADE <= grade <= MAX_GRADE:
+                raise ValueError(f"Grade for course {course_id} must be between {PASS_GRADE} and {MAX_GRADE}")
+            pinned_sum += grade * self.ects_of[course_id]
+            pinned_ects += self.ects_of[course_id]
+        return pinned_sum, pinned_ects
+
+    def solve_many(self, scenarios):
+        """Solve [(target, {course_id: grade})] scenarios.
+
+        Returns one result per scenario: the grade every unpinned remaining
+        course needs (never below a pass), whether that is achievable and the
+        average it leads to.
+        """
+        results = []
+        for target, grades in scenarios:
+            pinned_sum, pinned_ects = self._pinned(grades)
+            known_sum = self.graded_sum + pinned_sum
+            free_ects = self.remaining_ects - pinned_ects
+            needed = target * self.total_ects - known_sum
+            if free_ects:
+                required = max(PASS_GRADE, _ceil_grade(needed / free_ects))
+                feasible = required <= MAX_GRADE
+                projected = (known_sum + min(required, MAX_GRADE) * free_ects) / self.total_ects
+            else:
+                required = None
+                feasible = needed <= 1e-9
+                projected = known_sum / self.total_ects if self.total_ects else None
+            results.append({
+                'target': target,
+                'required_grade': required,
+                'feasible': feasible,
+                'projected_average': round(projected, 2) if projected is not None else None,
+            })
+        return results
+
+    def summary(self, target):
+        """Current standing plus the required grade per remaining course for one target"""
+        result, = self.solve_many([(target, None)])
+        current = self.graded_sum / self.graded_ects if self.graded_ects else None
+        return {
+            'current_average': round(current, 2) if current is not None else None,
+            'graded_ects': self.graded_ects,
+            'remaining_ects': self.remaining_ects,
+            'min_average': round((self.graded_sum + PASS_GRADE * self.remaining_ects) / self.total_ects, 2) if self.total_ects else None,
+            'max_average': round((self.graded_sum + MAX_GRADE * self.remaining_ects) / self.total_ects, 2) if self.total_ects else None,
+            **result,
+            'courses': [
+                {
+                    'id': c['id'],
+                    'name': c['name'],
+                    'code': c['code'],
+                    'ects': c['ects'],
+                    'semester': c['semester'],
+                    'status': c['status'],
+                    'current_grade': c['grade'],
+                    'required_grade': result['required_grade'],
+                }
+                for c in self.remaining
+            ],
+        }
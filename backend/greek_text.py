@@ -0,0 +1,66 @@
+"""Text folding for Greek course names and codes.
+
+fold() lowercases and strips accents, so 'Άλγεβρα' and 'αλγεβρα' compare
+equal. greeklish_key() goes further and maps Greek and Greeklish spellings of
+a word to one Latin key: 'Μηχανική', 'mhxanikh' and 'michaniki' all become
+'mixaniki'. Keys are phonetic (ει, οι, υ and η all sound like ι) because
+people type Greeklish the way a word sounds as often as letter by letter.
+"""
+import re
+import unicodedata
+
+_GREEK_TO_LATIN = {
+    'α': 'a', 'β': 'v', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'i', 'θ': 'th',
+    'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'ks', 'ο': 'o', 'π': 'p',
+    'ρ': 'r', 'σ': 's', 'τ': 't', 'υ': 'y', 'φ': 'f', 'χ': 'x', 'ψ': 'ps', 'ω': 'o',
+}
+_TRANSLITERATE = str.maketrans(_GREEK_TO_LATIN)
+
+# Applied in order to the transliterated text; digraphs before single letters
+_GREEKLISH_RULES = tuple((re.compile(pattern), repl) for pattern, repl in (
+    (r'8', 'th'),
+    (r'th', '8'),
+    (r'ch', 'x'),
+    (r'ph', 'f'),
+    (r'h', 'i'),
+    # ου gets a letter of its own, so that a lone u can stand for υ
+    (r'o[uy]', 'q'),
+    (r'([ae])[uy]', r'\1v'),
+    (r'u', 'i'),
+    (r'ai', 'e'),
+    (r'[eoy]i', 'i'),
+    (r'b', 'v'),
+    (r'w', 'o'),
+    (r'y', 'i'),
+    (r'c', 'k'),
+    (r'([a-z])\1+', r'\1'),
+))
+
+_WORD = re.compile(r'\w+')
+
+# Codes mix Greek and Latin capitals that look the same ('Κ08' and 'K19'), and
+# codes typed by hand mix them even more; compare them folded to Latin.
+_CODE_FOLD = str.maketrans('ΑΒΕΖΗΙΚΜΝΟΡΤΥΧ', 'ABEZHIKMNOPTYX')
+
+
+def fold(text):
+    """Lowercase, strip accents and diaeresis, and use one form of sigma"""
+    decomposed = unicodedata.normalize('NFD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).replace('ς', 'σ')
+
+
+def greeklish_key(text):
+    """Latin key of Greek or Greeklish text, equal for the usual spellings of a word"""
+    key = fold(text).translate(_TRANSLITERATE)
+    for pattern, repl in _GREEKLISH_RULES:
+        key = pattern.sub(repl, key)
+    return key
+
+
+def words(text):
+    return _WORD.findall(text)
+
+
+def fold_code(code):
+    """Course code in one canonical form, for comparing codes"""
+    return str(code).strip().upper().translate(_CODE_FOLD)
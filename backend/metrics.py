@@ -0,0 +1,226 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Counters and histograms are plain Python objects guarded by one lock each;
+recording a sample is a dict lookup, a bisect and two additions, so they can
+sit on every request and every SQL statement. Gauges are read from callbacks
+when /api/metrics is scraped.
+"""
+import bisect
+import re
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond statements to slow requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            return sum(series[0]) if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for label_values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                labels = _format_labels((*self.labels, 'le'), (*label_values, _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns {label values: value}"""
+
+    def __init__(self, name, documentation, callback, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for label_values, value in sorted(self.callback().items()):
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One broken gauge callback must not take the whole scrape down
+                lines.append(f'# {metric.name} unavailable: {str(e)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+######### HTTP #########
+
+http_requests = registry.counter(
+    'http_requests_total', 'HTTP requests by route, method and status code.', ('method', 'route', 'status'))
+http_errors = registry.counter(
+    'http_request_errors_total', 'HTTP requests that ended with a 5xx status or an unhandled exception.', ('method', 'route'))
+http_latency = registry.histogram(
+    'http_request_duration_seconds', 'Time from receiving a request to sending the last byte of the response.', ('method', 'route'))
+
+######### DATABASE #########
+
+db_acquire = registry.histogram(
+    'db_connection_acquire_seconds', 'Time spent waiting for a pooled SQLite connection.')
+db_statements = registry.histogram(
+    'db_statement_duration_seconds', 'Time spent executing SQL statements, by statement kind and table.', ('statement',))
+db_fetch = registry.histogram(
+    'db_fetch_duration_seconds', 'Time spent fetching rows of a SELECT after executing it.', ('statement',))
+db_write_wait = registry.histogram(
+    'db_write_wait_seconds', 'Time from submitting a write to the group-commit writer until it is durable.')
+db_commit = registry.histogram(
+    'db_group_commit_duration_seconds', 'Time the writer spends running and committing one batch.')
+db_batch_size = registry.histogram(
+    'db_group_commit_size', 'Writes committed together in one batch.', buckets=SIZE_BUCKETS)
+change_log_compactions = registry.counter(
+    'change_log_compactions_total', 'Change log compactions run by the writer while idle, by outcome.', ('outcome',))
+change_log_compacted_rows = registry.counter(
+    'change_log_compacted_rows_total', 'Change log rows removed by compaction.')
+
+
+_STATEMENT_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|VIEW|INDEX)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(\w+)', re.IGNORECASE)
+_statement_labels = {}
+
+
+def statement_label(sql):
+    """Low-cardinality label for a SQL statement: its verb and first table, e.g. 'SELECT catalog'"""
+    label = _statement_labels.get(sql)
+    if label is None:
+        words = sql.split(None, 1)
+        verb = words[0].upper() if words else ''
+        match = _STATEMENT_TABLE.search(sql)
+        label = f'{verb} {match.group(1)}' if match else verb
+        # Statements are fixed strings in database.py, so this stays small;
+        # the bound guards against anything built with inlined values.
+        if len(_statement_labels) < 1024:
+            _statement_labels[sql] = label
+    return label
+
+
+######### ASGI MIDDLEWARE #########
+
+class MetricsMiddleware:
+    """Count and time every HTTP request under its route template (e.g. /api/courses/{course_id}/status)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get('route')
+            # Unmatched paths share one label so scanners cannot blow up the series count
+            path = getattr(route, 'path', 'unmatched')
+            method = scope['method']
+            http_requests.inc(method, path, status)
+            http_latency.observe(elapsed, method, path)
+            if status >= 500:
+                http_errors.inc(method, path)
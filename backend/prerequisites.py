@@ -0,0 +1,239 @@
+"""Prerequisite graph of the catalog, held in memory as bitsets.
+
+Every course gets a bit position. For each course we keep the mask of its
+direct prerequisites, the mask of its direct co-requisites, and the
+transitive closure in both directions: everything it needs, however
+indirectly, and everything that needs it. The closures are computed once per
+catalog load in topological order, so questions about a student's whole
+record or plan are a few integer ANDs per course instead of walking the
+graph:
+
+    eligible      every prerequisite passed, every co-requisite passed,
+                  in progress or eligible itself
+    unlocked-by   what becomes eligible once a course is passed, and every
+                  course that depends on it further down
+    validation    a course planned in semester s needs its prerequisites
+                  done before s and its co-requisites by s
+
+The edges come from the file database.PREREQUISITES_PATH names. The default
+file holds only verified prerequisites and may be empty, in which case every
+query here answers as if nothing required anything.
+"""
+import threading
+
+from database import add_change_listener, get_db_connection
+
+
+def _summary(course):
+    return {'id': course['id'], 'code': course['code'], 'name': course['name'], 'semester': course['semester']}
+
+
+class Graph:
+    """Immutable snapshot of the prerequisite graph of one catalog"""
+
+    def __init__(self, course_ids, edges):
+        self.ids = list(course_ids)
+        self.bit = {course_id: i for i, course_id in enumerate(self.ids)}
+        n = len(self.ids)
+        self.prerequisites = [0] * n
+        self.corequisites = [0] * n
+        self.edges = []
+        for course_id, requires_id, kind in edges:
+            if course_id not in self.bit or requires_id not in self.bit:
+                continue
+            i, j = self.bit[course_id], self.bit[requires_id]
+            if kind == 'corequisite':
+                self.corequisites[i] |= 1 << j
+            else:
+                self.prerequisites[i] |= 1 << j
+            self.edges.append({'course_id': course_id, 'requires_id': requires_id, 'kind': kind})
+
+        order = self._topological_order()
+        # requires[i]: everything course i needs, directly or not;
+        # required_by[i]: everything that needs course i
+        self.requires = [0] * n
+        for i in order:
+            direct = self.prerequisites[i] | self.corequisites[i]
+            closure = direct
+            for j in self.bits(direct):
+                closure |= self.requires[j]
+            self.requires[i] = closure
+        self.required_by = [0] * n
+        for i in range(n):
+            for j in self.bits(self.requires[i]):
+                self.required_by[j] |= 1 << i
+
+    @staticmethod
+    def bits(mask):
+        """Yield the positions of the set bits of mask"""
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def _topological_order(self):
+        """Courses with what they need first; raises ValueError on a cycle"""
+        n = len(self.ids)
+        direct = [self.prerequisites[i] | self.corequisites[i] for i in range(n)]
+        waiting = [bin(mask).count('1') for mask in direct]
+        dependents = [[] for _ in range(n)]
+        for i in range(n):
+            for j in self.bits(direct[i]):
+                dependents[j].append(i)
+        ready = [i for i in range(n) if not waiting[i]]
+        order = []
+        while ready:
+            i = ready.pop()
+            order.append(i)
+            for k in dependents[i]:
+                waiting[k] -= 1
+                if not waiting[k]:
+                    ready.append(k)
+        if len(order) < n:
+            stuck = sorted(self.ids[i] for i in range(n) if waiting[i])
+            raise ValueError(f"Prerequisite cycle among courses {stuck}")
+        return order
+
+    def mask(self, course_ids):
+        mask = 0
+        for course_id in course_ids:
+            i = self.bit.get(course_id)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def course_ids(self, mask):
+        return [self.ids[i] for i in self.bits(mask)]
+
+
+class PrerequisiteGraph:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._graph = None
+
+    def attach(self):
+        """Reload the graph when the catalog changes"""
+        add_change_listener(self.on_change)
+
+    def on_change(self, table, student_id, keys):
+        if table is None:
+            with self._lock:
+                self._graph = None
+
+    @property
+    def graph(self):
+        with self._lock:
+            if self._graph is None:
+                with get_db_connection() as conn:
+                    course_ids = [row['id'] for row in conn.execute('SELECT id FROM courses ORDER BY id')]
+                    edges = [tuple(row) for row in conn.execute('SELECT course_id, requires_id, kind FROM course_prerequisites')]
+                self._graph = Graph(course_ids, edges)
+            return self._graph
+
+    ######### Queries #########
+
+    def edges(self):
+        return list(self.graph.edges)
+
+    def _eligible_mask(self, graph, courses, passed):
+        """Courses not yet passed or in progress whose requirements are met"""
+        in_progress = graph.mask(c['id'] for c in courses if c['status'] == 'Current Semester')
+        open_ = 0
+        for course in courses:
+            i = graph.bit.get(course['id'])
+            if i is None or (passed | in_progress) >> i & 1:
+                continue
+            if not graph.prerequisites[i] & ~passed:
+                open_ |= 1 << i
+        # A co-requisite may be taken alongside, so it only has to be open itself
+        eligible = 0
+        for i in graph.bits(open_):
+            if not graph.corequisites[i] & ~(passed | in_progress | open_):
+                eligible |= 1 << i
+        return eligible
+
+    def eligible(self, courses):
+        """Return the courses a student can take now, given their course list"""
+        graph = self.graph
+        passed = graph.mask(c['id'] for c in courses if c['status'] == 'Passed')
+        eligible = self._eligible_mask(graph, courses, passed)
+        return [c for c in courses if c['id'] in graph.bit and eligible >> graph.bit[c['id']] & 1]
+
+    def unlocked_by(self, course_id, courses):
+        """Return what passing course_id would unlock for a student, or None for an unknown course.
+
+        unlocks are the courses that become eligible right away; leads_to is
+        every course that needs it, directly or not, that is not passed yet.
+        """
+        graph = self.graph
+        i = graph.bit.get(course_id)
+        if i is None:
+            return None
+        by_id = {c['id']: c for c in courses}
+        passed = graph.mask(c['id'] for c in courses if c['status'] == 'Passed')
+        before = self._eligible_mask(graph, courses, passed)
+        after = self._eligible_mask(graph, courses, passed | 1 << i)
+        unlocks = after & ~before & ~(1 << i)
+        leads_to = graph.required_by[i] & ~passed
+        return {
+            'course': _summary(by_id[course_id]),
+            'unlocks': [_summary(by_id[c]) for c in graph.course_ids(unlocks)],
+            'leads_to': [_summary(by_id[c]) for c in graph.course_ids(leads_to)],
+        }
+
+    def validate(self, courses, plan=None):
+        """Check planned semesters against the prerequisite graph.
+
+        The plan is the student's Planned courses with a planned semester,
+        updated with plan ({course id: semester}, 0 to unplan) when given.
+        Passed and Current Semester courses count as done before any planned
+        semester. Each issue names a planned course, the requirements it is
+        scheduled too early for, and the ones not planned at all (including
+        indirect ones).
+        """
+        graph = self.graph
+        by_id = {c['id']: c for c in courses}
+        semesters = {c['id']: c['planned_semester'] for c in courses
+                     if c['status'] == 'Planned' and c['planned_semester']}
+        for course_id, semester in (plan or {}).items():
+            if course_id not in by_id:
+                raise LookupError(f"Course not found: {course_id}")
+            if semester < 0:
+                raise ValueError(f"Invalid planned semester for course {course_id}: {semester}")
+            if semester:
+                semesters[course_id] = semester
+            else:
+                semesters.pop(course_id, None)
+
+        done = graph.mask(c['id'] for c in courses if c['status'] in ('Passed', 'Current Semester'))
+        planned = graph.mask(semesters)
+        by_semester = {}
+        for course_id, semester in semesters.items():
+            by_semester[semester] = by_semester.get(semester, 0) | graph.mask((course_id,))
+        # done_by[s]: everything done once semester s is over
+        done_by = {}
+        running = done
+        for semester in sorted(by_semester):
+            running |= by_semester[semester]
+            done_by[semester] = running
+
+        issues = []
+        for semester in sorted(by_semester):
+            before = done_by[semester] & ~by_semester[semester]
+            for i in graph.bits(by_semester[semester]):
+                late_prerequisites = graph.prerequisites[i] & planned & ~before
+                late_corequisites = graph.corequisites[i] & planned & ~done_by[semester]
+                unplanned = graph.requires[i] & ~(done | planned)
+                if not (late_prerequisites or late_corequisites or unplanned):
+                    continue
+                issues.append({
+                    'course': _summary(by_id[graph.ids[i]]),
+                    'semester': semester,
+                    'prerequisites_too_late': [_summary(by_id[c]) for c in graph.course_ids(late_prerequisites)],
+                    'corequisites_too_late': [_summary(by_id[c]) for c in graph.course_ids(late_corequisites)],
+                    'not_planned': [_summary(by_id[c]) for c in graph.course_ids(unplanned)],
+                })
+        return {'valid': not issues, 'issues': issues}
+
+
+prerequisite_graph = PrerequisiteGraph()
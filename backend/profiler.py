@@ -0,0 +1,213 @@
+"""Opt-in sampling profiler for individual requests.
+
+Off unless configured; server.py only installs ProfilerMiddleware when one of
+these is set, so an unconfigured server runs no profiling code at all:
+
+    PROFILE_TOKEN        requests sent with "X-Profile: <token>" are profiled
+    PROFILE_SAMPLE_RATE  fraction of all requests to profile (e.g. 0.01)
+    PROFILE_DIR          where profiles are written (default ./profiles)
+    PROFILE_MAX_FILES    profiles kept; the oldest are deleted (default 100)
+    PROFILE_INTERVAL     seconds between samples (default 0.005)
+
+While a profiled request runs, a background thread snapshots the stack of
+every busy thread (sys._current_frames) each interval. Threads parked in a
+wait (idle pool workers, the writer between batches, the event loop in
+select) are skipped; everything else is kept, so the handler in its worker
+thread, SQL in database.py, the group-commit writer and response encoding all
+show up under their thread's name. Requests that overlap a profiled one show
+up in its profile as well, the way they compete with it for the process.
+
+Each profile is one file of collapsed stacks ("thread;outer;...;inner count"),
+the input format of flamegraph.pl, speedscope and most flame graph viewers.
+Its name is returned in the X-Profile-File response header.
+"""
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import registry
+
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN') or None
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '100'))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', '0.005'))
+PROFILE_MAX_SECONDS = 30  # long-lived responses (the change stream) stop being sampled after this
+PROFILING_ENABLED = PROFILE_TOKEN is not None or PROFILE_SAMPLE_RATE > 0
+
+# Innermost frames of a thread that is waiting for work rather than doing it
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('runners.py', 'run'),  # event loops implemented in C, e.g. uvloop
+}
+
+profiles_written = registry.counter(
+    'profiles_written_total', 'Request profiles written to PROFILE_DIR, by route.', ('route',))
+
+
+def _label(code):
+    return f'{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def _collapse(frame):
+    """Return the stack of frame outermost first, or None if the thread is idle"""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+class Profile:
+    """Samples collected for one request"""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.started = time.monotonic()
+        self.created = datetime.now(timezone.utc)
+        self.stacks = {}
+        self.samples = 0
+        self.route = None
+        self.filename = None
+
+    def add(self, stacks):
+        self.samples += 1
+        for stack in stacks:
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def name(self):
+        """File name of the profile; fixed once the route is known"""
+        if self.filename is None:
+            slug = ''.join(ch if ch.isalnum() else '_' for ch in (self.route or self.path).strip('/'))
+            stamp = self.created.strftime('%Y%m%dT%H%M%S.%f')
+            self.filename = f'{stamp}-{self.method}-{slug or "root"}.folded'
+        return self.filename
+
+
+class Sampler:
+    """One sampling thread, running only while some request is being profiled"""
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._profiles = set()
+        self._thread = None
+        self._switch_interval = None
+
+    def start(self, profile):
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                # The sampler needs the GIL to take a sample; by default a busy
+                # thread only gives it up every 5 ms, far less often than we sample
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, self.interval))
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, profile):
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                targets = [p for p in self._profiles if now - p.started < PROFILE_MAX_SECONDS]
+                if not self._profiles:
+                    sys.setswitchinterval(self._switch_interval)
+                    self._thread = None
+                    return
+            if targets:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                frames = sys._current_frames()
+                stacks = []
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = _collapse(frame)
+                    if stack is not None:
+                        stacks.append(f'{names.get(ident, ident)};{stack}')
+                # Frames keep their locals alive; do not hold them until the next sample
+                frame = frames = None
+                for profile in targets:
+                    profile.add(stacks)
+            time.sleep(self.interval)
+
+
+def write_profile(profile, directory=PROFILE_DIR, max_files=PROFILE_MAX_FILES):
+    """Write the collapsed stacks of a profile and delete the oldest files beyond max_files"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, profile.name())
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(profile.stacks.items()):
+            f.write(f'{stack} {count}\n')
+    os.replace(temporary, path)
+    # Names start with the UTC time, so they sort oldest first
+    existing = sorted(name for name in os.listdir(directory) if name.endswith('.folded'))
+    for name in existing[:max(0, len(existing) - max_files)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+    return path
+
+
+class ProfilerMiddleware:
+    """Profile requests that carry the profiling token, and a random sample of the rest"""
+
+    def __init__(self, app, token=PROFILE_TOKEN, sample_rate=PROFILE_SAMPLE_RATE, directory=PROFILE_DIR):
+        self.app = app
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.sampler = Sampler()
+
+    def _wanted(self, scope):
+        if self.token is not None:
+            for name, value in scope['headers']:
+                if name == b'x-profile':
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope['method'], scope['path'])
+
+        async def send_with_header(message):
+            if message['type'] == 'http.response.start':
+                profile.route = getattr(scope.get('route'), 'path', None)
+                message = {**message, 'headers': [*message.get('headers', ()), (b'x-profile-file', profile.name().encode())]}
+            await send(message)
+
+        self.sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            self.sampler.stop(profile)
+            profile.route = profile.route or getattr(scope.get('route'), 'path', None)
+            try:
+                # File I/O would block the event loop for every other request
+                await run_in_threadpool(write_profile, profile, self.directory)
+                profiles_written.inc(profile.route or 'unmatched')
+            except OSError as e:
+                print(f"Error writing profile {profile.name()}: {str(e)}")
@@ -0,0 +1,185 @@
+"""Fast JSON encoding, cached encoded bodies and negotiated compression.
+
+Large, frequently read responses (the per-student course list) are encoded
+once per data version with orjson and compressed on first request for each
+encoding, so repeated reads cost a dictionary lookup. Everything else that is
+large enough is compressed on the way out by CompressionMiddleware.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+
+import brotli
+import orjson
+from fastapi import Response
+from starlette.concurrency import run_in_threadpool
+
+# Responses smaller than this are sent as they are; compressing them saves
+# less than the headers cost.
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+# Cached bodies are compressed again after every write to them, so they use
+# the same quality as per-request compression: on a course list quality 11
+# takes ~100x as long as 5 to save ~10% of 3 KB.
+BROTLI_QUALITY = 5
+# Bodies at least this large are compressed in the thread pool, so that other
+# requests are not held up on the event loop meanwhile
+OFFLOAD_COMPRESS_SIZE = 16 * 1024
+CACHED_BODIES = 512
+
+ENCODINGS = ('br', 'gzip')
+
+
+def dumps(content):
+    return orjson.dumps(content)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def negotiate(accept_encoding):
+    """Pick the preferred encoding we support from an Accept-Encoding header, or None"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    best = None
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > 0 and (best is None or q > weights.get(best, weights.get('*', 0.0))):
+            best = encoding
+    return best
+
+
+class EncodedBody:
+    """A JSON body encoded once, with its compressed forms built on demand"""
+
+    __slots__ = ('raw', '_compressed', '_lock')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._compressed = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        if encoding is None or len(self.raw) < MIN_COMPRESS_SIZE:
+            return self.raw, None
+        body = self._compressed.get(encoding)
+        if body is None:
+            body = compress(self.raw, encoding)
+            with self._lock:
+                self._compressed[encoding] = body
+        return body, encoding
+
+
+class EncodedResponseCache:
+    """LRU of encoded bodies keyed by (key, data version)"""
+
+    def __init__(self, max_entries=CACHED_BODIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, build):
+        """Return the EncodedBody for key at version, calling build() for the content on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        body = EncodedBody(dumps(build()))
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def encoded_response(request, body, headers=None):
+    """Send an EncodedBody in the best encoding the client accepts"""
+    content, encoding = body.encoded(negotiate(request.headers.get('accept-encoding')))
+    response = Response(content, media_type='application/json', headers=headers)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class CompressionMiddleware:
+    """Compress large single-part responses with brotli or gzip, as the client prefers.
+
+    Responses that already carry a Content-Encoding (the cached bodies above)
+    and streamed responses are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size=MIN_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for name, value in scope['headers']:
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = negotiate(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            headers = [(k, v) for k, v in start['headers']]
+            names = {k.lower() for k, _ in headers}
+            body = message.get('body', b'')
+            if b'content-encoding' in names or message.get('more_body') or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+            if len(body) >= OFFLOAD_COMPRESS_SIZE:
+                body = await run_in_threadpool(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers = [(k, v) for k, v in headers if k.lower() != b'content-length']
+            headers += [
+                (b'content-encoding', encoding.encode()),
+                (b'content-length', str(len(body)).encode()),
+                (b'vary', b'Accept-Encoding'),
+            ]
+            await send({**start, 'headers': headers})
+            await send({**message, 'body': body})
+
+        await self.app(scope, receive, send_compressed)
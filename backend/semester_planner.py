@@ -0,0 +1,614 @@
+"""Automatic semester planning towards graduation.
+
+Planning is done in two searches:
+
+1. Selection. Courses a student must take (remaining compulsory courses, the
+   CS required courses, anything they already marked Planned) are fixed. The
+   rest of the degree rules from degree_requirements are expressed as counts
+   still needed ("2 more compulsory courses of S1", "1 more basic course of
+   S3", ...) and a memoized include/exclude search picks the optional
+   courses that cover them with the fewest ECTS. Rules that no course shares
+   are solved separately, and a branch is cut as soon as the courses left
+   cannot cover what is still needed. A course counts with the ECTS of the
+   prerequisites it brings along. Chosen courses that crowd the semesters
+   they can go in are swapped for ones covering the same rules, and
+   electives are then added until the plan reaches TOTAL_ECTS.
+
+2. Scheduling. Each chosen course goes into a semester of the same parity as
+   its curriculum semester, after its prerequisites, within the per-semester
+   ECTS caps and, if asked, never next to a course it clashes with in the
+   timetable. A depth-first search places the most constrained courses
+   first, prunes when the room left from some semester on cannot hold the
+   courses that must go there, memoizes states that failed, and is run with
+   the last semester pushed out one at a time, so the first plan found
+   graduates as early as possible.
+"""
+from database import get_all_courses, get_profile_with_id, update_courses_batch
+from degree_requirements import (
+    CS_REQUIRED_CODES,
+    DIRECTION_SPECIALITIES,
+    DIRECTION_TOTAL,
+    FINAL_TOTAL,
+    GENERAL_EDUCATION_TOTAL,
+    GRADUATION_BASIC_TOTAL,
+    PROJECT_TOTAL,
+    SPECIALITIES_TOTAL,
+    SPECIALITY_BASIC_TOTAL,
+    SPECIALITY_COMPULSORY_TOTAL,
+    TOTAL_ECTS,
+)
+from prerequisites import prerequisite_graph
+from timetable import timetable_service
+
+DONE_STATUSES = ('Passed', 'Current Semester')
+REMAINING_STATUSES = ('Not Taken', 'Failed', 'Planned')
+DEFAULT_MAX_ECTS = 42
+LAST_SEMESTER = 8
+MAX_LAST_SEMESTER = 12
+# Placement attempts before the scheduler gives up on an exact plan and falls
+# back to filling semesters in curriculum order; bounds the worst case when the
+# caps are too tight for any plan.
+MAX_SEARCH_STEPS = 20000
+
+
+######### REQUIREMENT COUNTS #########
+
+def _rules(direction, specialities):
+    """Return [(name, total, predicate)] for the degree rules that count courses"""
+    available = DIRECTION_SPECIALITIES[direction]
+    rules = [
+        ('general_education', GENERAL_EDUCATION_TOTAL, lambda c: c['type'] == 'ΓΠ'),
+        ('direction', DIRECTION_TOTAL, lambda c: c['type'] == 'ΕΥΜ' and c['direction'] == direction),
+        ('direction_project', PROJECT_TOTAL, lambda c: c['type'] == 'Project' and c['direction'] == direction),
+        ('final_courses', FINAL_TOTAL, lambda c: c['type'] in ('ΠΡ', 'ΠΤ')),
+        ('graduation_basic', GRADUATION_BASIC_TOTAL, lambda c: any(c[s] == 'B' for s in available)),
+    ]
+    for s in specialities:
+        rules.append((f'{s}:compulsory', SPECIALITY_COMPULSORY_TOTAL, lambda c, s=s: c['type'] == 'ΕΥΜ' and c[s] == 'Υ'))
+        rules.append((f'{s}:basic', SPECIALITY_BASIC_TOTAL, lambda c, s=s: c[s] == 'B'))
+    # Graduation also needs a basic course from every speciality of the direction
+    for s in available:
+        rules.append((f'{s}:represented', 1, lambda c, s=s: c[s] == 'B'))
+    return rules
+
+
+def _choose_specialities(direction, done, requested):
+    available = DIRECTION_SPECIALITIES[direction]
+    if requested:
+        requested = list(dict.fromkeys(requested))
+        invalid = [s for s in requested if s not in available]
+        if invalid:
+            raise ValueError(f"Specialities {invalid} are not offered by direction {direction}; choose from {list(available)}")
+        if len(requested) != SPECIALITIES_TOTAL:
+            raise ValueError(f"Choose exactly {SPECIALITIES_TOTAL} specialities")
+        return requested
+    # Default to the specialities the student is furthest along in
+    progress = {s: sum(1 for c in done if c[s] is not None) for s in available}
+    return sorted(available, key=lambda s: (-progress[s], available.index(s)))[:SPECIALITIES_TOTAL]
+
+
+class _Cover:
+    """Minimum-ECTS choice of courses covering a vector of counts still needed.
+
+    costs are the ECTS each candidate really adds, prerequisites it drags in
+    included; they default to its own ECTS.
+    """
+
+    def __init__(self, candidates, contributions, costs=None):
+        self.candidates = candidates
+        self.contributions = contributions
+        self.costs = costs or [c['ects'] or 0 for c in candidates]
+        # What the candidates from i on can still contribute, per rule
+        self.capacity = [None] * (len(candidates) + 1)
+        self.capacity[-1] = (0,) * (len(contributions[0]) if contributions else 0)
+        for i in range(len(candidates) - 1, -1, -1):
+            self.capacity[i] = tuple(a + b for a, b in zip(self.capacity[i + 1], contributions[i]))
+        self.memo = {}
+
+    def solve(self, i, needs):
+        """Return (ects, courses, taken) for the best cover of needs from candidates[i:], or None"""
+        if not any(needs):
+            return 0, 0, ()
+        if i == len(self.candidates) or any(n > c for n, c in zip(needs, self.capacity[i])):
+            return None
+        key = (i, needs)
+        if key in self.memo:
+            return self.memo[key]
+        best = self.solve(i + 1, needs)
+        contribution = self.contributions[i]
+        if any(n and c for n, c in zip(needs, contribution)):
+            rest = self.solve(i + 1, tuple(max(0, n - c) for n, c in zip(needs, contribution)))
+            if rest is not None:
+                taken = (self.costs[i] + rest[0], 1 + rest[1], (i, *rest[2]))
+                if best is None or taken[:2] < best[:2]:
+                    best = taken
+        self.memo[key] = best
+        return best
+
+
+def _components(needed, contributions):
+    """Group rule indexes that share a candidate course (union-find)"""
+    parent = {r: r for r in needed}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for contribution in contributions:
+        rules = [r for r in needed if contribution[r]]
+        for r in rules[1:]:
+            parent[find(r)] = find(rules[0])
+    groups = {}
+    for r in needed:
+        groups.setdefault(find(r), []).append(r)
+    return list(groups.values())
+
+
+def _earliest_semester(course, first_semester):
+    """First semester from first_semester on with the parity of the course's curriculum semester"""
+    semester = max(first_semester, course['semester'])
+    return semester if semester % 2 == course['semester'] % 2 else semester + 1
+
+
+def _overload(courses, caps):
+    """ECTS by which the courses overflow caps, counting only when each can start.
+
+    Courses of one parity compete for the room of that parity's semesters
+    from their earliest one on, so from every semester onwards the room left
+    must cover the courses that cannot start any earlier; the result is the
+    worst shortfall, 0 when they may all fit.
+    """
+    first_semester, last_semester = min(caps), max(caps)
+    need = {}
+    for c in courses:
+        earliest = min(_earliest_semester(c, first_semester), last_semester + 1)
+        need[earliest] = need.get(earliest, 0) + (c['ects'] or 0)
+    pending = [0, 0]
+    room = [0, 0]
+    worst = need.get(last_semester + 1, 0)
+    for s in sorted(caps, reverse=True):
+        room[s % 2] += caps[s]
+        pending[s % 2] += need.get(s, 0)
+        worst = max(worst, pending[s % 2] - room[s % 2])
+    return worst
+
+
+def _rebalance(selected, chosen, candidates, contributions, courses, taken_codes, caps):
+    """Swap chosen courses for ones counting towards the same rules while that makes the selection fit caps better"""
+    graph = prerequisite_graph.graph
+    alternatives = {}
+    for c, contribution in zip(candidates, contributions):
+        alternatives.setdefault(contribution, []).append(c)
+    contribution_of = {c['id']: contribution for c, contribution in zip(candidates, contributions)}
+    overload = _overload(selected, caps)
+    improved = True
+    while overload and improved:
+        improved = False
+        selected_ids = {c['id'] for c in selected}
+        needed = 0
+        for c in selected:
+            if c['id'] in graph.bit:
+                needed |= graph.requires[graph.bit[c['id']]]
+        for old in list(chosen):
+            if old['id'] in graph.bit and needed >> graph.bit[old['id']] & 1:
+                continue
+            rest = [c for c in selected if c['id'] != old['id']]
+            codes = taken_codes - {old['code']}
+            for new in alternatives[contribution_of[old['id']]]:
+                if new['code'] in codes or new['id'] in selected_ids:
+                    continue
+                group = [new, *_prerequisites_of([new], courses, set(codes) | {new['code']})]
+                trial = _overload(rest + group, caps)
+                if trial < overload:
+                    selected[:] = rest + group
+                    chosen[chosen.index(old)] = new
+                    taken_codes.discard(old['code'])
+                    taken_codes.update(c['code'] for c in group)
+                    overload = trial
+                    improved = True
+                    break
+            if improved:
+                break
+    return selected
+
+
+def select_courses(courses, direction, specialities=None, caps=None):
+    """Pick the remaining courses to take.
+
+    With caps ({semester: max ECTS}), electives that could no longer fit in
+    the semesters left are passed over. Returns (selected courses, chosen
+    specialities, {rule: count still missing}) where the last is empty when
+    the selection meets every rule.
+    """
+    done = [c for c in courses if c['status'] in DONE_STATUSES]
+    done_codes = {c['code'] for c in done}
+    other_directions = set(DIRECTION_SPECIALITIES) - {direction}
+    remaining = [
+        c for c in courses
+        if c['status'] in REMAINING_STATUSES and c['direction'] not in other_directions and c['code'] not in done_codes
+    ]
+    specialities = _choose_specialities(direction, done, specialities)
+    rules = _rules(direction, specialities)
+
+    forced = [
+        c for c in remaining
+        if c['type'] == 'ΥΜ' or c['status'] == 'Planned' or (direction == 'CS' and c['code'] in CS_REQUIRED_CODES)
+    ]
+    forced_ids = {c['id'] for c in forced}
+    needs = [
+        max(0, total - sum(1 for c in (*done, *forced) if applies(c)))
+        for _, total, applies in rules
+    ]
+
+    # The same course is listed once per semester it is offered in; keep one
+    seen_codes = {c['code'] for c in forced}
+    candidates = []
+    for c in sorted(remaining, key=lambda c: (c['semester'], c['id'])):
+        if c['id'] not in forced_ids and c['code'] not in seen_codes:
+            seen_codes.add(c['code'])
+            candidates.append(c)
+    contributions = [tuple(1 if applies(c) else 0 for _, _, applies in rules) for c in candidates]
+    forced_codes = done_codes | {c['code'] for c in forced}
+    costs = [
+        sum(course['ects'] or 0 for course in (c, *_prerequisites_of([c], courses, set(forced_codes) | {c['code']})))
+        for c in candidates
+    ]
+
+    chosen = []
+    missing = {}
+    for component in _components([r for r, n in enumerate(needs) if n], contributions):
+        useful = [i for i, contribution in enumerate(contributions) if any(contribution[r] for r in component)]
+        # Courses that count towards more rules first, so good covers are found early
+        useful.sort(key=lambda i: (-sum(contributions[i][r] for r in component), costs[i]))
+        cover = _Cover(
+            [candidates[i] for i in useful],
+            [tuple(contributions[i][r] for r in component) for i in useful],
+            [costs[i] for i in useful],
+        )
+        result = cover.solve(0, tuple(needs[r] for r in component))
+        if result is None:
+            # Cannot be met: take everything that helps and report the rest
+            taken = range(len(useful))
+            for r in component:
+                short = needs[r] - sum(contributions[i][r] for i in useful)
+                if short > 0:
+                    missing[rules[r][0]] = short
+        else:
+            taken = result[2]
+        chosen.extend(candidates[useful[k]] for k in taken)
+
+    selected = forced + chosen
+    selected += _prerequisites_of(selected, courses, done_codes | {c['code'] for c in selected})
+    taken_codes = done_codes | {c['code'] for c in selected}
+    if caps:
+        _rebalance(selected, chosen, candidates, contributions, courses, taken_codes, caps)
+    # Top up with electives until the degree's ECTS are reached, preferring
+    # basic courses of the chosen specialities and earlier semesters; an
+    # elective brings along whatever it needs that is not taken yet
+    ects = sum(c['ects'] or 0 for c in (*done, *selected))
+    electives = sorted(
+        (c for c in candidates if c['code'] not in taken_codes),
+        key=lambda c: (-sum(1 for s in specialities if c[s] == 'B'), c['semester'], c['id']),
+    )
+    for c in electives:
+        if ects >= TOTAL_ECTS:
+            break
+        if c['code'] in taken_codes:
+            continue
+        group = [c, *_prerequisites_of([c], courses, set(taken_codes) | {c['code']})]
+        if caps and _overload(selected + group, caps):
+            continue
+        taken_codes.update(course['code'] for course in group)
+        selected += group
+        ects += sum(course['ects'] or 0 for course in group)
+    if ects < TOTAL_ECTS:
+        missing['ects'] = TOTAL_ECTS - ects
+    return selected, specialities, missing
+
+
+def _prerequisites_of(selected, courses, taken_codes):
+    """Courses the selected ones need, directly or not, whose codes are not taken yet.
+
+    Adds the codes of the returned courses to taken_codes.
+    """
+    graph = prerequisite_graph.graph
+    by_id = {c['id']: c for c in courses}
+    codes = taken_codes
+    added = []
+    for c in selected:
+        i = graph.bit.get(c['id'])
+        if i is None:
+            continue
+        for course_id in graph.course_ids(graph.requires[i]):
+            course = by_id[course_id]
+            if course['code'] not in codes and course['status'] in REMAINING_STATUSES:
+                codes.add(course['code'])
+                added.append(course)
+    return added
+
+
+######### SCHEDULING #########
+
+class _SearchExhausted(Exception):
+    pass
+
+
+class _Schedule:
+    """Depth-first placement of courses into semesters"""
+
+    def __init__(self, courses, semesters, caps, conflicts, requires=(), budget=MAX_SEARCH_STEPS):
+        # Most constrained first: fewest semesters to choose from, then largest
+        self.courses = sorted(courses, key=lambda c: (len(semesters[c['id']]), -(c['ects'] or 0), semesters[c['id']], c['id']))
+        self.semesters = semesters
+        self.caps = caps
+        self.index = {c['id']: i for i, c in enumerate(self.courses)}
+        n = len(self.courses)
+        self.conflicts = [0] * n
+        for a, b in conflicts:
+            if a in self.index and b in self.index:
+                self.conflicts[self.index[a]] |= 1 << self.index[b]
+                self.conflicts[self.index[b]] |= 1 << self.index[a]
+        # Ordering between courses: (j, strict) in after[i] means course i
+        # goes after j (strictly for a prerequisite, not before it for a
+        # co-requisite); before[j] holds the same pairs seen from j.
+        self.after = [[] for _ in range(n)]
+        self.before = [[] for _ in range(n)]
+        ordered = [0] * n
+        for course_id, requires_id, kind in requires:
+            if course_id in self.index and requires_id in self.index:
+                i, j = self.index[course_id], self.index[requires_id]
+                strict = kind != 'corequisite'
+                self.after[i].append((j, strict))
+                self.before[j].append((i, strict))
+                ordered[i] |= 1 << j
+                ordered[j] |= 1 << i
+        # Courses from i on that clash with anything; only these matter in a memo key
+        self.relevant = [0] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            self.relevant[i] = self.relevant[i + 1] | self.conflicts[i]
+        # Placed courses (before i) ordered against a course from i on; their
+        # semesters matter in a memo key too
+        self.linked = [[j for j in range(i) if ordered[j] >> i] for i in range(n + 1)]
+        # Courses with the same ECTS and semesters and no clashes or ordering
+        # are interchangeable; placing them in non-decreasing semesters skips
+        # every permutation of an already failed placement.
+        free = [not self.conflicts[i] and not ordered[i] for i in range(n)]
+        self.same_as_previous = [
+            i > 0 and free[i] and free[i - 1]
+            and (c['ects'] or 0) == (self.courses[i - 1]['ects'] or 0)
+            and semesters[c['id']] == semesters[self.courses[i - 1]['id']]
+            for i, c in enumerate(self.courses)
+        ]
+        self.budget = budget
+        self.failed = set()
+
+    def place(self, last):
+        """Return {course id: semester} using semesters up to last, or None.
+
+        Sets exhausted when the search ran out of steps before an answer.
+        """
+        order = [s for s in sorted(self.caps) if s <= last]
+        self.order = order
+        self.slot = {s: k for k, s in enumerate(order)}
+        self.failed = set()
+        loads = [0] * len(order)
+        members = [0] * len(order)
+        assignment = {}
+        self.exhausted = False
+        try:
+            if self._place(0, loads, members, assignment, last):
+                return assignment
+        except _SearchExhausted:
+            self.exhausted = True
+        return None
+
+    def _fits(self, i, loads):
+        """Can the courses from i on still fit, ignoring how ECTS split into courses?
+
+        Every course may go in any semester of its parity from its earliest
+        one on, so it is enough to check, from each semester onwards, that the
+        room left covers the courses that cannot start any earlier.
+        """
+        need = {}
+        for c in self.courses[i:]:
+            earliest = self.semesters[c['id']][0]
+            need[earliest] = need.get(earliest, 0) + (c['ects'] or 0)
+        pending = [0, 0]
+        room = [0, 0]
+        for s in reversed(self.order):
+            room[s % 2] += self.caps[s] - loads[self.slot[s]]
+            pending[s % 2] += need.get(s, 0)
+            if pending[s % 2] > room[s % 2]:
+                return False
+        return True
+
+    def _ordered(self, i, semester, assignment):
+        """Does semester for course i keep it in order with the courses placed so far?"""
+        for j, strict in self.after[i]:
+            placed = assignment.get(self.courses[j]['id'])
+            if placed is not None and (placed >= semester if strict else placed > semester):
+                return False
+        for j, strict in self.before[i]:
+            placed = assignment.get(self.courses[j]['id'])
+            if placed is not None and (placed <= semester if strict else placed < semester):
+                return False
+        return True
+
+    def _place(self, i, loads, members, assignment, last):
+        if i == len(self.courses):
+            return True
+        relevant = self.relevant[i]
+        key = (i, tuple(loads), tuple(m & relevant for m in members),
+               tuple(assignment[self.courses[j]['id']] for j in self.linked[i]))
+        if key in self.failed or not self._fits(i, loads):
+            return False
+        self.budget -= 1
+        if self.budget < 0:
+            raise _SearchExhausted()
+        course = self.courses[i]
+        ects = course['ects'] or 0
+        bit = 1 << i
+        after = assignment[self.courses[i - 1]['id']] if self.same_as_previous[i] else 0
+        for semester in self.semesters[course['id']]:
+            if semester > last:
+                break
+            if semester < after:
+                continue
+            k = self.slot[semester]
+            if loads[k] + ects > self.caps[semester] or members[k] & self.conflicts[i]:
+                continue
+            if not self._ordered(i, semester, assignment):
+                continue
+            loads[k] += ects
+            members[k] |= bit
+            assignment[course['id']] = semester
+            if self._place(i + 1, loads, members, assignment, last):
+                return True
+            loads[k] -= ects
+            members[k] &= ~bit
+            del assignment[course['id']]
+        self.failed.add(key)
+        return False
+
+
+def schedule_courses(courses, first_semester, last_semester, caps, conflicts=(), requires=()):
+    """Assign courses to semesters, graduating as early as possible.
+
+    requires holds (course id, required course id, kind) edges between the
+    courses: a prerequisite goes in an earlier semester, a co-requisite in
+    the same one or earlier. Returns ({course id: semester}, unscheduled
+    courses). When no complete schedule exists, or none is found within
+    MAX_SEARCH_STEPS, as many courses as fit are placed in curriculum order.
+    """
+    earliest = {c['id']: _earliest_semester(c, first_semester) for c in courses}
+    # A course cannot start before what it requires; edges are few, so
+    # relaxing them until nothing moves is enough
+    parity = {c['id']: c['semester'] % 2 for c in courses}
+    requires = [edge for edge in requires if edge[0] in earliest and edge[1] in earliest]
+    moved = True
+    while moved:
+        moved = False
+        for course_id, requires_id, kind in requires:
+            bound = earliest[requires_id] + (0 if kind == 'corequisite' else 1)
+            if bound % 2 != parity[course_id]:
+                bound += 1
+            if bound > earliest[course_id]:
+                earliest[course_id] = bound
+                moved = True
+    semesters = {course_id: list(range(semester, last_semester + 1, 2)) for course_id, semester in earliest.items()}
+    schedule = _Schedule([c for c in courses if semesters[c['id']]], semesters, caps, conflicts, requires)
+    earliest_end = max((semesters[c['id']][0] for c in schedule.courses), default=first_semester)
+    for last in range(earliest_end, last_semester + 1):
+        assignment = schedule.place(last)
+        if assignment is not None:
+            return assignment, [c for c in courses if c['id'] not in assignment]
+        if schedule.exhausted:
+            break
+
+    assignment = {}
+    loads = {s: 0 for s in caps}
+    conflicting = {}
+    for a, b in conflicts:
+        conflicting.setdefault(a, set()).add(b)
+        conflicting.setdefault(b, set()).add(a)
+    after = {}
+    for course_id, requires_id, kind in requires:
+        after.setdefault(course_id, []).append((requires_id, kind != 'corequisite'))
+    for c in sorted(courses, key=lambda c: (earliest[c['id']], c['semester'], c['id'])):
+        for semester in semesters[c['id']]:
+            clash = any(assignment.get(other) == semester for other in conflicting.get(c['id'], ()))
+            # What it requires comes earlier in this order; if that was left
+            # out, so is this
+            early = any(
+                requires_id not in assignment or (assignment[requires_id] >= semester if strict else assignment[requires_id] > semester)
+                for requires_id, strict in after.get(c['id'], ())
+            )
+            if loads[semester] + (c['ects'] or 0) <= caps[semester] and not clash and not early:
+                assignment[c['id']] = semester
+                loads[semester] += c['ects'] or 0
+                break
+    return assignment, [c for c in courses if c['id'] not in assignment]
+
+
+######### PLANNER #########
+
+def _course_summary(course):
+    return {'id': course['id'], 'code': course['code'], 'name': course['name'],
+            'ects': course['ects'], 'semester': course['semester']}
+
+def plan_semesters(student_id, max_ects=DEFAULT_MAX_ECTS, ects_caps=None, specialities=None,
+                   avoid_conflicts=True, last_semester=LAST_SEMESTER, apply=True):
+    """Build, and unless apply is False save, a graduation plan for a student.
+
+    Returns None if the student does not exist. Raises ValueError when the
+    student has no direction or the options are invalid.
+    """
+    profile = get_profile_with_id(student_id)
+    if profile is None:
+        return None
+    direction = profile['direction']
+    if direction not in DIRECTION_SPECIALITIES:
+        raise ValueError("Choose a direction before planning semesters")
+    if not 1 <= last_semester <= MAX_LAST_SEMESTER:
+        raise ValueError(f"last_semester must be between 1 and {MAX_LAST_SEMESTER}")
+
+    courses = get_all_courses(student_id)
+    first_semester = (profile['current_semester'] or 0) + 1
+    caps = {s: (ects_caps or {}).get(s, max_ects) for s in range(first_semester, last_semester + 1)}
+    selected, specialities, missing = select_courses(courses, direction, specialities, caps)
+
+    conflicts = set()
+    if avoid_conflicts:
+        for conflict in timetable_service.conflicts_for(selected, profile['sdi']):
+            conflicts.add(tuple(sorted(slot['course_id'] for slot in conflict['courses'])))
+    selected_ids = {c['id'] for c in selected}
+    requires = [
+        (edge['course_id'], edge['requires_id'], edge['kind']) for edge in prerequisite_graph.edges()
+        if edge['course_id'] in selected_ids and edge['requires_id'] in selected_ids
+    ]
+    assignment, unscheduled = schedule_courses(selected, first_semester, last_semester, caps, conflicts, requires)
+
+    if apply:
+        # A Failed course keeps its status so the failure stays on record; the
+        # plan only gives it a semester
+        status_of = {c['id']: c['status'] for c in selected}
+        mutations = [
+            {'course_id': course_id, 'planned_semester': semester}
+            if status_of[course_id] == 'Failed' else
+            {'course_id': course_id, 'status': 'Planned', 'planned_semester': semester}
+            for course_id, semester in assignment.items()
+        ]
+        # Courses planned earlier that no longer fit go back to the unassigned list
+        mutations += [
+            {'course_id': c['id'], 'planned_semester': 0}
+            for c in unscheduled if c['status'] == 'Planned' or (c['status'] == 'Failed' and c['planned_semester'])
+        ]
+        if mutations:
+            update_courses_batch(mutations, student_id)
+
+    by_semester = {s: [] for s in caps}
+    for c in selected:
+        if c['id'] in assignment:
+            by_semester[assignment[c['id']]].append(c)
+    completed = sum(c['ects'] or 0 for c in courses if c['status'] in DONE_STATUSES)
+    planned = sum(c['ects'] or 0 for c in selected if c['id'] in assignment)
+    return {
+        'direction': direction,
+        'specialities': specialities,
+        'graduation_semester': max(assignment.values(), default=None),
+        'ects': {'completed': completed, 'planned': planned, 'total': TOTAL_ECTS},
+        'semesters': [
+            {
+                'semester': s,
+                'ects': sum(c['ects'] or 0 for c in by_semester[s]),
+                'max_ects': caps[s],
+                'courses': [_course_summary(c) for c in sorted(by_semester[s], key=lambda c: (c['semester'], c['id']))],
+            }
+            for s in sorted(by_semester)
+        ],
+        'unscheduled': [_course_summary(c) for c in unscheduled],
+        'unmet': missing,
+        'applied': apply,
+    }
@@ -1,46 +1,93 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from anyio import CapacityLimiter, to_thread
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Literal, Optional
 from contextlib import asynccontextmanager
-import os
+from email.utils import formatdate, parsedate_to_datetime
+import functools
+import sqlite3
+import time
 from database import (
-    init_database,
+    migrate_database,
+    create_student,
     get_all_courses,
     get_course_by_id,
-    get_sdi_with_id,
-    get_first_name_with_id,
-    get_last_name_with_id,
-    get_current_semester_with_id,
-    get_direction_with_id,
-    update_course_status,
+    get_changes_since,
+    COURSE_STATUSES,
+    query_courses,
+    search_courses,
+    MAX_SEARCH_RESULTS,
+    get_profile_with_id,
     update_course_grade,
     update_course_planned_semester,
+    update_courses_batch,
+    update_profile_with_id,
     update_sdi_with_id,
     update_first_name_with_id,
     update_last_name_with_id,
     update_current_semester_with_id,
     update_direction_with_id,
-    get_language_with_id,
     update_language_with_id,
-    DATABASE_PATH
+    close_pool,
+    data_version,
+    DATABASE_POOL_SIZE,
+    WRITE_THREADS,
+    DEFAULT_STUDENT_ID
 )
+from degree_requirements import requirements_engine
+from timetable import timetable_service
+from grade_planning import GradePlan, MAX_SCENARIOS
+from prerequisites import prerequisite_graph
+from cohort_stats import get_cohort_stats, get_course_cohort_stats
+from semester_planner import plan_semesters, DEFAULT_MAX_ECTS, LAST_SEMESTER, MAX_LAST_SEMESTER
+from metrics import MetricsMiddleware, registry
+from responses import CompressionMiddleware, EncodedResponseCache, encoded_response
+from change_stream import change_broker
+from single_flight import SingleFlight
+from profiler import PROFILING_ENABLED, ProfilerMiddleware
+from transcripts import EXPORTERS, MEDIA_TYPES, TranscriptImport, TranscriptParser, format_for
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    if not os.path.exists(DATABASE_PATH):
-        init_database()
-        print("Database initialized successfully")
+    # Sync endpoints run on anyio's threadpool, 40 threads by default. With
+    # more threads than pooled connections a load spike times requests out
+    # waiting for a connection; with as many, excess requests queue for a
+    # thread instead.
+    to_thread.current_default_thread_limiter().total_tokens = DATABASE_POOL_SIZE
+    # Write routes wait on the group-commit writer instead; sharing those
+    # threads would cap every commit at DATABASE_POOL_SIZE writes
+    global write_limiter
+    write_limiter = CapacityLimiter(WRITE_THREADS)
+    requirements_engine.attach()
+    timetable_service.attach()
+    change_broker.attach()
+    prerequisite_graph.attach()
+    applied = migrate_database()
+    if applied:
+        print(f"Database migrated to schema version {applied[-1]}")
     else:
-        print("Database already exists, skipping initialization")
+        print("Database schema is up to date")
     
     yield  # This is where the application runs
     
     # Shutdown (if you need any cleanup)
+    close_pool()
     print("Application shutting down")
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+write_limiter = None
+
+def write_endpoint(endpoint):
+    # Runs a sync endpoint that writes on the write threads rather than the
+    # read threads; FastAPI still sees its signature through functools.wraps
+    @functools.wraps(endpoint)
+    async def run(*args, **kwargs):
+        return await to_thread.run_sync(functools.partial(endpoint, *args, **kwargs), limiter=write_limiter)
+    return run
 
 # CORS middleware
 app.add_middleware(
@@ -50,11 +97,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# Only installed when PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set, so requests
+# pay nothing for it otherwise
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+# Outermost, so the recorded latency covers every other middleware too,
+# the profiler's overhead included
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/metrics")
+def api_get_metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Remove this entire block:
 # @app.on_event("startup")
 # def startup_event():
@@ -65,12 +124,45 @@ def health_check():
 #         print("Database already exists, skipping initialization")
 
 # Models
+CourseStatus = Literal[COURSE_STATUSES]
+
 class CourseGradeUpdate(BaseModel):
     grade: float
 class CourseStatusUpdate(BaseModel):
-    status: str
+    status: CourseStatus
 class CoursePlannedSemesterUpdate(BaseModel):
     planned_semester: int
+class CourseMutation(BaseModel):
+    course_id: int
+    status: Optional[CourseStatus] = None
+    grade: Optional[float] = None
+    planned_semester: Optional[int] = None
+
+    # Leaving a field out means "no change" and null clears the grade, but
+    # status and planned_semester always have a value
+    @field_validator("status", "planned_semester")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("cannot be null")
+        return value
+class CourseBatchUpdate(BaseModel):
+    updates: List[CourseMutation]
+class GradeScenario(BaseModel):
+    target: float
+    grades: Dict[int, float] = {}
+class GradeScenarios(BaseModel):
+    scenarios: List[GradeScenario]
+class SemesterPlanRequest(BaseModel):
+    max_ects: int = Field(DEFAULT_MAX_ECTS, ge=1)
+    ects_caps: Dict[int, int] = {}
+    specialities: Optional[List[str]] = None
+    avoid_conflicts: bool = True
+    last_semester: int = Field(LAST_SEMESTER, ge=1, le=MAX_LAST_SEMESTER)
+    apply: bool = True
+class PlanValidationRequest(BaseModel):
+    # {course_id: planned_semester} applied over the saved plan; 0 unplans
+    plan: Dict[int, int] = {}
 class SdiUpdate(BaseModel):
     sdi: int  
 class FirstnameUpdate(BaseModel):
@@ -86,6 +178,14 @@ class ProfileFieldUpdate(BaseModel):
 class LanguageUpdate(BaseModel):
     language: str
 
+class StudentCreate(BaseModel):
+    sdi: int = 0
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    current_semester: int = 0
+    direction: Optional[str] = None
+    language: str = 'en'
+
 class FullProfileUpdate(BaseModel):
     sdi: Optional[int] = None
     first_name: Optional[str] = None
@@ -94,73 +194,290 @@ class FullProfileUpdate(BaseModel):
     direction: Optional[str] = None
     language: Optional[str] = None
 
+# Every course and profile endpoint works on one student's data. Until there is
+# authentication the student is picked with ?student_id=, defaulting to the
+# original single profile.
+def get_student_id(student_id: int = Query(DEFAULT_STUDENT_ID, ge=1)) -> int:
+    return student_id
+
+def student_not_found() -> HTTPException:
+    return HTTPException(status_code=404, detail="Student not found")
+
+def write_integrity_error(e: sqlite3.IntegrityError, context: str) -> HTTPException:
+    # student_courses rows reference profile(id), so writing state for an
+    # unknown student fails the foreign key check; any other constraint
+    # failing is a bug, not a missing student
+    if "FOREIGN KEY" in str(e):
+        return student_not_found()
+    return HTTPException(status_code=500, detail=f"{context}: {str(e)}")
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as required for If-None-Match
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+def second_is_over(modified_at: float) -> bool:
+    # HTTP dates have one-second resolution: until the second of the last
+    # write is over, another write can still land in it with the same date
+    return int(modified_at) < int(time.time())
+
+def not_modified_since(if_modified_since: str, modified_at: float) -> bool:
+    if not second_is_over(modified_at):
+        return False
+    try:
+        return int(modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+def check_not_modified(request: Request, response: Response, student_id: int = Depends(get_student_id)) -> int:
+    """Answer conditional GETs from the in-memory data version.
+
+    Raises a 304 without touching the database when the client's copy is
+    current, otherwise sets ETag/Last-Modified on the response and returns the
+    student id. The version is read before the endpoint queries, so a write
+    racing with the query can only make the ETag older than the data, which
+    costs the client one extra full response rather than a stale one.
+    Last-Modified is only sent once the second of the last write is over, so
+    a client revalidating with If-Modified-Since alone cannot be given a 304
+    for a later write in that same second; until then it has the ETag.
+    """
+    version, modified_at = data_version.for_student(student_id)
+    headers = {
+        "ETag": f'W/"{data_version.epoch}-{student_id}-{version}"',
+        "Cache-Control": "no-cache",
+    }
+    if second_is_over(modified_at):
+        headers["Last-Modified"] = formatdate(modified_at, usegmt=True)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, headers["ETag"])
+    else:
+        fresh = not_modified_since(request.headers.get("if-modified-since"), modified_at)
+    if fresh:
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return student_id
+
 # API Endpoints
 ######### GET ENDPOINTS #########
+# Encoded /api/courses bodies per student, reused until their data version moves
+courses_responses = EncodedResponseCache()
+# Concurrent identical reads (same student and data version) share one query;
+# see single_flight.py
+courses_flight = SingleFlight("/api/courses")
+profile_flight = SingleFlight("/api/profile")
+
+def read_profile(student_id: int) -> Optional[dict]:
+    # Backs /api/profile and every /api/profile/<field>, so a page that loads
+    # several fields at once runs one query
+    version, _ = data_version.for_student(student_id)
+    return profile_flight.do((student_id, version), lambda: get_profile_with_id(student_id))
+
 @app.get("/api/courses")
-def api_get_courses():
+def api_get_courses(
+    request: Request,
+    response: Response,
+    since: Optional[int] = Query(None, ge=0),
+    status: Optional[List[str]] = Query(None),
+    semester: Optional[List[int]] = Query(None),
+    planned_semester: Optional[List[int]] = Query(None),
+    course_type: Optional[List[str]] = Query(None, alias="type"),
+    direction: Optional[List[str]] = Query(None),
+    speciality: Optional[List[str]] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated course keys to return; id is always included"),
+    student_id: int = Depends(check_not_modified),
+):
+    # Repeat a filter for several values (?status=Failed&status=Planned); a
+    # course must match every filter given. Filtered or projected responses are
+    # queried in SQL for just those rows and columns instead of the cache below.
+    filters = {
+        "status": status, "semester": semester, "planned_semester": planned_semester,
+        "type": course_type, "direction": direction, "speciality": speciality,
+    }
+    filters = {name: tuple(values) for name, values in filters.items() if values}
+    if fields is not None:
+        fields = tuple(f.strip() for f in fields.split(",") if f.strip())
+    if filters or fields is not None:
+        if since is not None:
+            raise HTTPException(status_code=400, detail="since cannot be combined with filters or fields")
+        try:
+            if read_profile(student_id) is None:
+                raise student_not_found()
+            version, _ = data_version.for_student(student_id)
+            return courses_flight.do(
+                (student_id, version, tuple(sorted(filters.items())), fields),
+                lambda: query_courses(student_id, filters, fields),
+            )
+        except HTTPException:
+            raise
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error loading courses: {str(e)}")
+    if since is not None:
+        # Delta sync: {"version", "full", "courses", "profile"}; pass the
+        # returned version as ?since= next time. See get_changes_since.
+        try:
+            if read_profile(student_id) is None:
+                raise student_not_found()
+            version, _ = data_version.for_student(student_id)
+            return courses_flight.do((student_id, version, since), lambda: get_changes_since(student_id, since))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error loading course changes: {str(e)}")
     try:
-        courses = get_all_courses()
-        return courses
+        # The catalog cache raises LookupError for an unknown student, so the
+        # cached path needs no profile query of its own
+        version, _ = data_version.for_student(student_id)
+        body = courses_flight.do(
+            (student_id, version),
+            lambda: courses_responses.get(student_id, version, lambda: get_all_courses(student_id)),
+        )
+    except LookupError:
+        raise student_not_found()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading courses: {str(e)}")
+    # Returning a Response skips FastAPI's re-encoding, so the headers set by
+    # check_not_modified have to be copied over
+    return encoded_response(request, body, headers=dict(response.headers))
+
+@app.get("/api/courses/search")
+def api_search_courses(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    student_id: int = Depends(check_not_modified),
+):
+    try:
+        return search_courses(q, student_id, limit)
+    except LookupError:
+        raise student_not_found()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching courses: {str(e)}")
+
+@app.get("/api/courses/export")
+def api_export_courses(
+    request: Request,
+    response: Response,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    student_id: int = Depends(check_not_modified),
+):
+    try:
+        if get_profile_with_id(student_id) is None:
+            raise HTTPException(status_code=404, detail="User profile not found")
+        courses = get_all_courses(student_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting courses: {str(e)}")
+    headers = dict(response.headers)
+    headers["Content-Disposition"] = f'attachment; filename="courses-{student_id}.{format}"'
+    return StreamingResponse(EXPORTERS[format](courses), media_type=MEDIA_TYPES[format], headers=headers)
+
+@app.get("/api/changes/stream")
+async def api_stream_changes(student_id: int = Depends(get_student_id)):
+    # Server-sent events for the student's writes; see change_stream.py
+    try:
+        if await run_in_threadpool(get_profile_with_id, student_id) is None:
+            raise student_not_found()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading profile: {str(e)}")
+    subscription = change_broker.subscribe(student_id)
+    return StreamingResponse(
+        subscription.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/profile")
+def api_get_profile(student_id: int = Depends(check_not_modified)):
+    try:
+        profile = read_profile(student_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading profile: {str(e)}")
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return profile
 
 @app.get("/api/profile/sdi") 
-def api_get_sdi():
+def api_get_sdi(student_id: int = Depends(check_not_modified)):
     try:
-        result = get_sdi_with_id(1)
-        if result and len(result) > 0:
-            return {"sdi": result[0][0]}
+        result = read_profile(student_id)
+        if result is not None:
+            return {"sdi": result["sdi"]}
         else:
             raise HTTPException(status_code=404, detail="User profile not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading sdi: {str(e)}")
    
 @app.get("/api/profile/first_name") 
-def api_get_first_name():
+def api_get_first_name(student_id: int = Depends(check_not_modified)):
     try:
-        result = get_first_name_with_id(1)
-        if result and len(result) > 0:
-            return {"first_name": result[0][0]}
+        result = read_profile(student_id)
+        if result is not None:
+            return {"first_name": result["first_name"]}
         else:
-            return {"first_name": None}
+            raise HTTPException(status_code=404, detail="User profile not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading first name: {str(e)}")
 
 @app.get("/api/profile/last_name") 
-def api_get_last_name():
+def api_get_last_name(student_id: int = Depends(check_not_modified)):
     try:
-        result = get_last_name_with_id(1)
-        if result and len(result) > 0:
-            return {"last_name": result[0][0]}
+        result = read_profile(student_id)
+        if result is not None:
+            return {"last_name": result["last_name"]}
         else:
-            return {"last_name": None}
+            raise HTTPException(status_code=404, detail="User profile not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading last name: {str(e)}")
 
 @app.get("/api/profile/current_semester") 
-def api_get_current_semester():
+def api_get_current_semester(student_id: int = Depends(check_not_modified)):
     try:
-        result = get_current_semester_with_id(1)
-        if result and len(result) > 0:
-            return {"current_semester": result[0][0]}
+        result = read_profile(student_id)
+        if result is not None:
+            return {"current_semester": result["current_semester"]}
         else:
-            return {"current_semester": None}
+            raise HTTPException(status_code=404, detail="User profile not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading current semester: {str(e)}")
 
 @app.get("/api/profile/direction")
-def api_get_direction():
+def api_get_direction(student_id: int = Depends(check_not_modified)):
     try:
-        result = get_direction_with_id(1)
-        if result and len(result) > 0:
-            direction = result[0][0] 
-            return {"direction": direction}
+        result = read_profile(student_id)
+        if result is not None:
+            return {"direction": result["direction"]}
         else:
-            # Return null if no direction is set
-            return {"direction": None}
+            raise HTTPException(status_code=404, detail="User profile not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading direction: {str(e)}")
    
+@app.get("/api/requirements")
+def api_get_requirements(student_id: int = Depends(check_not_modified)):
+    try:
+        result = requirements_engine.evaluate(student_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error evaluating requirements: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return result
+
 @app.get("/api/specialities")
 def api_get_speciality_names():
     speciality_names = {
@@ -173,99 +490,374 @@ def api_get_speciality_names():
     }
     return speciality_names
 
+@app.get("/api/stats")
+def api_get_cohort_stats():
+    try:
+        stats = get_cohort_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading cohort statistics: {str(e)}")
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Cohort statistics have not been computed yet")
+    return stats
+
+@app.get("/api/stats/courses/{course_id}")
+def api_get_course_cohort_stats(course_id: int):
+    try:
+        stats = get_course_cohort_stats(course_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading cohort statistics: {str(e)}")
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No cohort statistics for this course")
+    return stats
+
+@app.get("/api/prerequisites")
+def api_get_prerequisites():
+    try:
+        return {"edges": prerequisite_graph.edges()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading prerequisites: {str(e)}")
+
+def existing_student_courses(student_id):
+    """Return the student's courses, or raise 404 for an unknown student"""
+    if get_profile_with_id(student_id) is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return get_all_courses(student_id)
+
+@app.get("/api/prerequisites/eligible")
+def api_get_eligible_courses(student_id: int = Depends(check_not_modified)):
+    try:
+        return prerequisite_graph.eligible(existing_student_courses(student_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading eligible courses: {str(e)}")
+
+@app.get("/api/prerequisites/unlocked-by/{course_id}")
+def api_get_unlocked_by(course_id: int, student_id: int = Depends(check_not_modified)):
+    try:
+        result = prerequisite_graph.unlocked_by(course_id, existing_student_courses(student_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading unlocked courses: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return result
+
+def current_semester_courses(student_id):
+    """Return the student's SDI and Current Semester courses, or raise 404"""
+    profile = get_profile_with_id(student_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    courses = [c for c in get_all_courses(student_id) if c['status'] == 'Current Semester']
+    return profile['sdi'], courses
+
+@app.get("/api/timetable/me")
+def api_get_my_timetable(student_id: int = Depends(check_not_modified)):
+    try:
+        sdi, courses = current_semester_courses(student_id)
+        return {
+            "semester": timetable_service.semester,
+            "sdi": sdi,
+            "courses": courses,
+            "slots": timetable_service.schedule_for(courses, sdi),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading timetable: {str(e)}")
+
+@app.get("/api/timetable/conflicts")
+def api_get_timetable_conflicts(student_id: int = Depends(check_not_modified)):
+    try:
+        sdi, courses = current_semester_courses(student_id)
+        return {"conflicts": timetable_service.conflicts_for(courses, sdi)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error detecting timetable conflicts: {str(e)}")
+
+@app.get("/api/timetable/days/{day}")
+def api_get_day_slots(
+    day: str,
+    start: Optional[str] = Query(None, pattern=r"^([01]\d|2[0-3]):[0-5]\d$"),
+    end: Optional[str] = Query(None, pattern=r"^([01]\d|2[0-3]):[0-5]\d$"),
+    semester: Optional[int] = None,
+):
+    try:
+        slots = timetable_service.slots_on(day, start, end, semester)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading timetable: {str(e)}")
+    if slots is None:
+        raise HTTPException(status_code=404, detail=f"Unknown day: {day}")
+    return {"day": day, "slots": slots}
+
+@app.get("/api/grade-planning")
+def api_get_grade_planning(
+    target: float = Query(6.0, ge=0, le=10),
+    student_id: int = Depends(check_not_modified),
+):
+    try:
+        plan = GradePlan.load(student_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading grade plan: {str(e)}")
+    if plan is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return plan.summary(target)
+
 @app.get("/api/profile/language")
-def api_get_language():
+def api_get_language(student_id: int = Depends(check_not_modified)):
     try:
-        result = get_language_with_id(1)
-        if result and len(result) > 0:
-            return {"language": result[0][0]}
+        result = read_profile(student_id)
+        if result is not None:
+            return {"language": result["language"]}
         else:
             raise HTTPException(status_code=404, detail="User profile not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading language: {str(e)}")
 
+######### PATCH ENDPOINTS #########
+@app.patch("/api/profile")
+@write_endpoint
+def api_update_profile(update: FullProfileUpdate, student_id: int = Depends(get_student_id)):
+    # Only the fields present in the request body are written; an explicit
+    # null clears a field (e.g. direction back to "Not Selected").
+    try:
+        profile = update_profile_with_id(student_id, update.model_dump(exclude_unset=True))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating profile: {str(e)}")
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return profile
+
+######### POST ENDPOINTS #########
+@app.post("/api/students", status_code=201)
+@write_endpoint
+def api_create_student(student: StudentCreate):
+    try:
+        student_id = create_student(**student.model_dump())
+        return {"student_id": student_id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating student: {str(e)}")
+
+@app.post("/api/courses/batch")
+@write_endpoint
+def api_update_courses_batch(batch: CourseBatchUpdate, student_id: int = Depends(get_student_id)):
+    # Fields left out of a mutation are untouched, so exclude_unset tells
+    # "no change" apart from an explicit null grade.
+    mutations = [update.model_dump(exclude_unset=True) for update in batch.updates]
+    try:
+        return update_courses_batch(mutations, student_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.IntegrityError as e:
+        raise write_integrity_error(e, "Error updating courses")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating courses: {str(e)}")
+
+@app.post("/api/courses/import")
+async def api_import_courses(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    skip_invalid: bool = False,
+    student_id: int = Depends(get_student_id),
+):
+    # The body is parsed as it arrives and rows are validated one by one, so a
+    # transcript is never held in memory as a whole. Unless skip_invalid is
+    # set, any invalid row rejects the whole import and nothing is written.
+    try:
+        if await run_in_threadpool(get_profile_with_id, student_id) is None:
+            raise student_not_found()
+        parser = TranscriptParser(format_for(request.headers.get("content-type"), format))
+        transcript = await run_in_threadpool(TranscriptImport, student_id)
+        async for chunk in request.stream():
+            for line, row in parser.feed(chunk):
+                transcript.add(line, row)
+        for line, row in parser.close():
+            transcript.add(line, row)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading transcript: {str(e)}")
+
+    if transcript.errors and not skip_invalid:
+        raise HTTPException(status_code=422, detail=transcript.report(applied=False))
+    try:
+        courses = await to_thread.run_sync(update_courses_batch, transcript.mutations, student_id, limiter=write_limiter)
+    except sqlite3.IntegrityError as e:
+        raise write_integrity_error(e, "Error importing courses")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing courses: {str(e)}")
+    return transcript.report(applied=bool(transcript.mutations), courses=courses)
+
+@app.post("/api/grade-planning/scenarios")
+def api_solve_grade_scenarios(batch: GradeScenarios, student_id: int = Depends(get_student_id)):
+    if len(batch.scenarios) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIOS} scenarios per request")
+    try:
+        plan = GradePlan.load(student_id)
+        if plan is None:
+            raise student_not_found()
+        return {"results": plan.solve_many((s.target, s.grades) for s in batch.scenarios)}
+    except HTTPException:
+        raise
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error solving grade scenarios: {str(e)}")
+
+@app.post("/api/plan/optimize")
+def api_optimize_plan(request: SemesterPlanRequest, student_id: int = Depends(get_student_id)):
+    # Plans the remaining courses into semesters and, unless apply is false,
+    # saves them as Planned with their planned_semester in one batch.
+    try:
+        plan = plan_semesters(student_id, **request.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error planning semesters: {str(e)}")
+    if plan is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return plan
+
+@app.post("/api/plan/validate")
+def api_validate_plan(request: PlanValidationRequest, student_id: int = Depends(get_student_id)):
+    # Checks the saved plan, with any changes in the body applied on top,
+    # against the prerequisite graph; nothing is written.
+    try:
+        return prerequisite_graph.validate(existing_student_courses(student_id), request.plan)
+    except HTTPException:
+        raise
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error validating plan: {str(e)}")
+
 ######### PUT ENDPOINTS #########
 @app.put("/api/courses/{course_id}/status")
-def api_update_course_status(course_id: int, update: CourseStatusUpdate):
+@write_endpoint
+def api_update_course_status(course_id: int, update: CourseStatusUpdate, student_id: int = Depends(get_student_id)):
     try:
-        update_course_status(course_id, update.status)
-        # If the new status is anything other than 'Passed', reset the grade to null.
-        if update.status != 'Passed':
-            update_course_grade(course_id, None)
+        # A status other than 'Passed' also resets the grade to null; the batch
+        # path does both in one transaction.
+        update_courses_batch([{"course_id": course_id, "status": update.status}], student_id)
         return {"message": "Status updated"}
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Course not found")
+    except sqlite3.IntegrityError as e:
+        raise write_integrity_error(e, "Error updating course status")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating course status: {str(e)}")
 
 @app.put("/api/courses/{course_id}/grade")
-def api_update_course_grade(course_id: int, update: CourseGradeUpdate):
+@write_endpoint
+def api_update_course_grade(course_id: int, update: CourseGradeUpdate, student_id: int = Depends(get_student_id)):
     try:
-        course = get_course_by_id(course_id)
+        course = get_course_by_id(course_id, student_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
         
         if course['status'] != 'Passed':
             raise HTTPException(status_code=400, detail="Grade can only be set for 'Passed' courses.")
 
-        update_course_grade(course_id, update.grade)
+        update_course_grade(course_id, update.grade, student_id)
         return {"message": "Grade updated"}
     except HTTPException as e:
         raise e
+    except LookupError:
+        raise student_not_found()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating course grade: {str(e)}")
 
 @app.put("/api/courses/{course_id}/planned_semester")
-def api_update_course_planned_semester(course_id: int, update: CoursePlannedSemesterUpdate):
+@write_endpoint
+def api_update_course_planned_semester(course_id: int, update: CoursePlannedSemesterUpdate, student_id: int = Depends(get_student_id)):
     try:
-        update_course_planned_semester(course_id, update.planned_semester)
+        if not update_course_planned_semester(course_id, update.planned_semester, student_id):
+            raise HTTPException(status_code=404, detail="Course not found")
         return {"message": "Planned semester updated"}
+    except HTTPException as e:
+        raise e
+    except sqlite3.IntegrityError as e:
+        raise write_integrity_error(e, "Error updating course planned semester")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating course planned semester: {str(e)}")
 
 @app.put("/api/profile/sdi")
-def api_update_sdi_with_id(update: SdiUpdate):
+@write_endpoint
+def api_update_sdi_with_id(update: SdiUpdate, student_id: int = Depends(get_student_id)):
     try:
-        update_sdi_with_id(1, update.sdi)
+        update_sdi_with_id(student_id, update.sdi)
         return {"message": "SDI updated"}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating sdi: {str(e)}")
 
 @app.put("/api/profile/first_name")
-def api_update_first_name_with_id(update: FirstnameUpdate):
+@write_endpoint
+def api_update_first_name_with_id(update: FirstnameUpdate, student_id: int = Depends(get_student_id)):
     try:
-        update_first_name_with_id(1, update.first_name)
+        update_first_name_with_id(student_id, update.first_name)
         return {"message": "Firstname updated"}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating firstname: {str(e)}")
 
 @app.put("/api/profile/last_name")
-def api_update_last_name_with_id(update: LastnameUpdate):
+@write_endpoint
+def api_update_last_name_with_id(update: LastnameUpdate, student_id: int = Depends(get_student_id)):
     try:
-        update_last_name_with_id(1, update.last_name)
+        update_last_name_with_id(student_id, update.last_name)
         return {"message": "Lastname updated"}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating lastname: {str(e)}")
 
 @app.put("/api/profile/current_semester")
-def api_update_current_semester_with_id(update: CurrentSemesterUpdate):
+@write_endpoint
+def api_update_current_semester_with_id(update: CurrentSemesterUpdate, student_id: int = Depends(get_student_id)):
     try:
-        update_current_semester_with_id(1, update.current_semester)
+        update_current_semester_with_id(student_id, update.current_semester)
         return {"message": "Current course updated"}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating current course: {str(e)}")
 
 @app.put("/api/profile/direction")
-def api_update_direction_with_id(update: DirectionUpdate):
+@write_endpoint
+def api_update_direction_with_id(update: DirectionUpdate, student_id: int = Depends(get_student_id)):
     try:
-        update_direction_with_id(1, update.direction)
+        update_direction_with_id(student_id, update.direction)
         return {"message": "Direction updated"}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating direction: {str(e)}")
 
 @app.put("/api/profile/language")
-def api_update_language_with_id(update: LanguageUpdate):
+@write_endpoint
+def api_update_language_with_id(update: LanguageUpdate, student_id: int = Depends(get_student_id)):
     try:
-        update_language_with_id(1, update.language)
+        update_language_with_id(student_id, update.language)
         return {"message": "Language updated"}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating language: {str(e)}")
 
@@ -0,0 +1,64 @@
+"""Request coalescing for hot reads.
+
+When many clients ask for the same thing at once (every student opening the
+app at the start of a semester), each request would otherwise run the same
+query in its own worker thread. A SingleFlight lets the first request for a
+key run the call while identical requests that arrive before it finishes
+wait for it and share its result, or its exception.
+
+Nothing is kept once the call returns, so this is not a cache: callers put
+the data version in the key, and a request that arrives after a write never
+joins a call that started before it. Shared results go to several requests
+at once and must be treated as read-only.
+"""
+import threading
+
+from metrics import registry
+
+single_flight_requests = registry.counter(
+    'single_flight_requests_total',
+    'Coalesced reads by route; role is "leader" for requests that ran the call and "shared" for those that waited for it.',
+    ('route', 'role'))
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, route):
+        self.route = route
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, call):
+        """Return call(), sharing one run of it among concurrent callers with the same key"""
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = _Call()
+
+        if not leader:
+            single_flight_requests.inc(self.route, 'shared')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        single_flight_requests.inc(self.route, 'leader')
+        try:
+            flight.result = call()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            flight.done.set()
+        return flight.result
@@ -0,0 +1,279 @@
+"""Semester timetable, indexed for per-student schedule and conflict lookups.
+
+The timetable is loaded once from a JSON file (the same format the frontend
+used to bundle) and indexed by day and start time, by day and semester, by
+course name and by catalog course. Timetable entries are matched to catalog
+courses by name once per catalog, not once per request.
+"""
+import bisect
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+
+from database import get_db_connection, add_change_listener
+
+TIMETABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'spring2025_timetable.json')
+
+DAYS = ('Δευτέρα', 'Τρίτη', 'Τετάρτη', 'Πέμπτη', 'Παρασκευή')
+DAY_ALIASES = {
+    'monday': 'Δευτέρα',
+    'tuesday': 'Τρίτη',
+    'wednesday': 'Τετάρτη',
+    'thursday': 'Πέμπτη',
+    'friday': 'Παρασκευή',
+}
+
+######### NAME MATCHING #########
+
+# Greek letters that look like Latin ones; course names mix both
+_GREEK_TO_LATIN = str.maketrans('ιοαεηκμνπρτυχ', 'ioaehkmnprtyx')
+
+# Tutorial group indicators that are not part of the course name
+_GROUP_INDICATORS = (
+    (r'\s*\(άρτιοι\)', ''),
+    (r'\s*\(αρτιοι\)', ''),
+    (r'\s*\(περιττοί\)', ''),
+    (r'\s*\(περιττοι\)', ''),
+    (r'\s*άρτιοι\s*', ' '),
+    (r'\s*αρτιοι\s*', ' '),
+    (r'\s*περιττοί\s*', ' '),
+    (r'\s*περιττοι\s*', ' '),
+    (r'\s*\(φροντ\.\s*αμ\s*mod\s*\d+\s*=\s*\d+\)', ''),
+    (r'\s*φροντ\.\s*αμ\s*mod\s*\d+\s*=\s*\d+', ''),
+)
+_GROUP_INDICATORS = tuple((re.compile(pattern, re.IGNORECASE), repl) for pattern, repl in _GROUP_INDICATORS)
+_MOD_PATTERN = re.compile(r'mod\s*(\d+)\s*=\s*(\d+)')
+# Roman numerals after normalization (Greek 'Ι' and Latin 'I' both become 'i')
+_NUMERALS = {'i', 'ii', 'iii', 'iv', 'v'}
+
+
+def base_course_name(name):
+    """Strip tutorial group indicators such as '(άρτιοι ΑΜ)' or '(Φροντ. ΑΜ mod 4=0)'"""
+    for pattern, repl in _GROUP_INDICATORS:
+        name = pattern.sub(repl, name)
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def normalize_name(name):
+    return re.sub(r'\s+', ' ', name.lower().strip().translate(_GREEK_TO_LATIN))
+
+
+def sdi_group(course_name):
+    """Return (modulus, remainder) for entries limited to a group of student ids, else None"""
+    lowered = course_name.lower()
+    match = _MOD_PATTERN.search(lowered)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    if 'άρτιοι' in lowered or 'αρτιοι' in lowered:
+        return 2, 0
+    if 'περιττοί' in lowered or 'περιττοι' in lowered:
+        return 2, 1
+    return None
+
+
+def _words_match(course_name, timetable_name):
+    course_words = [w for w in course_name.split(' ') if len(w) > 3]
+    timetable_words = [w for w in timetable_name.split(' ') if len(w) > 3]
+    if not course_words or not timetable_words:
+        return False
+    common = [
+        word for word in course_words
+        if any(t == word or (len(word) > 4 and word in t) or (len(t) > 4 and t in word) for t in timetable_words)
+    ]
+    return len(common) >= 2 and len(common) / min(len(course_words), len(timetable_words)) >= 0.7
+
+
+def _numerals(name):
+    return {word for word in name.split(' ') if word in _NUMERALS}
+
+
+def match_courses(timetable_name, catalog):
+    """Return the ids of the catalog courses a timetable name refers to.
+
+    Tries, in order, an exact match of the normalized names, a whole-word
+    substring match and a word overlap match, and stops at the first tier
+    that matches anything. Names numbered differently ('Ανάλυση I' and
+    'Ανάλυση ΙΙ') never match.
+    """
+    name = normalize_name(base_course_name(timetable_name))
+    numerals = _numerals(name)
+    padded = f' {name} '
+    tiers = (
+        lambda course: course == name,
+        lambda course: f' {course} ' in padded or padded in f' {course} ',
+        lambda course: _words_match(course, name),
+    )
+    candidates = [
+        (course_id, course) for course_id, course in catalog
+        if not (numerals and _numerals(course) and _numerals(course) != numerals)
+    ]
+    for matches in tiers:
+        ids = [course_id for course_id, course in candidates if matches(course)]
+        if ids:
+            return ids
+    return []
+
+
+######### TIME INDEX #########
+
+def to_minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class DaySchedule:
+    """Slots of one day sorted by start time.
+
+    A slot overlapping [start, end) must start before end and, since no slot
+    is longer than the longest one, after start - longest. That window is
+    found with two binary searches, so a lookup costs O(log n + k).
+    """
+
+    def __init__(self, slots):
+        self.slots = sorted(slots, key=lambda slot: (slot['start'], slot['end']))
+        self.starts = [slot['start'] for slot in self.slots]
+        self.longest = max((slot['end'] - slot['start'] for slot in self.slots), default=0)
+
+    def overlapping(self, start, end):
+        lo = bisect.bisect_right(self.starts, start - self.longest)
+        hi = bisect.bisect_left(self.starts, end)
+        return [slot for slot in self.slots[lo:hi] if slot['end'] > start]
+
+
+class TimetableService:
+    def __init__(self, path=TIMETABLE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_course = None
+
+    def attach(self):
+        """Re-match course names when the catalog changes"""
+        add_change_listener(self.on_change)
+
+    def on_change(self, table, student_id, keys):
+        if table is None:
+            with self._lock:
+                self._by_course = None
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        self._semester = data.get('semester')
+        self.slots = []
+        for entry in data['schedule']:
+            slot = dict(entry)
+            slot['start'] = to_minutes(entry['start_time'])
+            slot['end'] = to_minutes(entry['end_time'])
+            slot['sdi_group'] = sdi_group(entry['course_name'])
+            self.slots.append(slot)
+        by_name = defaultdict(list)
+        by_day = defaultdict(list)
+        by_day_semester = defaultdict(list)
+        for slot in self.slots:
+            by_name[slot['course_name']].append(slot)
+            by_day[slot['day']].append(slot)
+            by_day_semester[(slot['day'], str(slot['semester']))].append(slot)
+        self.by_name = dict(by_name)
+        self.by_day = {key: DaySchedule(slots) for key, slots in by_day.items()}
+        self.by_day_semester = {key: DaySchedule(slots) for key, slots in by_day_semester.items()}
+        self._loaded = True
+
+    def _index(self):
+        """Return {course_id: [slots]}, (re)building the name matching if needed"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if self._by_course is None:
+                with get_db_connection() as conn:
+                    rows = conn.execute('SELECT id, name FROM courses').fetchall()
+                catalog = [(row['id'], normalize_name(row['name'])) for row in rows]
+                by_course = defaultdict(list)
+                for name, slots in self.by_name.items():
+                    for course_id in match_courses(name, catalog):
+                        by_course[course_id].extend(slots)
+                self._by_course = dict(by_course)
+            return self._by_course
+
+    ######### Queries #########
+
+    @property
+    def semester(self):
+        self._index()
+        return self._semester
+
+    @staticmethod
+    def visible_to(slot, sdi):
+        group = slot['sdi_group']
+        return group is None or (sdi or 0) % group[0] == group[1]
+
+    @staticmethod
+    def public(slot, **extra):
+        """Slot as returned by the API, without the index fields"""
+        result = {k: v for k, v in slot.items() if k not in ('start', 'end', 'sdi_group')}
+        result.update(extra)
+        return result
+
+    def schedule_for(self, courses, sdi):
+        """Slots of the given courses that apply to a student with this SDI"""
+        by_course = self._index()
+        schedule = []
+        for course in courses:
+            for slot in by_course.get(course['id'], ()):
+                if self.visible_to(slot, sdi):
+                    schedule.append(self.public(
+                        slot,
+                        course_id=course['id'],
+                        course_code=course['code'],
+                        course_ects=course['ects'],
+                        database_course_name=course['name'],
+                    ))
+        return schedule
+
+    def slots_on(self, day, start=None, end=None, semester=None):
+        """Slots on a day, optionally only those overlapping [start, end) or of one semester"""
+        self._index()
+        day = DAY_ALIASES.get(day.lower(), day)
+        if day not in self.by_day:
+            return None
+        if semester is None:
+            schedule = self.by_day[day]
+        else:
+            schedule = self.by_day_semester.get((day, str(semester)), DaySchedule(()))
+        start = to_minutes(start) if start else 0
+        end = to_minutes(end) if end else 24 * 60
+        return [self.public(slot) for slot in schedule.overlapping(start, end)]
+
+    def conflicts_for(self, courses, sdi):
+        """Pairs of overlapping slots that belong to different courses"""
+        by_course = self._index()
+        per_day = defaultdict(list)
+        for course in courses:
+            for slot in by_course.get(course['id'], ()):
+                if self.visible_to(slot, sdi):
+                    per_day[slot['day']].append((slot, course))
+
+        conflicts = []
+        for day in sorted(per_day, key=lambda d: DAYS.index(d) if d in DAYS else len(DAYS)):
+            entries = sorted(per_day[day], key=lambda entry: (entry[0]['start'], entry[0]['end']))
+            active = []
+            for slot, course in entries:
+                active = [(s, c) for s, c in active if s['end'] > slot['start']]
+                for other_slot, other_course in active:
+                    if other_course['id'] != course['id']:
+                        conflicts.append({
+                            'day': day,
+                            'start_time': max(slot['start_time'], other_slot['start_time']),
+                            'end_time': min(slot['end_time'], other_slot['end_time']),
+                            'courses': [
+                                self.public(other_slot, course_id=other_course['id']),
+                                self.public(slot, course_id=course['id']),
+                            ],
+                        })
+                active.append((slot, course))
+        return conflicts
+
+
+timetable_service = TimetableService()
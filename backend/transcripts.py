@@ -0,0 +1,242 @@
+"""Transcript export and bulk import.
+
+Exports stream a student's courses as CSV or NDJSON, one line per course.
+Imports take the same formats (or a plain transcript with just code, grade
+and status columns), parse the body as it arrives, match each row to a
+catalog course by code and validate it against the student's current state.
+The valid rows are then applied through update_courses_batch, so a whole
+transcript is one transaction and one group-commit write, and every rejected
+row is reported with its line number.
+"""
+import codecs
+import csv
+import io
+
+import orjson
+
+from database import COURSE_STATUSES, MAX_GRADE, PASS_GRADE, get_all_courses
+from greek_text import fold_code
+
+MEDIA_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+EXPORT_FIELDS = ('course_id', 'code', 'name', 'ects', 'semester', 'status', 'grade', 'planned_semester')
+MAX_IMPORT_ROWS = 1000
+
+def format_for(content_type, requested=None):
+    """Pick the import/export format from an explicit choice or a Content-Type"""
+    if requested:
+        return requested
+    if content_type and ('ndjson' in content_type or 'jsonl' in content_type):
+        return 'ndjson'
+    return 'csv'
+
+
+######### EXPORT #########
+
+def _export_row(course):
+    return {
+        'course_id': course['id'],
+        'code': course['code'],
+        'name': course['name'],
+        'ects': course['ects'],
+        'semester': course['semester'],
+        'status': course['status'],
+        'grade': course['grade'],
+        'planned_semester': course['planned_semester'],
+    }
+
+
+def export_csv(courses):
+    """Yield a CSV transcript line by line, header first"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    for course in courses:
+        writer.writerow(_export_row(course))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for a student with no courses
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def export_ndjson(courses):
+    for course in courses:
+        yield orjson.dumps(_export_row(course)) + b'\n'
+
+
+EXPORTERS = {'csv': export_csv, 'ndjson': export_ndjson}
+
+
+######### PARSING #########
+
+class TranscriptParser:
+    """Incremental parser: feed() body chunks as they arrive, get (line, row dict) pairs back.
+
+    CSV needs a header row naming its columns; quoted fields may span lines.
+    NDJSON is one JSON object per line. Lines that cannot be parsed come back
+    as (line, ValueError) so they end up in the error report like any other
+    invalid row.
+    """
+
+    def __init__(self, fmt):
+        self.fmt = fmt
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+        self._buffer = ''
+        self._pending = ''
+        self._pending_line = 0
+        self._line = 0
+        self._header = None
+
+    def feed(self, chunk, final=False):
+        self._buffer += self._decoder.decode(chunk, final=final)
+        *lines, self._buffer = self._buffer.split('\n')
+        if final:
+            lines.append(self._buffer)
+            self._buffer = ''
+        rows = []
+        for line in lines:
+            self._line += 1
+            row = self._parse_line(line.rstrip('\r'))
+            if row is not None:
+                rows.append(row)
+        if final and self._pending:
+            rows.append((self._pending_line, ValueError('Unterminated quoted field')))
+        return rows
+
+    def close(self):
+        return self.feed(b'', final=True)
+
+    def _parse_line(self, line):
+        if self.fmt == 'ndjson':
+            if not line.strip():
+                return None
+            try:
+                row = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                return self._line, ValueError(f'Invalid JSON: {str(e)}')
+            if not isinstance(row, dict):
+                return self._line, ValueError('Expected a JSON object')
+            return self._line, row
+
+        if not self._pending:
+            self._pending_line = self._line
+        self._pending += line if not self._pending else '\n' + line
+        # An odd number of quotes means a quoted field continues on the next line
+        if self._pending.count('"') % 2:
+            return None
+        text, self._pending = self._pending, ''
+        if not text.strip():
+            return None
+        values = next(csv.reader([text]))
+        if self._header is None:
+            self._header = [name.strip().lower() for name in values]
+            if 'code' not in self._header and 'course_id' not in self._header:
+                return self._pending_line, ValueError('Header must name a code or course_id column')
+            return None
+        return self._pending_line, dict(zip(self._header, values))
+
+
+######### VALIDATION #########
+
+class TranscriptImport:
+    """Validates parsed rows against the catalog and a student's current courses"""
+
+    def __init__(self, student_id):
+        self.student_id = student_id
+        self.courses = {course['id']: course for course in get_all_courses(student_id)}
+        self.by_code = {}
+        for course in self.courses.values():
+            self.by_code.setdefault(fold_code(course['code']), []).append(course['id'])
+        self.mutations = []
+        self.errors = []
+        self.rows = 0
+
+    def add(self, line, row):
+        """Validate one parsed row, queueing its mutation or recording its error"""
+        self.rows += 1
+        if self.rows > MAX_IMPORT_ROWS:
+            raise ValueError(f"At most {MAX_IMPORT_ROWS} rows per import")
+        if isinstance(row, Exception):
+            self.errors.append({'row': line, 'code': None, 'error': str(row)})
+            return
+        code = _text(row.get('code'))
+        try:
+            self.mutations.append(self._mutation(row, code))
+        except ValueError as e:
+            self.errors.append({'row': line, 'code': code, 'error': str(e)})
+
+    def _course_id(self, row, code):
+        course_id = _text(row.get('course_id'))
+        if course_id is not None:
+            try:
+                course_id = int(course_id)
+            except ValueError:
+                raise ValueError(f"Invalid course_id: {course_id}")
+            if course_id not in self.courses:
+                raise ValueError(f"Course not found: {course_id}")
+            if code is not None and fold_code(self.courses[course_id]['code']) != fold_code(code):
+                raise ValueError(f"Course {course_id} has code {self.courses[course_id]['code']}, not {code}")
+            return course_id
+        if code is None:
+            raise ValueError("Missing course code")
+        matches = self.by_code.get(fold_code(code), ())
+        if not matches:
+            raise ValueError(f"Unknown course code: {code}")
+        if len(matches) > 1:
+            raise ValueError(f"Course code {code} is ambiguous (courses {', '.join(map(str, matches))}); add a course_id column")
+        return matches[0]
+
+    def _mutation(self, row, code):
+        course_id = self._course_id(row, code)
+        mutation = {'course_id': course_id}
+
+        grade = _text(row.get('grade'))
+        if grade is not None:
+            try:
+                # Greek transcripts write decimals with a comma
+                grade = float(grade.replace(',', '.'))
+            except ValueError:
+                raise ValueError(f"Invalid grade: {grade}")
+            if not PASS_GRADE <= grade <= MAX_GRADE:
+                raise ValueError(f"Grade must be between {PASS_GRADE} and {MAX_GRADE}")
+
+        status = _text(row.get('status'))
+        if status is None:
+            if grade is None:
+                raise ValueError("Missing status")
+            status = 'Passed'
+        else:
+            status = next((s for s in COURSE_STATUSES if s.lower() == status.lower()), None) or status
+            if status not in COURSE_STATUSES:
+                raise ValueError(f"Invalid status: {status}. Must be one of {list(COURSE_STATUSES)}")
+        if grade is not None and status != 'Passed':
+            raise ValueError("Grade can only be set for 'Passed' courses.")
+        mutation['status'] = status
+        if grade is not None:
+            mutation['grade'] = grade
+
+        planned_semester = _text(row.get('planned_semester'))
+        if planned_semester is not None:
+            try:
+                mutation['planned_semester'] = int(planned_semester)
+            except ValueError:
+                raise ValueError(f"Invalid planned_semester: {planned_semester}")
+        return mutation
+
+    def report(self, applied, courses=()):
+        return {
+            'rows': self.rows,
+            'valid': len(self.mutations),
+            'applied': applied,
+            'errors': self.errors,
+            'courses': list(courses),
+        }
+
+
+def _text(value):
+    """Cell value as a stripped string, with blanks and nulls as None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
@@ -39,6 +39,7 @@ import { Progress } from '@/components/ui/progress';
 import { Badge } from '@/components/ui/badge';
 import HomeButton from '@/components/layout/HomeButton';
 import { useTranslation } from 'react-i18next';
+import { applyCourseChanges, useCourseChanges } from '@/lib/courseChanges';
 
 // Reusable content for both sidebar variants
 function SidebarContent({ onLinkClick }) {
@@ -191,6 +192,7 @@ function Dashboard() {
   const navigate = useNavigate();
   const [courses, setCourses] = useState([]); // Add local state
   const [loading, setLoading] = useState(true); // Add loading state
+  const [reloadKey, setReloadKey] = useState(0);
   const totalECTS = 240;
   const { t } = useTranslation();
 
@@ -206,7 +208,13 @@ function Dashboard() {
         console.error('Failed to fetch courses:', error);
         setLoading(false);
       });
-  }, []); // This runs every time Dashboard component mounts
+  }, [reloadKey]); // This runs every time Dashboard component mounts
+
+  // Keep the dashboard current while it is open
+  useCourseChanges({
+    onCourses: (changes) => setCourses((prev) => applyCourseChanges(prev, changes)),
+    onReset: () => setReloadKey((key) => key + 1),
+  });
 
   // Show loading state
   if (loading) {
@@ -8,8 +8,13 @@ function PlanGrade({ isOpen, onClose }) {
   const { t } = useTranslation();
   const [loading, setLoading] = useState(false);
   const [gradeData, setGradeData] = useState([]);
+  const [plan, setPlan] = useState(null);
+  const [scenarios, setScenarios] = useState({});
   const [targetGrade, setTargetGrade] = useState(6.0);
 
+  // Every target the input can take, solved in one request so changing it needs no round trip
+  const targetSteps = Array.from({ length: 51 }, (_, i) => 5 + i / 10);
+
   useEffect(() => {
     if (isOpen) {
       fetchGradeData();
@@ -19,34 +24,23 @@ function PlanGrade({ isOpen, onClose }) {
   const fetchGradeData = async () => {
     setLoading(true);
     try {
-      // TODO: Replace with actual API endpoint
-      // const response = await fetch('/api/grade-planning');
-      // const data = await response.json();
-      // setGradeData(data);
-
-      // Placeholder data structure for now
-      setGradeData([
-        {
-          id: 1,
-          name: 'Αλγόριθμοι & Πολυπλοκότητα',
-          code: 'CS201',
-          ects: 6,
-          currentGrade: null,
-          requiredGrade: 7.2,
-          semester: 3,
-          status: 'Planned',
-        },
-        {
-          id: 2,
-          name: 'Βάσεις Δεδομένων',
-          code: 'CS301',
-          ects: 5,
-          currentGrade: 5.5,
-          requiredGrade: 8.1,
-          semester: 4,
-          status: 'Failed',
-        },
+      const [planResponse, scenariosResponse] = await Promise.all([
+        fetch(`/api/grade-planning?target=${targetGrade}`),
+        fetch('/api/grade-planning/scenarios', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ scenarios: targetSteps.map((target) => ({ target })) }),
+        }),
       ]);
+      const planData = await planResponse.json();
+      const scenariosData = await scenariosResponse.json();
+      setPlan(planData);
+      setGradeData(planData.courses);
+      setScenarios(
+        Object.fromEntries(
+          scenariosData.results.map((result) => [result.target.toFixed(1), result])
+        )
+      );
     } catch (error) {
       console.error('Error fetching grade data:', error);
     } finally {
@@ -54,9 +48,10 @@ function PlanGrade({ isOpen, onClose }) {
     }
   };
 
+  const currentScenario = scenarios[targetGrade.toFixed(1)];
+
   const calculateOverallGPA = () => {
-    // TODO: Implement GPA calculation logic
-    return 6.8;
+    return currentScenario?.projected_average ?? plan?.current_average ?? 0;
   };
 
   const getTotalECTS = () => {
@@ -174,7 +169,7 @@ function PlanGrade({ isOpen, onClose }) {
                   max="10.0"
                   step="0.1"
                   value={targetGrade}
-                  onChange={(e) => setTargetGrade(parseFloat(e.target.value))}
+                  onChange={(e) => setTargetGrade(parseFloat(e.target.value) || 0)}
                   className="bg-gray-600 text-white px-3 py-2 rounded border border-gray-500 w-24"
                 />
                 <span className="text-gray-400 text-sm">
@@ -227,38 +222,45 @@ function PlanGrade({ isOpen, onClose }) {
                       </tr>
                     </thead>
                     <tbody>
-                      {gradeData.map((course) => (
-                        <tr key={course.id} className="border-b border-gray-600 hover:bg-gray-600">
-                          <td className="py-3 px-2">
-                            <div>
-                              <p className="text-white font-medium">{course.name}</p>
-                              <p className="text-gray-400 text-sm">{course.code}</p>
-                            </div>
-                          </td>
-                          <td className="text-center py-3 px-2 text-gray-300">{course.ects}</td>
-                          <td className="text-center py-3 px-2">
-                            {course.currentGrade ? (
-                              <span className={`font-medium ${getGradeColor(course.currentGrade)}`}>
-                                {course.currentGrade.toFixed(1)}
+                      {gradeData.map((course) => {
+                        const requiredGrade = currentScenario?.required_grade;
+                        return (
+                          <tr key={course.id} className="border-b border-gray-600 hover:bg-gray-600">
+                            <td className="py-3 px-2">
+                              <div>
+                                <p className="text-white font-medium">{course.name}</p>
+                                <p className="text-gray-400 text-sm">{course.code}</p>
+                              </div>
+                            </td>
+                            <td className="text-center py-3 px-2 text-gray-300">{course.ects}</td>
+                            <td className="text-center py-3 px-2">
+                              {course.current_grade ? (
+                                <span className={`font-medium ${getGradeColor(course.current_grade)}`}>
+                                  {course.current_grade.toFixed(1)}
+                                </span>
+                              ) : (
+                                <span className="text-gray-500">-</span>
+                              )}
+                            </td>
+                            <td className="text-center py-3 px-2">
+                              {requiredGrade != null ? (
+                                <span className={`font-bold ${getGradeColor(requiredGrade)}`}>
+                                  {requiredGrade.toFixed(1)}
+                                </span>
+                              ) : (
+                                <span className="text-gray-500">-</span>
+                              )}
+                            </td>
+                            <td className="text-center py-3 px-2">
+                              <span
+                                className={`px-2 py-1 rounded text-xs font-medium ${getStatusColor(course.status)}`}
+                              >
+                                {course.status}
                               </span>
-                            ) : (
-                              <span className="text-gray-500">-</span>
-                            )}
-                          </td>
-                          <td className="text-center py-3 px-2">
-                            <span className={`font-bold ${getGradeColor(course.requiredGrade)}`}>
-                              {course.requiredGrade.toFixed(1)}
-                            </span>
-                          </td>
-                          <td className="text-center py-3 px-2">
-                            <span
-                              className={`px-2 py-1 rounded text-xs font-medium ${getStatusColor(course.status)}`}
-                            >
-                              {course.status}
-                            </span>
-                          </td>
-                        </tr>
-                      ))}
+                            </td>
+                          </tr>
+                        );
+                      })}
                     </tbody>
                   </table>
                 </div>
@@ -0,0 +1,42 @@
+import { useEffect, useRef } from 'react';
+
+const STREAM_URL = '/api/changes/stream';
+
+// Merge the compact course changes of a "courses" event into a course list
+export function applyCourseChanges(courses, changes) {
+  const byId = new Map(changes.map((change) => [change.id, change]));
+  return courses.map((course) => (byId.has(course.id) ? { ...course, ...byId.get(course.id) } : course));
+}
+
+// Subscribe to the server-sent change stream for as long as the component is
+// mounted. onCourses receives the changed courses, onProfile the changed
+// profile fields and onReset is called when the client has to refetch: after a
+// catalog-wide change, or after a reconnect, since events sent while
+// disconnected are lost.
+export function useCourseChanges({ onCourses, onProfile, onReset }) {
+  const handlers = useRef({});
+  handlers.current = { onCourses, onProfile, onReset };
+
+  useEffect(() => {
+    const source = new EventSource(STREAM_URL);
+    let connected = false;
+
+    source.addEventListener('ready', () => {
+      if (connected) {
+        handlers.current.onReset?.();
+      }
+      connected = true;
+    });
+    source.addEventListener('courses', (event) => {
+      handlers.current.onCourses?.(JSON.parse(event.data).courses);
+    });
+    source.addEventListener('profile', (event) => {
+      handlers.current.onProfile?.(JSON.parse(event.data).profile);
+    });
+    source.addEventListener('reset', () => {
+      handlers.current.onReset?.();
+    });
+
+    return () => source.close();
+  }, []);
+}
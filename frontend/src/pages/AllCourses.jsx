@@ -30,12 +30,14 @@ import {
   TableRow,
 } from '@/components/ui/table';
 import { Badge } from '@/components/ui/badge';
-import { toGreeklish, toGreek } from 'greek-utils';
 import { useNavigate } from 'react-router-dom';
 import { toast } from 'sonner';
 import { useTranslation } from 'react-i18next';
+import { applyCourseChanges, useCourseChanges } from '@/lib/courseChanges';
 
 const API_URL = '/api/courses';
+const SEARCH_URL = '/api/courses/search';
+const SEARCH_DEBOUNCE_MS = 150;
 
 // Custom hook to detect screen size
 const useMediaQuery = (query) => {
@@ -196,9 +198,12 @@ function AllCourses() {
   const { t } = useTranslation();
   const [courses, setCourses] = useState([]);
   const [search, setSearch] = useState('');
+  // Ids of the courses matching the search, best match first; null when not searching
+  const [searchResults, setSearchResults] = useState(null);
   const [loading, setLoading] = useState(true);
   const [filters, setFilters] = useState({ semester: 'all', type: 'all' });
   const [userCurrentSemester, setUserCurrentSemester] = useState(null);
+  const [reloadKey, setReloadKey] = useState(0);
   const navigate = useNavigate();
   const isMobile = useMediaQuery('(max-width: 425px)');
 
@@ -216,7 +221,43 @@ function AllCourses() {
         toast.error(t('allCourses.messages.failedToLoad'));
         setLoading(false);
       });
-  }, [t]);
+  }, [t, reloadKey]);
+
+  // Writes made elsewhere (another tab, the planner) arrive as change events
+  useCourseChanges({
+    onCourses: (changes) => setCourses((prev) => applyCourseChanges(prev, changes)),
+    onProfile: (profile) => {
+      if ('current_semester' in profile) {
+        setUserCurrentSemester(profile.current_semester);
+      }
+    },
+    onReset: () => setReloadKey((key) => key + 1),
+  });
+
+  useEffect(() => {
+    const query = search.trim();
+    if (query === '') {
+      setSearchResults(null);
+      return;
+    }
+    // Matching (accents, Greeklish, codes) happens in the backend's search
+    // index; only the ids of the matches come back
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      fetch(`${SEARCH_URL}?q=${encodeURIComponent(query)}&limit=50`, { signal: controller.signal })
+        .then((res) => res.json())
+        .then((results) => setSearchResults(results.map((course) => course.id)))
+        .catch((error) => {
+          if (error.name !== 'AbortError') {
+            toast.error(t('allCourses.messages.failedToLoad'));
+          }
+        });
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [search, t]);
 
   const getStatusText = (status) => {
     switch (status) {
@@ -350,19 +391,15 @@ function AllCourses() {
     return userSemesterIsOdd !== courseSemesterIsOdd;
   };
 
-  const filteredCourses = courses.filter((c) => {
-    const searchLower = search.toLowerCase();
-    const courseName = c.name.toLowerCase();
-    const matchesSearch =
-      search.trim() === '' ||
-      courseName.includes(searchLower) ||
-      c.code.toLowerCase().includes(searchLower) ||
-      toGreek(courseName).includes(toGreek(searchLower)) ||
-      toGreeklish(courseName).includes(toGreeklish(searchLower));
-    const matchesSemester = filters.semester === 'all' || c.semester === filters.semester;
-    const matchesType = filters.type === 'all' || c.type === filters.type;
-    return matchesSearch && matchesSemester && matchesType;
-  });
+  const searchRank = searchResults && new Map(searchResults.map((id, index) => [id, index]));
+  const filteredCourses = courses
+    .filter((c) => {
+      const matchesSearch = !searchRank || searchRank.has(c.id);
+      const matchesSemester = filters.semester === 'all' || c.semester === filters.semester;
+      const matchesType = filters.type === 'all' || c.type === filters.type;
+      return matchesSearch && matchesSemester && matchesType;
+    })
+    .sort((a, b) => (searchRank ? searchRank.get(a.id) - searchRank.get(b.id) : 0));
 
   const courseTypes = [...new Set(courses.map((c) => c.type))];
 
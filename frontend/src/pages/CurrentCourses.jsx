@@ -24,6 +24,8 @@ import { toast } from 'sonner';
 import { useTranslation } from 'react-i18next';
 
 const API_URL = '/api/courses';
+// Only this page's courses and the fields it shows, filtered by the server
+const CURRENT_COURSES_URL = `${API_URL}?status=Current%20Semester&fields=name,code,semester,type,ects,status,grade`;
 
 function CurrentCourses() {
   const [courses, setCourses] = useState([]);
@@ -33,12 +35,10 @@ function CurrentCourses() {
   const { t } = useTranslation();
 
   useEffect(() => {
-    fetch(API_URL)
+    fetch(CURRENT_COURSES_URL)
       .then((res) => res.json())
       .then((data) => {
-        // Filter only current semester courses
-        const currentCourses = data.filter((course) => course.status === 'Current Semester');
-        setCourses(currentCourses);
+        setCourses(data);
         setLoading(false);
       })
       .catch(() => {
@@ -80,15 +80,11 @@ function RequirementCard({
 function DegreeRequirements() {
   const navigate = useNavigate();
   const { t } = useTranslation();
-  const [courses, setCourses] = useState([]);
+  const [requirementsData, setRequirementsData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [userDirection, setUserDirection] = useState(null);
   const [userSDI, setUserSDI] = useState(null);
-  const [specialityProgress, setSpecialityProgress] = useState({});
-  const [directionCourses, setDirectionCourses] = useState([]);
-  const [completedDirection, setCompletedDirection] = useState([]);
   const [specialityNames, setSpecialityNames] = useState({});
-  const [graduationBasicReq, setGraduationBasicReq] = useState(null);
 
   const directions = [
     { value: 'CS', label: t('degreeRequirements.directions.cs') },
@@ -102,14 +98,13 @@ function DegreeRequirements() {
       .catch((error) => console.error('Error fetching speciality names:', error));
 
     Promise.all([
-      fetch('/api/courses').then((res) => res.json()),
-      fetch('/api/profile/sdi').then((res) => res.json()),
-      fetch('/api/profile/direction').then((res) => res.json()),
+      fetch('/api/requirements').then((res) => res.json()),
+      fetch('/api/profile').then((res) => res.json()),
     ])
-      .then(([coursesData, sdiData, directionData]) => {
-        setCourses(coursesData);
-        setUserSDI(sdiData.sdi);
-        setUserDirection(directionData.direction);
+      .then(([requirements, profileData]) => {
+        setRequirementsData(requirements);
+        setUserSDI(profileData.sdi);
+        setUserDirection(profileData.direction);
       })
       .catch((error) => console.error('Error fetching data:', error))
       .finally(() => setLoading(false));
@@ -121,75 +116,6 @@ function DegreeRequirements() {
     return [];
   };
 
-  useEffect(() => {
-    if (courses.length > 0 && userDirection) {
-      const getDirectionCourses = (direction) => {
-        if (!direction) return [];
-        return courses.filter((c) => c.type === 'ΕΥΜ' && c.direction === direction);
-      };
-
-      const calculateSpecialityProgress = (specialityColumn) => {
-        const specialityCourses = courses.filter((c) => c[specialityColumn] != null);
-        const passed = specialityCourses.filter((c) => c.status === 'Passed');
-        const compulsory = passed.filter((c) => c.type === 'ΕΥΜ' && c[specialityColumn] === 'Υ');
-        const basic = passed.filter((c) => c[specialityColumn] === 'B');
-        const isCompleted = compulsory.length >= 2 && basic.length >= 4;
-        return {
-          compulsoryCompleted: compulsory.length,
-          compulsoryTotal: 2,
-          basicCompleted: basic.length,
-          basicTotal: 4,
-          isCompleted,
-        };
-      };
-
-      const calculateGraduationBasicRequirement = (direction) => {
-        if (!direction) return { completed: 0, total: 4, passedCourses: [] };
-
-        const availableSpecs = getAvailableSpecialities(direction);
-        const passedCourses = courses.filter((c) => c.status === 'Passed');
-
-        const basicCoursesAcrossSpecs = passedCourses.filter((course) => {
-          return availableSpecs.some((spec) => course[spec] === 'B');
-        });
-
-        const specialitiesRepresented = new Set();
-        basicCoursesAcrossSpecs.forEach((course) => {
-          availableSpecs.forEach((spec) => {
-            if (course[spec] === 'B') {
-              specialitiesRepresented.add(spec);
-            }
-          });
-        });
-
-        const allSpecsRepresented = specialitiesRepresented.size === 3;
-        const minimumCoursesReached = basicCoursesAcrossSpecs.length >= 4;
-
-        return {
-          completed: basicCoursesAcrossSpecs.length,
-          total: 4,
-          passedCourses: basicCoursesAcrossSpecs,
-          specialitiesRepresented: Array.from(specialitiesRepresented),
-          allSpecsRepresented,
-          isCompleted: minimumCoursesReached && allSpecsRepresented,
-        };
-      };
-
-      const dirCourses = getDirectionCourses(userDirection);
-      setDirectionCourses(dirCourses);
-      setCompletedDirection(dirCourses.filter((c) => c.status === 'Passed'));
-
-      const availableSpecs = getAvailableSpecialities(userDirection);
-      const progressResults = availableSpecs.map((spec) => [
-        spec,
-        calculateSpecialityProgress(spec),
-      ]);
-      setSpecialityProgress(Object.fromEntries(progressResults));
-
-      setGraduationBasicReq(calculateGraduationBasicRequirement(userDirection));
-    }
-  }, [courses, userDirection]);
-
   const handleDirectionChange = async (newDirection) => {
     try {
       const response = await fetch('/api/profile/direction', {
@@ -198,6 +124,9 @@ function DegreeRequirements() {
         body: JSON.stringify({ direction: newDirection }),
       });
       if (response.ok) {
+        // Requirement progress depends on the direction, so reload it from the backend
+        const requirements = await fetch('/api/requirements').then((res) => res.json());
+        setRequirementsData(requirements);
         setUserDirection(newDirection);
       } else {
         toast.error(t('degreeRequirements.errors.failedToUpdateDirection'));
@@ -264,23 +193,16 @@ function DegreeRequirements() {
     );
   }
 
-  // --- CALCULATIONS ---
-  const passedCourses = courses.filter((c) => c.status === 'Passed');
-  const completedECTS = passedCourses.reduce((sum, course) => sum + course.ects, 0);
-
-  const compulsoryCourses = courses.filter((c) => c.type === 'ΥΜ');
-  const completedCompulsory = compulsoryCourses.filter((c) => c.status === 'Passed');
-
-  const geCourses = courses.filter((c) => c.type === 'ΓΠ');
-  const completedGE = geCourses.filter((c) => c.status === 'Passed');
+  // --- RESULTS (evaluated by the backend, see GET /api/requirements) ---
+  const req = requirementsData?.requirements;
+  const passedCoursesCount = requirementsData?.passed_courses || 0;
+  const completedECTS = requirementsData?.ects.completed || 0;
 
-  const projectCourses = courses.filter((c) => c.name.startsWith('Ανάπτυξη'));
-  const completedProject = projectCourses.filter((c) => c.status === 'Passed');
-
-  const finalCourses = courses.filter((c) =>
-    ['Πρακτική I', 'Πρακτική IΙ', 'Πτυχιακή Ι', 'Πτυχιακή ΙΙ'].some((name) => c.name.includes(name))
-  );
-  const completedFinal = finalCourses.filter((c) => c.status === 'Passed');
+  const completedCompulsory = req?.compulsory.courses || [];
+  const completedGE = req?.general_education.courses || [];
+  const completedProject = req?.direction_project.courses || [];
+  const completedFinal = req?.final_courses.courses || [];
+  const completedDirection = req?.direction.courses || [];
 
   const csRequiredCourses = [
     'Θεωρία Υπολογισμού',
@@ -292,11 +214,31 @@ function DegreeRequirements() {
       ? completedDirection.filter((c) => csRequiredCourses.includes(c.name))
       : [];
 
-  const availableSpecialities = getAvailableSpecialities(userDirection);
-  const completedSpecialities = availableSpecialities.filter(
-    (spec) => specialityProgress[spec]?.isCompleted
+  const specialityProgress = Object.fromEntries(
+    Object.entries(requirementsData?.speciality_progress || {}).map(([spec, progress]) => [
+      spec,
+      {
+        compulsoryCompleted: progress.compulsory_completed,
+        compulsoryTotal: progress.compulsory_total,
+        basicCompleted: progress.basic_completed,
+        basicTotal: progress.basic_total,
+        isCompleted: progress.is_completed,
+      },
+    ])
   );
 
+  const graduationBasicReq = req && {
+    completed: req.graduation_basic.completed,
+    total: req.graduation_basic.total,
+    passedCourses: req.graduation_basic.courses,
+    specialitiesRepresented: req.graduation_basic.specialities_represented,
+    allSpecsRepresented: req.graduation_basic.specialities_represented.length === 3,
+    isCompleted: req.graduation_basic.is_completed,
+  };
+
+  const availableSpecialities = getAvailableSpecialities(userDirection);
+  const completedSpecialities = req?.specialities.completed_specialities || [];
+
   const selectedDirectionLabel =
     directions.find((d) => d.value === userDirection)?.label || userDirection;
 
@@ -532,7 +474,7 @@ function DegreeRequirements() {
         />
         <SummaryCard
           title={t('degreeRequirements.summary.coursesPassed')}
-          value={passedCourses.length}
+          value={passedCoursesCount}
           icon={CheckCircle2}
           color="text-green-400"
         />
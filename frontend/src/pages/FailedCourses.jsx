@@ -24,6 +24,8 @@ import { toast } from 'sonner';
 import { useTranslation } from 'react-i18next';
 
 const API_URL = '/api/courses';
+// Only this page's courses and the fields it shows, filtered by the server
+const FAILED_COURSES_URL = `${API_URL}?status=Failed&fields=name,code,semester,type,ects,status`;
 
 function FailedCourses() {
   const [courses, setCourses] = useState([]);
@@ -33,12 +35,10 @@ function FailedCourses() {
   const { t } = useTranslation();
 
   useEffect(() => {
-    fetch(API_URL)
+    fetch(FAILED_COURSES_URL)
       .then((res) => res.json())
       .then((data) => {
-        // Filter only failed courses
-        const failedCourses = data.filter((course) => course.status === 'Failed');
-        setCourses(failedCourses);
+        setCourses(data);
         setLoading(false);
       })
       .catch(() => {
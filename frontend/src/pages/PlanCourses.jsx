@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react';
-import { Loader2, Calculator } from 'lucide-react';
+import { Loader2, Calculator, Wand2 } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 import { DndContext, DragOverlay, PointerSensor, useSensor, useSensors } from '@dnd-kit/core';
 import DraggableCourse from '@/components/course-planning/DraggableCourse';
@@ -11,6 +11,10 @@ import { toast } from 'sonner';
 import { useTranslation } from 'react-i18next';
 
 const API_URL = '/api/courses';
+// Planned courses go into the containers; current and failed ones only count towards the ECTS
+const PLANNER_COURSES_URL = `${API_URL}?status=Planned&status=Current%20Semester&status=Failed&fields=name,code,ects,semester,status,planned_semester`;
+const OPTIMIZE_URL = '/api/plan/optimize';
+const VALIDATE_URL = '/api/plan/validate';
 
 function PlanCourses() {
   const navigate = useNavigate();
@@ -18,6 +22,8 @@ function PlanCourses() {
   const [loading, setLoading] = useState(true);
   const [activeCourse, setActiveCourse] = useState(null);
   const [showGradePlanner, setShowGradePlanner] = useState(false);
+  const [optimizing, setOptimizing] = useState(false);
+  const [reloadKey, setReloadKey] = useState(0);
 
   // Define the structure of our containers
   const createInitialContainers = () => ({
@@ -27,10 +33,12 @@ function PlanCourses() {
 
   const [containers, setContainers] = useState(createInitialContainers());
   const [totalECTS, setTotalECTS] = useState(240);
+  // ECTS of current and failed courses, which are not in the containers
+  const [additionalECTS, setAdditionalECTS] = useState(0);
 
   useEffect(() => {
     setLoading(true);
-    fetch(API_URL)
+    fetch(PLANNER_COURSES_URL)
       .then((res) => res.json())
       .then((data) => {
         const newContainers = createInitialContainers(); // Start with fresh, empty containers
@@ -55,6 +63,12 @@ function PlanCourses() {
         });
 
         setContainers(newContainers); // Set the new, correctly partitioned state
+
+        // Current and failed courses count towards the planned ECTS too
+        const additionalCourses = data.filter(
+          (course) => course.status === 'Current Semester' || course.status === 'Failed'
+        );
+        setAdditionalECTS(additionalCourses.reduce((sum, course) => sum + (course.ects || 0), 0));
       })
       .catch(() => {
         toast.error(t('planCourses.dragMessages.failedToLoad'));
@@ -62,7 +76,7 @@ function PlanCourses() {
       .finally(() => {
         setLoading(false);
       });
-  }, [t]); // Add t to dependency array
+  }, [t, reloadKey]); // Add t to dependency array
 
   const sensors = useSensors(useSensor(PointerSensor));
 
@@ -73,39 +87,6 @@ function PlanCourses() {
 
   console.log(`[PLANNER] ECTS from "Planned" courses (drag & drop area): ${plannedECTS}`);
 
-  // We need to fetch and calculate current and failed courses ECTS
-  const [additionalECTS, setAdditionalECTS] = useState(0);
-
-  useEffect(() => {
-    // This effect runs after the main data is loaded
-    if (!loading) {
-      fetch(API_URL)
-        .then((res) => res.json())
-        .then((data) => {
-          // Calculate ECTS from current and failed courses
-          const currentCourses = data.filter((course) => course.status === 'Current Semester');
-          const failedCourses = data.filter((course) => course.status === 'Failed');
-
-          const currentCoursesECTS = currentCourses.reduce(
-            (sum, course) => sum + (course.ects || 0),
-            0
-          );
-          const failedCoursesECTS = failedCourses.reduce(
-            (sum, course) => sum + (course.ects || 0),
-            0
-          );
-
-          // console.log(`[PLANNER] ECTS from "Current Semester" courses: ${currentCoursesECTS}`);
-          // console.log(`[PLANNER] ECTS from "Failed" courses: ${failedCoursesECTS}`);
-
-          setAdditionalECTS(currentCoursesECTS + failedCoursesECTS);
-        })
-        .catch((error) => {
-          console.error('Error calculating additional ECTS:', error);
-        });
-    }
-  }, [loading]);
-
   // Total ECTS including planned, current, and failed courses
   const totalPlannedECTS = plannedECTS + additionalECTS;
 
@@ -127,19 +108,44 @@ function PlanCourses() {
   };
 
   const updateCourseBackend = async (courseId, updates) => {
-    if (updates.status) {
-      await fetch(`${API_URL}/${courseId}/status`, {
-        method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ status: updates.status }),
-      });
+    // Status and planned semester are saved together in a single transaction
+    const response = await fetch(`${API_URL}/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ updates: [{ course_id: courseId, ...updates }] }),
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to save course ${courseId}: ${response.status}`);
     }
-    if (updates.planned_semester !== undefined) {
-      await fetch(`${API_URL}/${courseId}/planned_semester`, {
-        method: 'PUT',
+  };
+
+  // Warn, without undoing the move, when a course now sits no later than
+  // something it requires
+  const checkPrerequisites = async (course, plannedSemester) => {
+    try {
+      const response = await fetch(VALIDATE_URL, {
+        method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ planned_semester: updates.planned_semester }),
+        body: JSON.stringify({ plan: { [course.id]: plannedSemester } }),
       });
+      if (!response.ok) return;
+      const { issues } = await response.json();
+      const issue = issues.find((i) => i.course.id === course.id);
+      if (issue) {
+        const missing = [
+          ...issue.prerequisites_too_late,
+          ...issue.corequisites_too_late,
+          ...issue.not_planned,
+        ].map((c) => c.code);
+        toast.warning(
+          t('planCourses.dragMessages.prerequisiteWarning', {
+            courseName: course.name,
+            courses: missing.join(', '),
+          })
+        );
+      }
+    } catch (error) {
+      console.error('Failed to validate prerequisites:', error);
     }
   };
 
@@ -196,6 +202,9 @@ function PlanCourses() {
           : 0; // 0 for 'unassigned'
         await updateCourseBackend(activeCourseId, { planned_semester: newPlannedSemester });
         toast.success(t('planCourses.dragMessages.courseMoved', { courseName: course.name }));
+        if (newPlannedSemester) {
+          checkPrerequisites(course, newPlannedSemester);
+        }
       }
     } catch (error) {
       toast.error(t('planCourses.dragMessages.failedToSave'));
@@ -203,6 +212,33 @@ function PlanCourses() {
     }
   };
 
+  const handleOptimize = async () => {
+    setOptimizing(true);
+    try {
+      // The backend picks the remaining courses, spreads them over the
+      // semesters and saves the result as Planned courses
+      const response = await fetch(OPTIMIZE_URL, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({}),
+      });
+      const plan = await response.json();
+      if (!response.ok) {
+        throw new Error(plan.detail);
+      }
+      if (plan.unscheduled.length > 0 || Object.keys(plan.unmet).length > 0) {
+        toast.warning(t('planCourses.optimize.partial', { count: plan.unscheduled.length }));
+      } else {
+        toast.success(t('planCourses.optimize.success', { semester: plan.graduation_semester }));
+      }
+      setReloadKey((key) => key + 1);
+    } catch (error) {
+      toast.error(error.message || t('planCourses.optimize.failed'));
+    } finally {
+      setOptimizing(false);
+    }
+  };
+
   const isDragging = activeCourse !== null;
   const semesterKeys = Object.keys(containers).filter((k) => k.startsWith('semester'));
 
@@ -222,6 +258,18 @@ function PlanCourses() {
             <p className="text-xs text-gray-500 mt-1">{t('planCourses.ectsNote')}</p>
           </div>
           <div className="flex gap-3">
+            <Button
+              onClick={handleOptimize}
+              disabled={optimizing || loading}
+              className="bg-blue-600 hover:bg-blue-700 text-white"
+            >
+              {optimizing ? (
+                <Loader2 className="h-4 w-4 mr-2 animate-spin" />
+              ) : (
+                <Wand2 className="h-4 w-4 mr-2" />
+              )}
+              {t('planCourses.optimize.button')}
+            </Button>
             <Button
               onClick={() => setShowGradePlanner(true)}
               className="bg-green-600 hover:bg-green-700 text-white"
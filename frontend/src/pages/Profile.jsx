@@ -46,30 +46,18 @@ function Profile() {
   const fetchProfile = async () => {
     try {
       setLoading(true);
-      const [sdiRes, firstNameRes, lastNameRes, currentSemesterRes, directionRes] =
-        await Promise.all([
-          fetch('/api/profile/sdi'),
-          fetch('/api/profile/first_name'),
-          fetch('/api/profile/last_name'),
-          fetch('/api/profile/current_semester'),
-          fetch('/api/profile/direction'),
-        ]);
-
-      const [sdiData, firstNameData, lastNameData, currentSemesterData, directionData] =
-        await Promise.all([
-          sdiRes.json(),
-          firstNameRes.json(),
-          lastNameRes.json(),
-          currentSemesterRes.json(),
-          directionRes.json(),
-        ]);
+      const response = await fetch('/api/profile');
+      if (!response.ok) {
+        throw new Error(`Failed to load profile: ${response.status}`);
+      }
+      const data = await response.json();
 
       const profileData = {
-        sdi: sdiData.sdi || '',
-        first_name: firstNameData.first_name || '',
-        last_name: lastNameData.last_name || '',
-        current_semester: currentSemesterData.current_semester || '',
-        direction: directionData.direction || 'Not Selected',
+        sdi: data.sdi || '',
+        first_name: data.first_name || '',
+        last_name: data.last_name || '',
+        current_semester: data.current_semester || '',
+        direction: data.direction || 'Not Selected',
       };
 
       setProfile(profileData);
@@ -103,62 +91,33 @@ function Profile() {
         return;
       }
 
-      const updatePromises = [];
+      // Send only the changed fields; the backend applies them in one transaction.
+      const changes = {};
       if (editedProfile.sdi !== profile.sdi) {
-        updatePromises.push(
-          fetch('/api/profile/sdi', {
-            method: 'PUT',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ sdi: parseInt(editedProfile.sdi) }),
-          })
-        );
+        changes.sdi = parseInt(editedProfile.sdi);
       }
       if (editedProfile.first_name !== profile.first_name) {
-        updatePromises.push(
-          fetch('/api/profile/first_name', {
-            method: 'PUT',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ first_name: editedProfile.first_name }),
-          })
-        );
+        changes.first_name = editedProfile.first_name;
       }
       if (editedProfile.last_name !== profile.last_name) {
-        updatePromises.push(
-          fetch('/api/profile/last_name', {
-            method: 'PUT',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ last_name: editedProfile.last_name }),
-          })
-        );
+        changes.last_name = editedProfile.last_name;
       }
       if (editedProfile.current_semester !== profile.current_semester) {
-        updatePromises.push(
-          fetch('/api/profile/current_semester', {
-            method: 'PUT',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              current_semester: editedProfile.current_semester
-                ? parseInt(editedProfile.current_semester)
-                : null,
-            }),
-          })
-        );
+        changes.current_semester = editedProfile.current_semester
+          ? parseInt(editedProfile.current_semester)
+          : null;
       }
       if (editedProfile.direction !== profile.direction) {
-        updatePromises.push(
-          fetch('/api/profile/direction', {
-            method: 'PUT',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              direction:
-                editedProfile.direction === 'Not Selected' ? null : editedProfile.direction,
-            }),
-          })
-        );
+        changes.direction =
+          editedProfile.direction === 'Not Selected' ? null : editedProfile.direction;
       }
 
-      const responses = await Promise.all(updatePromises);
-      for (const response of responses) {
+      if (Object.keys(changes).length > 0) {
+        const response = await fetch('/api/profile', {
+          method: 'PATCH',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(changes),
+        });
         if (!response.ok) {
           const errorData = await response.json();
           throw new Error(errorData.detail || t('profile.profileUpdateFailed'));
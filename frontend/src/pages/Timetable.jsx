@@ -5,14 +5,12 @@ import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { useTranslation } from 'react-i18next';
 
-// Import the timetable data directly
-import timetableData from '../data/spring2025_timetable.json';
-
 function Timetable() {
   const navigate = useNavigate();
   const { t } = useTranslation();
   const [currentCourses, setCurrentCourses] = useState([]);
   const [myTimetable, setMyTimetable] = useState([]);
+  const [conflicts, setConflicts] = useState([]);
   const [userSDI, setUserSDI] = useState(null);
   const [loading, setLoading] = useState(true);
   const [activeDay, setActiveDay] = useState('Δευτέρα');
@@ -43,23 +41,16 @@ function Timetable() {
   };
 
   useEffect(() => {
-    // Fetch both courses and user SDI using the existing endpoint
+    // The backend matches Current Semester courses to timetable slots and filters them by SDI
     Promise.all([
-      fetch('/api/courses').then((res) => res.json()),
-      fetch('/api/profile/sdi').then((res) => res.json()), // Use existing endpoint
+      fetch('/api/timetable/me').then((res) => res.json()),
+      fetch('/api/timetable/conflicts').then((res) => res.json()),
     ])
-      .then(([coursesData, profileData]) => {
-        const current = coursesData.filter((course) => course.status === 'Current Semester');
-        setCurrentCourses(current);
-        setUserSDI(profileData.sdi);
-
-        // Match current courses with timetable entries and filter by SDI
-        const matchedTimetable = findMatchingTimetableEntries(
-          current,
-          timetableData.schedule,
-          profileData.sdi
-        );
-        setMyTimetable(matchedTimetable);
+      .then(([timetable, conflictsData]) => {
+        setCurrentCourses(timetable.courses);
+        setUserSDI(timetable.sdi);
+        setMyTimetable(timetable.slots);
+        setConflicts(conflictsData.conflicts);
         setLoading(false);
       })
       .catch((error) => {
@@ -76,139 +67,6 @@ function Timetable() {
     });
   };
 
-  // Replace the current debug useEffect with this version:
-  useEffect(() => {
-    if (myTimetable.length > 0) {
-      console.log('=== DEBUGGING OVERLAPS ===');
-      console.log('My timetable entries:', myTimetable.length);
-
-      // Log each timetable entry first
-      myTimetable.forEach((entry, index) => {
-        console.log(
-          `[${index}] ${entry.course_name} - ${entry.day} ${entry.start_time}-${entry.end_time}`
-        );
-      });
-
-      // Then check for overlaps WITHOUT calling getCoursesForSlot to avoid the recursive logging
-      timeSlots.forEach((timeSlot) => {
-        days.forEach((day) => {
-          // Inline the filtering logic here to avoid recursive calls
-          const coursesInSlot = myTimetable.filter((entry) => {
-            const entryTimeSlot = `${entry.start_time}-${entry.end_time}`;
-            return entry.day === day && entryTimeSlot === timeSlot;
-          });
-
-          if (coursesInSlot.length > 0) {
-            console.log(`${day} ${timeSlot}: ${coursesInSlot.length} course(s)`);
-            coursesInSlot.forEach((course, index) => {
-              console.log(
-                `  [${index}] ${course.course_name} (${course.start_time}-${course.end_time})`
-              );
-            });
-          }
-
-          if (coursesInSlot.length > 1) {
-            console.log(
-              `🔴 OVERLAP DETECTED at ${day} ${timeSlot}:`,
-              coursesInSlot.map((c) => c.course_name)
-            );
-          }
-        });
-      });
-    }
-  }, [myTimetable]);
-
-  // Enhanced function to determine if a course should be shown based on SDI
-  const shouldShowCourse = (courseName, userSDI) => {
-    const courseNameLower = courseName.toLowerCase();
-
-    // Check for general modulo pattern (e.g., "mod 4=2", "mod 3=1", etc.)
-    const modMatch = courseNameLower.match(/mod\s*(\d+)\s*=\s*(\d+)/);
-    if (modMatch) {
-      const modulus = parseInt(modMatch[1], 10);
-      const expectedRemainder = parseInt(modMatch[2], 10);
-      const actualRemainder = userSDI % modulus;
-
-      console.log(`[MOD FILTER] Course: "${courseName}"`);
-      console.log(
-        `  Modulus: ${modulus}, Expected: ${expectedRemainder}, Actual: ${actualRemainder}, SDI: ${userSDI}`
-      );
-      console.log(`  Show course: ${actualRemainder === expectedRemainder}`);
-
-      return actualRemainder === expectedRemainder;
-    }
-
-    // Fall back to even/odd filtering for courses with άρτιοι/περιττοί indicators
-    const isSDIEven = userSDI % 2 === 0;
-
-    const hasEvenIndicator =
-      courseNameLower.includes('άρτιοι') ||
-      courseNameLower.includes('αρτιοι') ||
-      courseNameLower.includes('(άρτιοι)') ||
-      courseNameLower.includes('(αρτιοι)');
-
-    const hasOddIndicator =
-      courseNameLower.includes('περιττοί') ||
-      courseNameLower.includes('περιττοι') ||
-      courseNameLower.includes('(περιττοί)') ||
-      courseNameLower.includes('(περιττοι)');
-
-    // If no even/odd indicators, show the course
-    if (!hasEvenIndicator && !hasOddIndicator) {
-      return true;
-    }
-
-    // Apply even/odd filtering
-    if (isSDIEven) {
-      return hasEvenIndicator;
-    }
-
-    return hasOddIndicator;
-  };
-
-  // Function to normalize text for comparison (handles Greek/English character mixing)
-  const normalizeText = (text) => {
-    return (
-      text
-        .toLowerCase()
-        .trim()
-        // Replace Greek letters with Latin equivalents
-        .replace(/ι/g, 'i') // Greek iota → Latin i
-        .replace(/ο/g, 'o') // Greek omicron → Latin o
-        .replace(/α/g, 'a') // Greek alpha → Latin a
-        .replace(/ε/g, 'e') // Greek epsilon → Latin e
-        .replace(/η/g, 'h') // Greek eta → Latin h
-        .replace(/κ/g, 'k') // Greek kappa → Latin k
-        .replace(/μ/g, 'm') // Greek mu → Latin m
-        .replace(/ν/g, 'n') // Greek nu → Latin n
-        .replace(/π/g, 'p') // Greek pi → Latin p
-        .replace(/ρ/g, 'r') // Greek rho → Latin r
-        .replace(/τ/g, 't') // Greek tau → Latin t
-        .replace(/υ/g, 'y') // Greek upsilon → Latin y
-        .replace(/χ/g, 'x') // Greek chi → Latin x
-        // Also handle the reverse (Latin → Greek) in case database has Latin
-        .replace(/i/g, 'i') // Ensure consistent Latin i
-        .replace(/\s+/g, ' ')
-    ); // Normalize whitespace
-  };
-
-  // Function to get the base course name for MATCHING purposes only (removes all indicators)
-  const getBaseCourseName = (courseName) => {
-    return courseName
-      .replace(/\s*\(άρτιοι\)/gi, '')
-      .replace(/\s*\(αρτιοι\)/gi, '')
-      .replace(/\s*\(περιττοί\)/gi, '')
-      .replace(/\s*\(περιττοι\)/gi, '')
-      .replace(/\s*άρτιοι\s*/gi, ' ')
-      .replace(/\s*αρτιοι\s*/gi, ' ')
-      .replace(/\s*περιττοί\s*/gi, ' ')
-      .replace(/\s*περιττοι\s*/gi, ' ')
-      .replace(/\s*\(φροντ\.\s*αμ\s*mod\s*\d+\s*=\s*\d+\)/gi, '') // Remove mod patterns like "(Φροντ. ΑΜ mod 4=0)"
-      .replace(/\s*φροντ\.\s*αμ\s*mod\s*\d+\s*=\s*\d+/gi, '') // Remove mod patterns χωρίς παρενθέσεις
-      .replace(/\s+/g, ' ') // Replace multiple spaces with single space
-      .trim();
-  };
-
   // Function to get the course name for DISPLAY purposes (keeps everything intact, just cleans whitespace)
   const getDisplayCourseName = (courseName) => {
     return courseName
@@ -216,91 +74,14 @@ function Timetable() {
       .trim();
   };
 
-  // Improved function to match courses with timetable entries
-  const findMatchingTimetableEntries = (courses, timetableSchedule, userSDI) => {
-    const matched = [];
-
-    console.log(
-      `[TIMETABLE MATCHING] Starting with ${courses.length} current courses and SDI ${userSDI}`
-    );
-    console.log(
-      `[TIMETABLE MATCHING] Total timetable entries to filter: ${timetableSchedule.length}`
-    );
-
-    courses.forEach((course) => {
-      console.log(`\n[MATCHING] Processing course: "${course.name}"`);
-
-      const timetableEntries = timetableSchedule.filter((entry) => {
-        // First check SDI filtering
-        const shouldShow = shouldShowCourse(entry.course_name, userSDI);
-        if (!shouldShow) {
-          return false;
-        }
-
-        // Use getBaseCourseName for matching (removes all indicators)
-        const cleanCourseName = normalizeText(getBaseCourseName(course.name));
-        const cleanTimetableName = normalizeText(getBaseCourseName(entry.course_name));
-
-        // Direct match after normalization
-        if (cleanCourseName === cleanTimetableName) {
-          console.log(`  ✓ Direct match with: "${entry.course_name}"`);
-          return true;
-        }
-
-        // Substring matching
-        if (
-          cleanCourseName.includes(cleanTimetableName) ||
-          cleanTimetableName.includes(cleanCourseName)
-        ) {
-          console.log(`  ✓ Substring match with: "${entry.course_name}"`);
-          return true;
-        }
-
-        // Word-based matching
-        const courseWords = cleanCourseName.split(' ').filter((w) => w.length > 3);
-        const timetableWords = cleanTimetableName.split(' ').filter((w) => w.length > 3);
-
-        if (courseWords.length === 0 || timetableWords.length === 0) {
-          return false;
-        }
-
-        const commonWords = courseWords.filter((word) =>
-          timetableWords.some(
-            (tWord) =>
-              tWord === word ||
-              (word.length > 4 && tWord.includes(word)) ||
-              (tWord.length > 4 && word.includes(tWord))
-          )
-        );
-
-        const matchRatio = commonWords.length / Math.min(courseWords.length, timetableWords.length);
-        const isMatch = matchRatio >= 0.7 && commonWords.length >= 2;
-
-        if (isMatch) {
-          console.log(
-            `  ✓ Word-based match with: "${entry.course_name}" (ratio: ${matchRatio.toFixed(2)})`
-          );
-        }
-
-        return isMatch;
-      });
-
-      console.log(`  Found ${timetableEntries.length} matching timetable entries`);
-
-      timetableEntries.forEach((entry) => {
-        matched.push({
-          ...entry,
-          course_id: course.id,
-          course_code: course.code,
-          course_ects: course.ects,
-          database_course_name: course.name,
-        });
-      });
-    });
-
-    console.log(`[TIMETABLE MATCHING] Final result: ${matched.length} matched entries`);
-    return matched;
-  };
+  // Slots that overlap a slot of another course, keyed by course, day and start time
+  const conflictedSlots = new Set(
+    conflicts.flatMap((conflict) =>
+      conflict.courses.map((slot) => `${slot.course_id}-${slot.day}-${slot.start_time}`)
+    )
+  );
+  const isConflicted = (entry) =>
+    conflictedSlots.has(`${entry.course_id}-${entry.day}-${entry.start_time}`);
 
   // Function to get color for a course based on its semester
   const getCourseColor = (semester) => {
@@ -631,18 +412,11 @@ function Timetable() {
               <CardTitle className="flex items-center gap-2">
                 {t('timetable.enrolledCoursesSection')}
                 {/* Show warning if there are time conflicts */}
-                {(() => {
-                  const conflicts = timeSlots.some((timeSlot) =>
-                    days.some((day) => getCoursesForSlot(day, timeSlot).length > 1)
-                  );
-                  return (
-                    conflicts && (
-                      <span className="text-yellow-400 text-sm bg-yellow-900 bg-opacity-30 px-2 py-1 rounded">
-                        {t('timetable.conflictsDetected')}
-                      </span>
-                    )
-                  );
-                })()}
+                {conflicts.length > 0 && (
+                  <span className="text-yellow-400 text-sm bg-yellow-900 bg-opacity-30 px-2 py-1 rounded">
+                    {t('timetable.conflictsDetected')}
+                  </span>
+                )}
               </CardTitle>
             </CardHeader>
             <CardContent>
@@ -653,11 +427,7 @@ function Timetable() {
                   );
 
                   // Check if this course has conflicts
-                  const hasConflicts = timetableEntries.some((entry) => {
-                    const timeSlot = `${entry.start_time}-${entry.end_time}`;
-                    const coursesInSlot = getCoursesForSlot(entry.day, timeSlot);
-                    return coursesInSlot.length > 1;
-                  });
+                  const hasConflicts = timetableEntries.some(isConflicted);
 
                   return (
                     <div
@@ -682,18 +452,18 @@ function Timetable() {
                           {timetableEntries.map((entry, index) => {
                             const timeSlot = `${entry.start_time}-${entry.end_time}`;
                             const coursesInSlot = getCoursesForSlot(entry.day, timeSlot);
-                            const isConflicted = coursesInSlot.length > 1;
+                            const conflicted = isConflicted(entry);
 
                             return (
                               <div
                                 key={index}
                                 className={`flex justify-between ${
-                                  isConflicted ? 'text-yellow-600 font-medium' : ''
+                                  conflicted ? 'text-yellow-600 font-medium' : ''
                                 }`}
                               >
                                 <span>
                                   {dayNames[entry.day]} {entry.start_time}-{entry.end_time}
-                                  {isConflicted && ` (${coursesInSlot.length} courses)`}
+                                  {conflicted && ` (${coursesInSlot.length} courses)`}
                                 </span>
                                 <span>{entry.room}</span>
                               </div>